@@ -1,14 +1,29 @@
-import random, json, math, time
+import argparse, asyncio, random, json, math, sys, time, os, hashlib, marshal, threading
+from bisect import bisect
 from itertools import accumulate
 from enum import Enum
+from rng import RNG
+from crafting import RecipeGraph
+from timers import Scheduler
+from render import Renderer, modes as output_modes
+from stats import Stats
+from progression import get_exp_required_for_level, exp_required, level_for
+import events
+from schema import Field, ListOf, Loader, MapOf, Object, OPTIONAL, Value, ValidationError, format_errors, number
 
 try:
 	from termcolor import cprint, colored
+	has_termcolor = True
 except ModuleNotFoundError:
 	def cprint(text, color=None, on_color=None, attrs=None, **kwargs):
 		print(text, **kwargs)			
 	def colored(text, color=None, on_color=None, attrs=None):
 		return text
+	has_termcolor = False
+
+def offer_termcolor():
+	"Offers to install termcolor when playing in a terminal without it; importing this module never prompts"
+	global cprint, colored
 	install = None
 	while not install or install[0].lower() not in "yn":
 		install = input("You appear to be missing the termcolor module, would you like to install it? (Y/N)")
@@ -16,101 +31,42 @@ except ModuleNotFoundError:
 		print("Continuing without colored text")
 	else:
 		import subprocess
-		returncode = subprocess.call(["pip", "install", "termcolor"])
+		returncode = subprocess.call([sys.executable, "-m", "pip", "install", "termcolor"])
 		if returncode:
 			print("Failed to install termcolor module; continuing without colored text")
 		else:
 			from termcolor import cprint, colored
+			durability_messages.clear()
 			
 #A text-based RPG game based on Minecraft
 
-def one_in(x):
-	"Returns True with a probability of 1/x, otherwise returns False"
-	return x <= 1 or random.randint(1, x) == 1
-
-def x_in_y(x, y):
-	"Returns True with a probability of x/y, otherwise returns False"
-	return random.uniform(0, y) < x
-	
-def binomial(num, x, y=100):
-	if x == 1 and isinstance(y, int):
-		return sum(1 for _ in range(num) if one_in(y))
-	else:
-		return sum(1 for _ in range(num) if x_in_y(x, y))
-
-def round_stochastic(value):
-	"""Randomly rounds a number up or down, based on its decimal part
-	For example, 5.3 has a 70% chance to be rounded to 5, 30% chance to be rounded to 6
-	And 2.8 has an 80% chance to be rounded to 3, 20% chance to be rounded to 2"""
-	low = math.floor(value)
-	high = math.ceil(value)
-	if value < 0:
-		if random.random() < high - value:
-			return low
-		return high
-	else:
-		if random.random() < value - low:
-			return high
-		return low 
+#Shared generator for randomness that isn't tied to a particular player, like the title screen
+global_rng = RNG()
+one_in = global_rng.one_in
+x_in_y = global_rng.x_in_y
+binomial = global_rng.binomial
+round_stochastic = global_rng.round_stochastic
 
-def choice_input(*choices, return_text=False):
-	for index, choice in enumerate(choices):
-		print(f"{index + 1}. {choice}")
+async def choice_input(client, *choices, return_text=False, commands=None):
+	"Asks for one of the numbered choices; commands maps words that can be typed instead, like stats, to functions to call before asking again"
+	client.out.choices(choices)
 	while True:
+		text = await client.input(">> ")
 		try:
-			choice = int(input(">> "))
+			choice = int(text)
 		except ValueError:
+			command = text.strip().lower()
+			if commands and command in commands:
+				commands[command]()
 			continue
 		else:
 			if 1 <= choice <= len(choices):
 				return choices[choice - 1] if return_text else choice
 
-def yes_no(message):
-	m = input(message + " (Y/N) ")
+async def yes_no(client, message):
+	m = await client.input(message + " (Y/N) ")
 	return len(m) > 0 and m[0].lower() == "y"
 
-class JSONDict(dict):
-	
-	def __init__(self, d={}):
-		super().__init__(d)
-		for key in self:
-			if type(self[key]) == dict:
-				self[key] = self.__class__(self[key])
-	
-	def __missing__(self, key):
-		raise JSONError(f"missing required field {key!r}", self)
-	
-	def gettype(self, key, typ):
-		value = self[key]
-		if typ == float:
-			typ = (float, int)
-		if isinstance(value, typ):
-			return value
-		else:
-			raise JSONError(f"field {key!r} expected value of type {typ.__name__!r}, but got {value.__class__.__name__!r}", self)
-		
-	def gettype_or_default(self, key, typ, default=None):
-		if key not in self:
-			return default
-		return self.gettype(key, typ)
-		
-class JSONError(Exception):
-		
-	def __init__(self, message, context=None):
-		msg = message
-		if context:
-			msg += f"\n\nJSON Context: \n{json.dumps(context)}"
-		super().__init__(msg)
-		
-def json_dict(func):
-	if type(func) == staticmethod:
-		 func = func.__get__(object)
-	def wrapper(d, *args, **kwargs):
-		if type(d) != JSONDict:
-			 d = JSONDict(d)
-		return func(d, *args, **kwargs)
-	return wrapper
-	
 class MobBehaviorType(Enum):
 	passive = 0 #Passive; won't attack even if attacked
 	neutral = 1 #Neutral; will become hostile if attacked
@@ -134,14 +90,112 @@ class WeightedList:
 		self.weights.clear()
 		self.cumulative_weights = None 
 		
-	def pick(self):
+	def pick(self, rng=global_rng):
 		if len(self.choices) == 0:
 			raise IndexError("cannot pick from an empty weighted list")
 		if not self.cumulative_weights:
 			self.cumulative_weights = list(accumulate(self.weights))
-		return random.choices(self.choices, cum_weights=self.cumulative_weights)[0]
+		return self.choices[bisect(self.cumulative_weights, rng.random() * self.cumulative_weights[-1])]
+		
+	def compile(self):
+		return LootTable(zip(self.choices, self.weights))
 
-mobs_dict = json.load(open("mobs.json"))
+class LootTable:
+	"""An immutable weighted table, precompiled with Vose's alias method so that each pick takes O(1) time
+	Build these once when content is loaded rather than per action"""
+	
+	def __init__(self, entries):
+		entries = [(value, weight) for value, weight in entries if weight > 0]
+		if len(entries) == 0:
+			raise ValueError("cannot build a loot table with no entries")
+		self.choices = tuple(value for value, _ in entries)
+		self.weights = tuple(weight for _, weight in entries)
+		n = len(entries)
+		total = sum(self.weights)
+		scaled = [weight * n / total for weight in self.weights]
+		prob = [1] * n
+		alias = list(range(n))
+		small = [i for i in range(n) if scaled[i] < 1]
+		large = [i for i in range(n) if scaled[i] >= 1]
+		while small and large:
+			s = small.pop()
+			l = large.pop()
+			prob[s] = scaled[s]
+			alias[s] = l
+			scaled[l] += scaled[s] - 1
+			if scaled[l] < 1:
+				small.append(l)
+			else:
+				large.append(l)
+		self.prob = tuple(prob) #Anything left over in small or large is only off from 1 due to rounding error
+		self.alias = tuple(self.choices[i] for i in alias)
+		
+	def __len__(self):
+		return len(self.choices)
+		
+	def pick(self, rng=global_rng):
+		u = rng.random() * len(self.choices)
+		i = int(u)
+		return self.choices[i] if u - i < self.prob[i] else self.alias[i]
+		
+	def pick_many(self, k, rng=global_rng):
+		"Picks k times at once, returning a dict of how many times each value was picked"
+		counts = rng.multinomial(k, self.weights)
+		return {value: count for value, count in zip(self.choices, counts) if count > 0}
+
+class DropTable:
+	"""A mob's death drops, compiled when content is loaded into flat (item, choices, low, high, x, y) tuples, where choices
+	is a tuple of items to pick one of or None, high is None for a fixed quantity of low, and x/y is the chance"""
+	__slots__ = ("drops",)
+	
+	def __init__(self, death_drops):
+		drops = []
+		for drop in death_drops:
+			item = drop["item"]
+			choices = tuple(item) if isinstance(item, list) else None
+			q = drop.get("quantity", 1)
+			low, high = (q[0], q[1]) if isinstance(q, list) else (q, None)
+			x, y = drop.get("chance", [1, 1])
+			drops.append((None if choices else item, choices, low, high, x, y))
+		self.drops = tuple(drops)
+		
+	def __len__(self):
+		return len(self.drops)
+		
+	def roll_one(self, rng=global_rng):
+		"Rolls the drops of a single kill, returning a list of (item, amount) pairs, with EXP as an item"
+		got = []
+		for item, choices, low, high, x, y in self.drops:
+			if choices is not None:
+				item = rng.choice(choices)
+			amount = low if high is None else rng.randint(low, high)
+			if amount > 0 and rng.x_in_y(x, y):
+				got.append((item, amount))
+		return got
+		
+	def roll(self, kills, rng=global_rng):
+		"""Rolls the drops of many kills at once, returning (a dict of how many of each item dropped, total EXP)
+		Rather than rolling each kill, each drop takes one binomial draw for how many kills it drops on, and one
+		multinomial draw to split those between its choices; only random quantities need a draw per kill"""
+		items = {}
+		exp = 0
+		for item, choices, low, high, x, y in self.drops:
+			hits = rng.binomial(kills, x, y)
+			if hits == 0:
+				continue
+			if choices is None:
+				split = ((item, hits),)
+			else:
+				split = zip(choices, rng.multinomial(hits, [1] * len(choices)))
+			for item, count in split:
+				total = low * count if high is None else rng.randint_sum(low, high, count)
+				if total <= 0:
+					continue
+				if item == "EXP":
+					exp += total
+				else:
+					items[item] = items.get(item, 0) + total
+		return items, exp
 
 class MobType:
 	
@@ -150,107 +204,128 @@ class MobType:
 		self.weight = weight
 		self.hp = max_hp
 		self.behavior = behavior
-		self.death_drops = death_drops
+		self.death_drops = death_drops #As in mobs.json, which is how they're cached
+		self.drops = DropTable(death_drops)
 		self.night_mob = night_mob
 		self.attack_strength = attack_strength
 		self.spawns_naturally = True
 	
-	@json_dict	
 	@staticmethod
 	def from_dict(d):
-		name = d.gettype("name", str)
-		HP = d.gettype("HP", int)
-		b = d.gettype("behavior", str)
-		spawns_naturally = d.gettype_or_default("spawns_naturally", bool, True) 
-		weight = d.gettype("weight", int) if spawns_naturally else 0
-		if b == "passive":
-			behavior = MobBehaviorType.passive
-		elif b == "neutral":
-			behavior = MobBehaviorType.neutral
-		elif b == "hostile":
-			behavior = MobBehaviorType.hostile
-		else:
-			raise JSONError(f"Invalid behavior type {b!r}", d)
-		attack_strength = d.gettype_or_default("attack_strength", float)
-		if attack_strength is None and b != "passive":
-			raise JSONError("Non-passive mobs require an attack strength", d)
-		death_drops = d.gettype_or_default("death_drops", list, [])
-		for drop in death_drops:
-			drop = JSONDict(drop)
-			if not isinstance(drop, dict):
-				raise JSONError("Each entry in death_drops must be a dict", drop)
-			item = drop.gettype("item", (str, list))	
-			if "chance" in drop and (not isinstance(drop["chance"], list) or len(drop["chance"]) != 2):
-				raise JSONError("chance must be a 2-item list", drop) 
-			if "quantity" in drop and not (isinstance(drop["quantity"], int) or (isinstance(drop["quantity"], list) and len(drop["quantity"]) == 2)):
-				raise JSONError("quantity muat be an int or a 2-item list", drop)	
-		night_mob = d.gettype_or_default("night_mob", bool, False)
-		return MobType(name, weight, HP, behavior, death_drops, night_mob, attack_strength, spawns_naturally)
-
-mob_types = {}
-
-for mob_dict in mobs_dict:
-	name = mob_dict["name"]
-	mob_types[name] = MobType.from_dict(mob_dict)	
-
-#passive_mob_types = list(filter(lambda typ: mob_types[typ].behavior == MobBehaviorType.passive, mob_types))
-#night_mob_types = list(filter(lambda typ: mob_types[typ].night_mob, mob_types))
-day_mob_types = WeightedList()
-night_mob_types = WeightedList()
-for typ in mob_types:
-	mob_type = mob_types[typ]
-	if mob_type.spawns_naturally:
-		if mob_type.night_mob:
-			night_mob_types.add(typ, mob_type.weight)
-		else:
-			day_mob_types.add(typ, mob_type.weight)
+		return mob_schema.load(d)
+
+def check_quantity(q):
+	if not (isinstance(q, int) or (isinstance(q, list) and len(q) == 2 and all(isinstance(n, int) for n in q))):
+		return "quantity must be an int or a 2-item list of ints"
+
+def check_mob(fields):
+	if fields["spawns_naturally"] and "weight" not in fields:
+		return "missing required field 'weight', which mobs that spawn naturally need"
+	if fields["attack_strength"] is None and fields["behavior"] != "passive":
+		return "non-passive mobs require an attack strength"
+
+def build_mob(fields):
+	spawns_naturally = fields["spawns_naturally"]
+	weight = fields.get("weight", 0) if spawns_naturally else 0
+	behavior = MobBehaviorType[fields["behavior"]]
+	return MobType(fields["name"], weight, fields["HP"], behavior, fields["death_drops"], fields["night_mob"], fields["attack_strength"], spawns_naturally)
+
+drop_schema = Object({ #Optional fields are left out rather than filled in, since Mob.on_death looks them up with defaults
+	"item": (str, list),
+	"chance": Field(ListOf(number, length=2), OPTIONAL),
+	"quantity": Field(Value((int, list), check=check_quantity), OPTIONAL)
+})
+mob_schema = Loader(Object({
+	"name": str,
+	"HP": int,
+	"behavior": Value(str, choices=[b.name for b in MobBehaviorType]),
+	"spawns_naturally": Field(bool, True),
+	"weight": Field(int, OPTIONAL),
+	"attack_strength": Field(number, None),
+	"death_drops": Field(ListOf(drop_schema), []),
+	"night_mob": Field(bool, False)
+}, build_mob, checks=[check_mob]))
+
+#What mining can find: (item, weight, lowest pickaxe tier that can find it)
+mining_finds = [
+	("Stone", 1500, 1),
+	("Coal", 124, 1),
+	("Raw Iron", 72, 2),
+	("Lapis Lazuli", 3, 2),
+	("Raw Gold", 7, 3),
+	("Diamond", 3, 3)
+]
+#EXP and quantity ranges for finds that don't give 1 item and no EXP
+mining_exp = {"Coal": (0, 2), "Lapis Lazuli": (2, 5), "Diamond": (3, 7)}
+mining_quantity = {"Lapis Lazuli": (4, 9)}
+pickaxe_tiers = ["Wooden Pickaxe", "Stone Pickaxe", "Iron Pickaxe"]
+mining_tables = {}
+for tier_num, pickaxe in enumerate(pickaxe_tiers, 1):
+	mining_tables[pickaxe] = LootTable((item, weight) for item, weight, tier in mining_finds if tier <= tier_num)
+
+explosion_drops = LootTable([ #Explosions drop the block instead of the item
+	("Stone", 3000),
+	("Coal Ore", 124),
+	("Iron Ore", 72),
+	("Lapis Lazuli Ore", 3),
+	("Gold Ore", 7),
+	("Diamond Ore", 3)
+])
 
 class Mob:
+	"A single mob in a battle; everything apart from its HP is shared with its MobType"
+	__slots__ = ("type", "HP")
 	
-	def __init__(self, name, HP, behavior: MobBehaviorType, death_drops, attack_strength):
-		self.name = name
-		self.HP = HP
-		self.behavior = behavior
-		self.death_drops = death_drops
-		self.attack_strength = attack_strength
+	def __init__(self, typ: MobType, HP=None):
+		self.type = typ
+		self.HP = typ.hp if HP is None else HP
+		
+	@property
+	def name(self):
+		return self.type.name
+		
+	@property
+	def behavior(self):
+		return self.type.behavior
+		
+	@property
+	def death_drops(self):
+		return self.type.death_drops
+		
+	@property
+	def attack_strength(self):
+		return self.type.attack_strength
 		
 	@staticmethod
 	def new_mob(typ: str):
-		typ = mob_types[typ]
-		return Mob(typ.name, typ.hp, typ.behavior, typ.death_drops, typ.attack_strength)
-	
+		load_content()
+		return Mob(mob_types[typ])
+		
 	def damage(self, amount, player):
 		self.HP -= amount
 		if self.HP <= 0:
-			print(f"The {self.name.lower()} is dead!")
+			player.message(f"The {self.name.lower()} is dead!")
 			self.on_death(player)
 			
 	def on_death(self, player):
-		if self.death_drops:
+		drops = self.type.drops
+		if drops:
 			got = {}
-			for drop in self.death_drops:
-				item = drop["item"]
-				if isinstance(item, list):
-					item = random.choice(item)
-				q = drop.get("quantity", 1)
-				x, y = drop.get("chance", [1, 1])
-				assert isinstance(q, (list, int))	
-				if isinstance(q, list):
-					amount = random.randint(*q)
-				elif isinstance(q, int):
-					amount = q
-				if amount > 0 and x_in_y(x, y):
-					if item == "EXP":
-						player.gain_exp(amount)
-					else:
-						got[item] = amount
+			for item, amount in drops.roll_one(player.rng):
+				if item == "EXP":
+					player.gain_exp(amount)
+				else:
+					got[item] = amount
 			if got:
-				print("You got: ")
+				player.message("You got: ")
 				for item in got:
-					print(f"{got[item]}x {item}")
+					player.message(f"{got[item]}x {item}")
 					player.add_item(item, got[item])
+					if player.events is not None:
+						player.events.publish(events.DROP, self.name, item, got[item])
 
 class ToolData:
+	__slots__ = ("damage", "durability", "attack_speed", "mining_mult")
 	
 	def __init__(self, damage, durability, attack_speed, mining_mult):
 		self.damage = damage
@@ -258,14 +333,17 @@ class ToolData:
 		self.attack_speed = attack_speed
 		self.mining_mult = mining_mult
 	
-	@json_dict
-	@staticmethod	
+	@staticmethod
 	def from_dict(d):
-		damage = d.gettype_or_default("damage", int, 1)
-		durability = d.gettype("durability", int)
-		attack_speed = d.gettype_or_default("attack_speed", (int, float), 4)
-		mining_mult = d.gettype_or_default("mining_mult", (int, float), 1)
-		return ToolData(damage, durability, attack_speed, mining_mult)	
+		return tool_data_schema.load(d)
+
+tool_data_object = Object({
+	"damage": Field(int, 1),
+	"durability": int,
+	"attack_speed": Field(number, 4),
+	"mining_mult": Field(number, 1)
+}, lambda fields: ToolData(fields["damage"], fields["durability"], fields["attack_speed"], fields["mining_mult"]))
+tool_data_schema = Loader(tool_data_object)
 
 class Recipe:
 	
@@ -274,25 +352,199 @@ class Recipe:
 		self.components = components
 		self.tool_data = tool_data
 	
-	@json_dict	
 	@staticmethod
 	def from_dict(d):
-		quantity = d.gettype_or_default("quantity", int, 1)
-		components = d.gettype("components", list)
-		tool_data = d.gettype_or_default("tool_data", JSONDict)
-		if tool_data:
-			tool_data = ToolData.from_dict(tool_data)
-		return Recipe(quantity, components, tool_data)
-		
-r = json.load(open("recipes.json"))
-recipes = {}
-for name in r:
-	recipe = r[name]
-	recipes[name] = Recipe.from_dict(recipe)
-
-foods = json.load(open("foods.json"))
-			
+		return recipe_schema.load(d)
+		
+	def to_tuple(self):
+		td = self.tool_data
+		return (self.quantity, self.components, td and (td.damage, td.durability, td.attack_speed, td.mining_mult))
+		
+	@staticmethod
+	def from_tuple(t):
+		quantity, components, tool_data = t
+		return Recipe(quantity, components, tool_data and ToolData(*tool_data))
+		
+recipe_schema = Loader(Object({
+	"quantity": Field(int, 1),
+	"components": ListOf(ListOf((str, int), length=2)), #[item, count] pairs
+	"tool_data": Field(tool_data_object, None)
+}, lambda fields: Recipe(fields["quantity"], fields["components"], fields["tool_data"])))
+
+def check_positive(value):
+	if value <= 0:
+		return "must be positive"
+
+foods_schema = Loader(MapOf(Object({"hunger": int, "saturation": number})))
+smelting_schema = Loader(Object({
+	"smelt_time": Value(number, check=check_positive),
+	"items": MapOf(Object({"result": str, "exp": Field(number, 0)}, lambda fields: (fields["result"], fields["exp"]))),
+	"fuels": MapOf(Value(number, check=check_positive)) #Seconds of burn
+}, lambda fields: (fields["smelt_time"], fields["items"], fields["fuels"])))
+
+def smelting_from_dict(d):
+	"Returns (smelt_time, smeltable, fuels) from smelting.json, where smeltable maps items to (result, EXP) and fuels maps items to seconds of burn"
+	return smelting_schema.load(d)
+
+#Content loaded from the JSON files next to this module; see load_content()
+content_dir = os.path.dirname(os.path.abspath(__file__))
+content_files = ("mobs.json", "recipes.json", "foods.json", "smelting.json")
+content_cache = os.path.join(content_dir, "__pycache__", "content.cache")
+content_cache_version = 2
+content_names = ("mob_types", "day_mob_types", "night_mob_types", "recipes", "recipe_uses", "recipe_order", "recipe_graph", "foods", "smelt_time", "smeltable", "fuels")
+
+content_schemas = {
+	"mobs.json": Loader(ListOf(mob_schema.schema)),
+	"recipes.json": Loader(MapOf(recipe_schema.schema)),
+	"foods.json": foods_schema,
+	"smelting.json": smelting_schema
+}
+
+def build_content(files=content_files):
+	"""Parses and validates the given content files, returning their plain data in the form stored in the content cache
+	Raises a ValidationError listing every problem in all of the files, not just the first one"""
+	errors = []
+	content = {}
+	for name in files:
+		with open(os.path.join(content_dir, name)) as f:
+			content[name] = content_schemas[name].check(json.load(f), name, errors)
+	if errors:
+		raise ValidationError(format_errors(errors))
+	data = {}
+	if "mobs.json" in content:
+		data["mobs"] = [(m.name, m.weight, m.hp, m.behavior.value, m.death_drops, m.night_mob, m.attack_strength, m.spawns_naturally) for m in content["mobs.json"]]
+	if "recipes.json" in content:
+		data["recipes"] = {name: recipe.to_tuple() for name, recipe in content["recipes.json"].items()}
+	if "foods.json" in content:
+		data["foods"] = content["foods.json"]
+	if "smelting.json" in content:
+		data["smelting"] = content["smelting.json"]
+	return data
+
+def content_stamps():
+	stamps = []
+	for name in content_files:
+		stat = os.stat(os.path.join(content_dir, name))
+		stamps.append((stat.st_mtime_ns, stat.st_size))
+	return stamps
+
+def content_hashes():
+	hashes = []
+	for name in content_files:
+		with open(os.path.join(content_dir, name), "rb") as f:
+			hashes.append(hashlib.sha256(f.read()).digest())
+	return hashes
+
+def read_content_cache():
+	"""Returns the cached content if the cache was built from the current content files, otherwise None
+	Files are matched by modification time and size first, then by hash, so touching a file without changing it doesn't force a rebuild"""
+	try:
+		with open(content_cache, "rb") as f:
+			cache = marshal.loads(f.read()) #Much faster than marshal.load(f), which reads the file in small pieces
+		if cache["version"] != content_cache_version:
+			return None
+		stamps = content_stamps()
+		if cache["stamps"] == stamps:
+			return cache
+		if cache["hashes"] == content_hashes():
+			write_content_cache(cache, stamps)
+			return cache
+	except (OSError, EOFError, ValueError, TypeError, KeyError):
+		pass
+	return None
+
+def write_content_cache(cache, stamps=None):
+	cache["version"] = content_cache_version
+	cache["stamps"] = stamps or content_stamps()
+	cache.setdefault("hashes", content_hashes())
+	tmp_path = f"{content_cache}.{os.getpid()}.tmp"
+	try: #Not being able to write the cache, e.g. in a read-only install, only costs speed
+		os.makedirs(os.path.dirname(content_cache), exist_ok=True)
+		with open(tmp_path, "wb") as f:
+			f.write(marshal.dumps(cache))
+		os.replace(tmp_path, content_cache)
+	except OSError:
+		pass
+
+def mob_tables(mobs):
+	mob_types = {}
+	for name, weight, HP, behavior, death_drops, night_mob, attack_strength, spawns_naturally in mobs:
+		mob_types[name] = MobType(name, weight, HP, MobBehaviorType(behavior), death_drops, night_mob, attack_strength, spawns_naturally)
+	return {
+		"mob_types": mob_types,
+		"day_mob_types": LootTable((typ, mob_types[typ].weight) for typ in mob_types if mob_types[typ].spawns_naturally and not mob_types[typ].night_mob),
+		"night_mob_types": LootTable((typ, mob_types[typ].weight) for typ in mob_types if mob_types[typ].spawns_naturally and mob_types[typ].night_mob)
+	}
+
+def recipe_tables(recipe_data):
+	recipe_uses = {} #Item -> names of the recipes that use it, so a change to one item only rechecks those recipes
+	for name, recipe in recipe_data.items():
+		for item in {component[0] for component in recipe[1]}:
+			recipe_uses.setdefault(item, []).append(name)
+	recipe_graph = RecipeGraph({name: Recipe.from_tuple(recipe) for name, recipe in recipe_data.items()})
+	return {
+		"recipes": recipe_graph.recipes,
+		"recipe_uses": recipe_uses,
+		"recipe_order": {name: i for i, name in enumerate(recipe_data)},
+		"recipe_graph": recipe_graph
+	}
+
+def smelting_tables(smelting):
+	smelt_time, smeltable, fuels = smelting
+	return {"smelt_time": smelt_time, "smeltable": smeltable, "fuels": fuels}
+
+#How each part of the content data is turned into the module's tables
+content_tables = {"mobs": mob_tables, "recipes": recipe_tables, "foods": lambda foods: {"foods": foods}, "smelting": smelting_tables}
+content_version = 0 #Goes up each time content is loaded or reloaded, so that anything worked out from it knows to start over
+staged_content = None #Tables built by a reload, waiting for the next step of the game to swap them in
+staged_lock = threading.Lock()
+
+def build_tables(data):
+	"Builds the content tables for the parts of data that are there, like the cache or the result of build_content()"
+	tables = {}
+	for key, build in content_tables.items():
+		if key in data:
+			tables.update(build(data[key]))
+	return tables
+
+def install_content(tables):
+	global content_version
+	globals().update(tables)
+	content_version += 1
+
+def stage_content(tables):
+	"""Queues rebuilt tables to be swapped in at the start of the next step of the game, from any thread
+	Steps never see a mix of old and new tables, and battles already going on keep their mobs' old types"""
+	global staged_content
+	with staged_lock:
+		staged_content = tables if staged_content is None else {**staged_content, **tables}
+
+def apply_staged_content():
+	global staged_content
+	with staged_lock:
+		tables, staged_content = staged_content, None
+	if tables:
+		install_content(tables)
+
+def load_content():
+	"Loads the game content the first time it's needed, using the content cache when it's up to date"
+	if "recipes" in globals():
+		return
+	cache = read_content_cache()
+	if cache is None:
+		cache = build_content()
+		write_content_cache(cache)
+	install_content(build_tables(cache))
+
+def __getattr__(name):
+	#Lets other modules import the content tables, loading them on first access
+	if name in content_names:
+		load_content()
+		return globals()[name]
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 class Time:
+	__slots__ = ("mins", "secs")
 	
 	def __init__(self):
 		self.mins = 0
@@ -301,42 +553,95 @@ class Time:
 	def is_night(self):
 		return self.mins >= 20
 	
+	def time_of_day(self):
+		"Returns the number of seconds since the start of the day"
+		return self.mins * 60 + self.secs
+	
 	def advance(self, secs):
-		was_night = self.is_night()
-		last_mins = self.mins
-		self.secs += secs
-		while self.secs >= 60:
-			self.mins += 1
-			self.secs -= 60
-		self.mins %= 40
-		is_night = self.is_night()
-		if was_night ^ is_night:
-			if is_night:
-				cprint("It is now nighttime", "blue")
-			else:
-				cprint("It is now daytime", "blue")
-		elif last_mins < 18 and self.mins >= 18:
-			cprint("The sun begins to set", "blue")
-		elif last_mins < 38 and self.mins >= 38:
-			cprint("The sun begins to come up", "blue")
+		"""Advances the clock; the messages as day turns to night and back are world events in the player's timers
+		The time is kept to the microsecond, so that adding up many small steps gives the same time as one big one"""
+		total = round(self.mins * 60 + self.secs + secs, 6)
+		self.mins = int(total // 60) % 40
+		self.secs = round(total % 60, 6)
+		
+#Day and night events, in seconds since the start of a 40 minute day
+day_length = 40 * 60
+world_events = (
+	(18 * 60, "The sun begins to set"),
+	(20 * 60, "It is now nighttime"),
+	(38 * 60, "The sun begins to come up"),
+	(day_length, "It is now daytime")
+)
 			
 class StatusEffect:
+	__slots__ = ("level", "expiry", "ticker")
 	
-	def __init__(self, level, duration):
+	def __init__(self, level, expiry, ticker=None):
 		self.level = level
-		self.duration = duration
+		self.expiry = expiry #Timer for when the effect wears off
+		self.ticker = ticker #Timer for the effect's next periodic tick, if it has one
 
-def get_exp_required_for_level(level):
-	assert level >= 0
-	if level <= 16:
-		return level ** 2 + 6 * level
-	if level < 32:
-		return round(2.5 * level**2 - 40.5 * level + 360)
-	return round(4.5 * level**2 - 160.5 * level + 2220)
+class Furnace:
+	"""A player's furnace, which works through its queue of items in the background as game time passes
+	Fuel is paid for when items are queued, so the burn time left always covers the whole queue"""
+	__slots__ = ("jobs", "progress", "burn", "done", "exp", "clock", "timer")
+	
+	def __init__(self, clock=0):
+		self.jobs = [] #[item, count] still to smelt, in order
+		self.progress = 0 #Seconds spent so far on the first item in the queue
+		self.burn = 0 #Seconds of fuel left
+		self.done = {} #Smelted items waiting to be collected
+		self.exp = 0 #EXP waiting to be collected
+		self.clock = clock #The time on the player's timers when the furnace was last updated
+		self.timer = None #Timer for when the queue will be finished
+		
+	def work_left(self):
+		return sum(count for _, count in self.jobs) * smelt_time - self.progress
+		
+	def spare_burn(self):
+		return self.burn - self.work_left()
+		
+	def add(self, item, count, burn):
+		if self.jobs and self.jobs[-1][0] == item:
+			self.jobs[-1][1] += count
+		else:
+			self.jobs.append([item, count])
+		self.burn += burn
+		
+	def update(self, now):
+		"Smelts everything that has finished since the last update, taking one step per job rather than per item"
+		elapsed = now - self.clock
+		self.clock = now
+		while self.jobs and elapsed > 0:
+			job = self.jobs[0]
+			item, count = job
+			result, exp = smeltable[item]
+			finish = count * smelt_time - self.progress
+			if elapsed >= finish:
+				smelted = count
+				self.jobs.pop(0)
+				self.progress = 0
+				self.burn -= finish
+				elapsed -= finish
+			else:
+				smelted = int((self.progress + elapsed) // smelt_time)
+				job[1] -= smelted
+				self.progress += elapsed - smelted * smelt_time
+				self.burn -= elapsed
+				elapsed = 0
+			if smelted > 0:
+				self.done[result] = self.done.get(result, 0) + smelted
+				self.exp += exp * smelted
+
+class PlayerDied(Exception):
+	pass
 
 class Player:
+	__slots__ = ("rng", "HP", "hunger", "food_exhaustion", "saturation", "inventory", "tools", "curr_weapon", "EXP", "level",
+		"time", "ticks", "timers", "status_effects", "furnace", "messages", "dead", "death_reason", "journal", "craftable", "craftable_version", "events")
 	
-	def __init__(self):
+	def __init__(self, rng=None):
+		self.rng = rng or RNG()
 		self.HP = 20
 		self.hunger = 20
 		self.food_exhaustion = 0
@@ -348,7 +653,26 @@ class Player:
 		self.level = 0
 		self.time = Time()
 		self.ticks = 0
+		self.timers = Scheduler() #Counts seconds of game time since the player was created or loaded
+		self.schedule_world_events()
 		self.status_effects = {}
+		self.messages = []
+		self.dead = False
+		self.death_reason = None
+		self.journal = None #Set by a PlayerStore to record changes between snapshots
+		self.craftable = None #Names of the recipes the player has the components for, built on first use by craftable_recipes()
+		self.craftable_version = None #The content_version craftable was built from
+		self.furnace = None #Created the first time the player smelts something
+		self.events = None #Set by EventBus.attach() to publish telemetry
+		
+	def message(self, text, color=None, attrs=None):
+		"Queues a line of output; the session hands these back to whoever is driving the game"
+		self.messages.append((text, color, attrs))
+		
+	def take_messages(self):
+		messages = self.messages
+		self.messages = []
+		return messages
 		
 	def get_effect_level(self, name):
 		if name not in self.status_effects:
@@ -356,45 +680,79 @@ class Player:
 		return self.status_effects[name].level
 		
 	def apply_status_effect(self, name, level, duration):
-		if name == "Instant Damage":
-			self.damage(3 * 2**level, death_reason="Killed by magic", physical=False)
+		instant = instant_effects.get(name)
+		if instant is not None:
+			instant(self, level)
 			return
-		if name == "Instant Health":
-			self.heal(2 * 2**level)
-			return
-		cur_level = self.get_effect_level(name)
-		if cur_level == 0:
-			self.status_effects[name] = StatusEffect(level, duration)
-		elif level > cur_level:
-			effect_obj = self.status_effects[name]
-			effect_obj.level = level
-			effect_obj.duration = duration
+		effect = self.status_effects.get(name)
+		if effect is None:
+			expiry = self.timers.schedule(duration, self.remove_status_effect, name)
+			ticker = self.timers.schedule(effect_tick_interval, self.tick_status_effect, name) if name in effect_ticks else None
+			self.status_effects[name] = StatusEffect(level, expiry, ticker)
+		elif level > effect.level:
+			effect.level = level
+			self.timers.cancel(effect.expiry)
+			effect.expiry = self.timers.schedule(duration, self.remove_status_effect, name)
+			
+	def remove_status_effect(self, name):
+		effect = self.status_effects.pop(name, None)
+		if effect is not None:
+			self.timers.cancel(effect.expiry)
+			if effect.ticker is not None:
+				self.timers.cancel(effect.ticker)
+				
+	def effect_time_left(self, name):
+		return self.timers.time_left(self.status_effects[name].expiry)
 		
 	def advance_time(self, secs):
 		self.time.advance(secs)
-		for effect in list(self.status_effects.keys()): #Convert to list to save a snapshot of the keys so we can avoid RuntimeError due to changing the size during iteration
-			self.status_effects[effect].duration -= secs
-			if self.status_effects[effect] <= 0:
-				del self.status_effects[effect]
+		self.timers.advance(secs)
+		
+	def reset_timers(self):
+		"Starts the timers over from the current time of day without any status effects, e.g. after loading a saved player"
+		self.timers = Scheduler()
+		self.status_effects = {}
+		self.schedule_world_events()
+		
+	def schedule_world_events(self):
+		time_of_day = self.time.time_of_day()
+		index = next(i for i, (at, _) in enumerate(world_events) if at > time_of_day)
+		self.timers.schedule(world_events[index][0] - time_of_day, self.world_event, index)
+		
+	def world_event(self, index):
+		self.message(world_events[index][1], "blue")
+		next_index = (index + 1) % len(world_events)
+		self.timers.schedule((world_events[next_index][0] - world_events[index][0]) % day_length, self.world_event, next_index)
 				
 	def tick_status_effect(self, name):
-		if name not in self.status_effects:
+		effect = self.status_effects.get(name)
+		if effect is None:
 			return
-		effect = self.status_effects[name]
-		level = effect.level
-		if name == "Hunger":
-			self.mod_food_exhaustion(0.05 * level)
-		elif name == "Poison":
-			level = (level - 1) % 32 + 1
-			rate = max(1, 25 // 2**level)
-			amount = min(self.HP - 1, round_stochastic(20 / rate)) #Poison reduces us to 1 HP but doesn't kill us
-			self.damage(amount, physical=False)
+		effect.ticker = self.timers.schedule(effect_tick_interval, self.tick_status_effect, name)
+		effect_ticks[name](self, effect.level)
+		
+	def hunger_effect(self, level):
+		self.mod_food_exhaustion(0.05 * level)
+		
+	def poison_effect(self, level):
+		level = (level - 1) % 32 + 1
+		rate = max(1, 25 // 2**level)
+		amount = min(self.HP - 1, self.rng.round_stochastic(20 / rate)) #Poison reduces us to 1 HP but doesn't kill us
+		self.damage(amount, physical=False)
+		
+	def instant_damage(self, level):
+		self.damage(3 * 2**level, death_reason="Killed by magic", physical=False)
+		
+	def instant_health(self, level):
+		self.heal(2 * 2**level)
 		
 	def damage(self, amount, death_reason=None, physical=True):
 		if amount <= 0:
 			return
-		cprint(f"You take {amount} damage!", "red")
+		self.message(f"You take {amount} damage!", "red")
 		self.HP -= amount
+		if self.events is not None:
+			self.events.publish(events.DAMAGE, amount, self.HP, death_reason)
 		if physical:
 			self.mod_food_exhaustion(0.1)
 		if self.HP <= 0:
@@ -402,27 +760,32 @@ class Player:
 		self.print_health()
 		
 	def gain_exp(self, amount):
-		amount = round_stochastic(amount)
+		amount = self.rng.round_stochastic(amount)
 		if amount <= 0:
 			return
 		self.EXP += amount
-		print(f"+{amount} EXP")
+		self.message(f"+{amount} EXP")
 		old_level = self.level
-		while get_exp_required_for_level(self.level) <= self.EXP:
-			self.level += 1
+		self.level = max(old_level, level_for(self.EXP))
 		if self.level > old_level:
-			cprint(f"You have reached level {self.level}!", "green")
-		print(f"Current EXP: {self.EXP}/{get_exp_required_for_level(self.level)}")
+			self.message(f"You have reached level {self.level}!", "green")
+		if self.events is not None:
+			self.events.publish(events.EXP, amount, self.EXP, self.level)
+		self.message(f"Current EXP: {self.EXP}/{exp_required(self.level)}")
 		
 	def die(self, death_reason=None):
-		print("You died!")
+		self.dead = True
+		self.death_reason = death_reason
+		self.message("You died!")
 		if death_reason:
-			print(death_reason)
-		print(f"\nScore: {self.EXP}")
-		exit()
+			self.message(death_reason)
+		self.message(f"\nScore: {self.EXP}")
+		if self.events is not None:
+			self.events.publish(events.DEATH, death_reason, self.EXP, self.level)
+		raise PlayerDied(death_reason)
 		
 	def print_health(self):
-		print(f"HP: {self.HP}/20")
+		self.message(f"HP: {self.HP}/20")
 		
 	def heal(self, amount):
 		if amount <= 0:
@@ -431,7 +794,7 @@ class Player:
 		self.HP = min(self.HP + amount, 20)
 		healed_by = self.HP - old_hp
 		if healed_by > 0:
-			cprint(f"You are healed by {healed_by} HP.", "green")
+			self.message(f"You are healed by {healed_by} HP.", "green")
 			self.print_health()
 			return True
 		return False
@@ -442,9 +805,50 @@ class Player:
 			if (self.hunger == 20 or (self.hunger >= 18 and self.ticks % 8 == 0)) and self.heal(1):
 				self.mod_food_exhaustion(6)
 		if self.hunger <= 0 and self.ticks % 8 == 0:
-			cprint("You are starving!", "red")
+			self.message("You are starving!", "red")
 			self.damage(1, "Starved to death", False)
 		self.advance_time(0.5)
+		
+	def idle_ticks(self):
+		"Returns how many of the upcoming ticks are sure to leave HP and hunger alone, until a timer comes due"
+		if self.HP < 20 and self.hunger >= 18:
+			if self.hunger == 20:
+				return 0
+			idle = 7 - self.ticks % 8 #Ticks before the next one that's a multiple of 8
+		elif self.hunger <= 0:
+			idle = 7 - self.ticks % 8
+		else:
+			idle = math.inf
+		heap = self.timers.heap
+		if heap:
+			#A timer fires at the end of the tick that reaches it, and what it does might end the idle stretch
+			idle = min(idle, max(1, math.ceil((heap[0][0] - self.timers.now) / 0.5)))
+		return idle
+		
+	def fast_forward(self, ticks):
+		"""Does the same as calling tick() the given number of times, but skips over stretches where nothing happens,
+		so the cost depends on the number of heals, hunger changes and timers rather than the length of time
+		Each kind of day or night message is only reported once, for its last occurrence"""
+		start = len(self.messages)
+		end = self.ticks + ticks
+		while self.ticks < end:
+			idle = min(self.idle_ticks(), end - self.ticks)
+			if idle > 0:
+				self.ticks += idle
+				self.advance_time(0.5 * idle)
+			else:
+				self.tick()
+		world_messages = {message for _, message in world_events}
+		seen = set()
+		skipped = []
+		for i in range(len(self.messages) - 1, start - 1, -1):
+			text = self.messages[i][0]
+			if text in world_messages:
+				if text in seen:
+					skipped.append(i)
+				seen.add(text)
+		for i in skipped:
+			del self.messages[i]
 	
 	def mod_food_exhaustion(self, amount):
 		self.food_exhaustion += amount
@@ -459,18 +863,32 @@ class Player:
 	
 	def print_hunger(self):
 		if self.saturation == 0:
-			cprint(f"Hunger: {self.hunger}/20", "yellow")
+			self.message(f"Hunger: {self.hunger}/20", "yellow")
 		else:
-			print(f"Hunger: {self.hunger}/20")
+			self.message(f"Hunger: {self.hunger}/20")
 	
 	def add_item(self, item, amount=1):
 		if item in self.inventory:
 			self.inventory[item] += amount
 		else:
 			self.inventory[item] = amount
+		if self.craftable is not None:
+			self.update_craftable(item)
+		if self.journal is not None:
+			self.journal.add_item(item, amount)
 			
 	def add_tool(self, tool):
 		self.tools.append(tool)
+		if self.journal is not None:
+			self.journal.add_tool(tool)
+			
+	def remove_tool(self, tool):
+		index = self.tools.index(tool)
+		del self.tools[index]
+		if tool is self.curr_weapon:
+			self.curr_weapon = None
+		if self.journal is not None:
+			self.journal.remove_tool(index)
 			
 	def remove_item(self, item, amount):
 		if amount <= 0:
@@ -480,6 +898,10 @@ class Player:
 		self.inventory[item] -= amount
 		if self.inventory[item] <= 0:
 			del self.inventory[item]
+		if self.craftable is not None:
+			self.update_craftable(item)
+		if self.journal is not None:
+			self.journal.remove_item(item, amount)
 			
 	def armed(self):
 		return self.curr_weapon is not None
@@ -518,380 +940,1003 @@ class Player:
 			if not self.has_item(name, amount):
 				return False
 		return True	
+		
+	def max_crafts(self, recipe):
+		"Returns how many times in a row the player could make a recipe with their current items"
+		needed = {}
+		for name, amount in recipe.components:
+			needed[name] = needed.get(name, 0) + amount
+		return min((self.inventory.get(name, 0) // amount for name, amount in needed.items() if amount > 0), default=0)
+		
+	def craftable_recipes(self):
+		"Returns the set of names of the recipes the player has the components for"
+		if self.craftable is None or self.craftable_version != content_version:
+			load_content()
+			self.craftable = {name for name, recipe in recipes.items() if self.can_make_recipe(recipe)}
+			self.craftable_version = content_version
+		return self.craftable
+		
+	def update_craftable(self, item):
+		if self.craftable_version != content_version: #The recipes were reloaded, so start over next time it's needed
+			self.craftable = None
+			return
+		for name in recipe_uses.get(item, ()):
+			if self.can_make_recipe(recipes[name]):
+				self.craftable.add(name)
+			else:
+				self.craftable.discard(name)
 			
-	def decrement_tool_durability(self):
+	def decrement_tool_durability(self, amount=1):
 		tool = self.curr_weapon
 		if tool:
-			tool.durability -= 1
+			tool.durability -= amount
 			if tool.durability < 0:
-				cprint(f"Your {tool.name} is destroyed!", "red")
-				self.tools.remove(tool)
-				self.curr_weapon = None
+				self.message(f"Your {tool.name} is destroyed!", "red")
+				self.remove_tool(tool)
 			else:
-				print(f"Durability: {durability_message(tool.durability, tool.max_durability)}")
+				if self.journal is not None:
+					self.journal.tool_durability(self.tools.index(tool), tool.durability)
+				self.message(f"Durability: {durability_message(tool.durability, tool.max_durability)}")
 			
-	def switch_weapon_menu(self):
-		if len(self.tools) > 0:
-			options = [] 
-			for tool in self.tools:
-				options.append(f"{tool.name} - Durability {durability_message(tool.durability, tool.max_durability)}")
-			options.append("Unarmed")
-			print("Which weapon would you like to switch to?")
-			choice = choice_input(*options)
-			if choice == len(self.tools) + 1:
-				print("You decide to go unarmed")
-				self.curr_weapon = None
-			else:
-				weapon = self.tools[choice - 1]
-				print(f"You switch to your {weapon.name}")
-				self.curr_weapon = weapon
+	def weapon_options(self):
+		options = [] 
+		for tool in self.tools:
+			options.append(f"{tool.name} - Durability {durability_message(tool.durability, tool.max_durability)}")
+		options.append("Unarmed")
+		return options
+		
+	def switch_weapon(self, index):
+		"Switches to the tool at the given index in self.tools, or goes unarmed if index is None"
+		if index is None:
+			self.message("You decide to go unarmed")
+			self.curr_weapon = None
+		else:
+			weapon = self.tools[index]
+			self.message(f"You switch to your {weapon.name}")
+			self.curr_weapon = weapon
+		if self.journal is not None:
+			self.journal.switch_weapon(-1 if index is None else index)
 			
+	def count_fuel(self, fuel):
+		if fuel in self.inventory:
+			return self.inventory[fuel]
+		return sum(1 for tool in self.tools if tool.name == fuel)
+		
+	def use_fuel(self, fuel, amount):
+		if fuel in self.inventory:
+			self.remove_item(fuel, amount)
+		else:
+			for _ in range(amount):
+				self.remove_tool(next(tool for tool in self.tools if tool.name == fuel))
+		
+	def fuel_needed(self, count):
+		"Returns how many seconds of new fuel it would take to smelt count more items"
+		spare = self.furnace.spare_burn() if self.furnace is not None else 0
+		return max(0, count * smelt_time - spare)
+		
+	def queue_smelting(self, item, count, fuel, fuel_units):
+		"Puts items and fuel into the furnace, which must already be checked to be enough"
+		if self.furnace is None:
+			self.furnace = Furnace(self.timers.now)
+		furnace = self.furnace
+		furnace.update(self.timers.now)
+		self.remove_item(item, count)
+		if fuel_units > 0:
+			self.use_fuel(fuel, fuel_units)
+		furnace.add(item, count, fuel_units * fuels[fuel])
+		self.schedule_furnace()
+		if self.journal is not None:
+			self.journal.snapshot(self)
+		
+	def schedule_furnace(self):
+		furnace = self.furnace
+		if furnace.timer is not None:
+			self.timers.cancel(furnace.timer)
+		furnace.timer = self.timers.schedule(furnace.work_left(), self.furnace_finished) if furnace.jobs else None
+		
+	def furnace_finished(self):
+		self.furnace.timer = None
+		self.message("Your furnace has finished smelting")
+		self.collect_furnace()
+		
+	def collect_furnace(self):
+		"Moves everything the furnace has smelted so far into the inventory, returning what was collected"
+		furnace = self.furnace
+		if furnace is None:
+			return {}
+		furnace.update(self.timers.now)
+		collected = furnace.done
+		exp = furnace.exp
+		furnace.done = {}
+		furnace.exp = 0
+		for item, amount in collected.items():
+			self.add_item(item, amount)
+			self.message(f"You got {amount}x {item}")
+		if exp > 0:
+			self.gain_exp(exp)
+		if collected and self.journal is not None:
+			self.journal.snapshot(self)
+		return collected
+			
+#Status effects that act once when they're applied, and ones that act every effect_tick_interval seconds while they last
+instant_effects = {"Instant Damage": Player.instant_damage, "Instant Health": Player.instant_health}
+effect_ticks = {"Hunger": Player.hunger_effect, "Poison": Player.poison_effect}
+effect_tick_interval = 1
+
 class Tool:
+	"A tool in a player's inventory; only its durability is stored per tool, the rest is shared with its recipe's ToolData"
+	__slots__ = ("name", "data", "durability")
 	
-	def __init__(self, name, damage, durability, mining_mult, attack_speed):
+	def __init__(self, name, data: ToolData, durability=None):
 		self.name = name
-		self.damage = damage
-		self.durability = durability
-		self.max_durability = durability
-		self.mining_mult = mining_mult
-		self.attack_speed = attack_speed
+		self.data = data
+		self.durability = data.durability if durability is None else durability
+		
+	@property
+	def damage(self):
+		return self.data.damage
+		
+	@property
+	def max_durability(self):
+		return self.data.durability
+		
+	@property
+	def mining_mult(self):
+		return self.data.mining_mult
+		
+	@property
+	def attack_speed(self):
+		return self.data.attack_speed
 				
+durability_messages = {} #(durability, max durability) -> colored text, since the same few values come up every turn
+
 def durability_message(durability, max_durability):
-	durability_msg = f"{durability}/{max_durability}"
-	if durability <= max_durability // 4:
-		color = "red"
-	elif durability <= max_durability // 2:
-		color = "yellow"
-	else:
-		color = "green"
-	return colored(durability_msg, color)
+	key = (durability, max_durability)
+	message = durability_messages.get(key)
+	if message is None:
+		durability_msg = f"{durability}/{max_durability}"
+		if durability <= max_durability // 4:
+			color = "red"
+		elif durability <= max_durability // 2:
+			color = "yellow"
+		else:
+			color = "green"
+		message = durability_messages[key] = colored(durability_msg, color)
+	return message
 	
-def random_battle(player, night_mob, action_verb="exploring"):
-	if night_mob:
-		choices = night_mob_types
-	else:
-		choices = day_mob_types
-	mob = Mob.new_mob(choices.pick())
-	#mob = Mob.new_mob("Enderman")
-	if mob.name == "Baby Zombie" and one_in(20):
-		mob = Mob.new_mob("Chicken Jockey")
-	mob_name = mob.name.lower()
-	a_an = "an" if mob_name[0] in "aeiou" else "a"
-	print(f"You found {a_an} {mob_name} while {action_verb}{'!' if mob.behavior == MobBehaviorType.hostile else '.'}")
-	if mob.behavior == MobBehaviorType.hostile and not mob_name.endswith("creeper") and one_in(2):
-		cprint(f"The {mob_name} attacks you!", "red")
-		player.damage(mob.attack_strength)
-	if mob.name == "Chicken" and one_in(15):
-		print("You got 1x Egg")
-		player.add_item("Egg")
-	creeper_turn = 0
-	choice = choice_input("Attack", "Flee" if mob.behavior == MobBehaviorType.hostile else "Ignore")
-	if choice == 1:
-		if len(player.tools) > 0 and yes_no("Would you like to switch weapons?"):
-			player.switch_weapon_menu()
-		run = 0
-		while True:
-			if run > 0:
-				run -= 1
-				if run == 0:
-					print(f"The {mob_name} stops running.")
-			player.mod_food_exhaustion(0.1)
-			is_enderman = mob.name == "Enderman"
-			miss_chance = 5 if is_enderman else 10
-			if one_in(miss_chance):
-				if is_enderman:
-					print(f"You swing at the {mob_name} but it teleports away.")
+class Battle:
+	"A fight with a single mob, played out one round at a time"
+	__slots__ = ("player", "mob", "mob_name", "death_reason", "action_verb", "run", "creeper_turn", "rounds", "over")
+
+	def __init__(self, player, mob, action_verb="exploring"):
+		self.player = player
+		self.mob = mob
+		self.mob_name = mob.name.lower()
+		self.death_reason = f"Killed by {'an' if self.mob_name[0] in 'aeiou' else 'a'} {self.mob_name}"
+		self.action_verb = action_verb
+		self.run = 0
+		self.creeper_turn = 0
+		self.rounds = 0
+		self.over = False
+
+	@staticmethod
+	def random_encounter(player, night_mob, action_verb="exploring"):
+		if night_mob:
+			choices = night_mob_types
+		else:
+			choices = day_mob_types
+		mob = Mob.new_mob(choices.pick(player.rng))
+		#mob = Mob.new_mob("Enderman")
+		if mob.name == "Baby Zombie" and player.rng.one_in(20):
+			mob = Mob.new_mob("Chicken Jockey")
+		battle = Battle(player, mob, action_verb)
+		battle.encounter()
+		return battle
+
+	def encounter(self):
+		player = self.player
+		rng = player.rng
+		mob = self.mob
+		mob_name = self.mob_name
+		a_an = "an" if mob_name[0] in "aeiou" else "a"
+		player.message(f"You found {a_an} {mob_name} while {self.action_verb}{'!' if mob.behavior == MobBehaviorType.hostile else '.'}")
+		if mob.behavior == MobBehaviorType.hostile and not mob_name.endswith("creeper") and rng.one_in(2):
+			player.message(f"The {mob_name} attacks you!", "red")
+			player.damage(mob.attack_strength, self.death_reason)
+		if mob.name == "Chicken" and rng.one_in(15):
+			player.message("You got 1x Egg")
+			player.add_item("Egg")
+
+	def options(self):
+		if self.rounds == 0:
+			return ["Attack", "Flee" if self.mob.behavior == MobBehaviorType.hostile else "Ignore"]
+		return ["Attack", "Ignore" if self.mob.behavior == MobBehaviorType.passive else "Flee"]
+
+	def leave(self):
+		self.over = True
+
+	def attack(self):
+		"Plays out one round of combat and returns how long the round should take in real time"
+		player = self.player
+		rng = player.rng
+		mob = self.mob
+		mob_name = self.mob_name
+		self.rounds += 1
+		if self.run > 0:
+			self.run -= 1
+			if self.run == 0:
+				player.message(f"The {mob_name} stops running.")
+		player.mod_food_exhaustion(0.1)
+		is_enderman = mob.name == "Enderman"
+		miss_chance = 5 if is_enderman else 10
+		if rng.one_in(miss_chance):
+			if is_enderman:
+				player.message(f"You swing at the {mob_name} but it teleports away.")
+			else:
+				player.message(f"You swing at the {mob_name} but miss.")
+		elif self.run > 0 and not rng.one_in(3) and rng.x_in_y(1, player.attack_speed() + 1):
+			flee_miss_messages = [
+				"You try to attack the {} while it was fleeing, and miss.",
+				"You swing at the {}, but miss as it was running away too fast.",
+				"The {} was fleeing too quickly, you miss!",
+				"You swing at the {}, and miss narrowly.",
+				"You try to attack the {} while it was running away, and miss."
+			]
+			player.message(rng.choice(flee_miss_messages).format(mob_name))
+		else:
+			damage = player.attack_damage()
+			is_critical = rng.one_in(10)
+			base_damage = damage
+			if is_critical:
+				damage = int(damage * 1.5)
+				is_critical = is_critical and damage > base_damage
+			player.message(f"You attack the {mob_name}.{' Critical!' if is_critical else ''}") #TODO: Vary this message based on wielded weapon
+			player.decrement_tool_durability()
+			mob.damage(damage, player)
+			if mob.HP <= 0:
+				self.over = True
+				return 0
+			if mob.behavior == MobBehaviorType.passive:
+				if not rng.one_in(damage + 1) and self.run == 0:
+					player.message(f"The {mob_name} starts running away.")
+					self.run += rng.randint(3, 5)
+		attack_speed = player.attack_speed() #Attack speed controls the chance of being attacked by a mob when we attack
+		delay = rng.uniform(0.75, 1.25) / attack_speed
+		if mob_name.endswith("creeper"):
+			self.creeper_turn += 1
+			if self.creeper_turn > 2 and not rng.one_in(self.creeper_turn): #Increasing chance to explode after the first 2 turns
+				self.over = True
+				self.explode()
+				return delay
+			else:
+				player.message("The creeper flashes...")
+		elif mob.behavior != MobBehaviorType.passive and rng.x_in_y(1, attack_speed) and not rng.one_in(8): #I use x_in_y instead of one_in because x_in_y works with floats
+			player.message(f"The {mob_name} attacks you!")
+			player.damage(rng.round_stochastic(mob.attack_strength), self.death_reason)
+		player.tick()
+		return delay
+
+	def explode(self):
+		player = self.player
+		rng = player.rng
+		mob = self.mob
+		damage = max(rng.randint(1, mob.attack_strength) for _ in range(3)) #attack_strength defines explosion power for creepers
+		player.message("The creeper explodes!")
+		player.damage(damage, "Killed by a creeper's explosion")
+		explosion_power = 6 if mob.name == "Charged Creeper" else 3
+		if self.action_verb == "mining":
+			num = int((explosion_power * rng.uniform(0.75, 1.25)) ** 2) + 1
+			dropped = rng.binomial(num, 1, explosion_power)
+			found = explosion_drops.pick_many(dropped, rng)
+			if len(found) > 0:
+				player.message("You got the following items from the explosion:")
+				for item in found:
+					player.message(f"{found[item]}x {item}")
+					player.add_item(item, found[item])
+		else:
+			grass = rng.randint(explosion_power // 3, explosion_power) + 1
+			dirt = int((explosion_power * rng.uniform(0.75, 1.25)) ** 2) + 1
+			grass = rng.binomial(grass, 1, explosion_power)
+			dirt = rng.binomial(dirt, 1, explosion_power)
+			player.add_item("Dirt", dirt)
+			player.add_item("Grass", grass)
+			if grass > 0:
+				if dirt > 0:
+					player.message(f"You got {grass}x Grass and {dirt}x Dirt from the explosion")
 				else:
-					print(f"You swing at the {mob_name} but miss.")
-			elif run > 0 and not one_in(3) and x_in_y(1, player.attack_speed() + 1):
-				flee_miss_messages = [
-					"You try to attack the {} while it was fleeing, and miss.",
-					"You swing at the {}, but miss as it was running away too fast.",
-					"The {} was fleeing too quickly, you miss!",
-					"You swing at the {}, and miss narrowly.",
-					"You try to attack the {} while it was running away, and miss."
-				]
-				print(random.choice(flee_miss_messages).format(mob_name))
-			else:			
-				damage = player.attack_damage()
-				is_critical = one_in(10)
-				base_damage = damage
-				if is_critical:
-					damage = int(damage * 1.5)
-					is_critical = is_critical and damage > base_damage
-				print(f"You attack the {mob_name}.{' Critical!' if is_critical else ''}") #TODO: Vary this message based on wielded weapon
-				player.decrement_tool_durability()
-				mob.damage(damage, player)
-				if mob.HP <= 0:
-					break
-				if mob.behavior == MobBehaviorType.passive:
-					if not one_in(damage + 1) and run == 0:
-						print(f"The {mob_name} starts running away.")
-						run += random.randint(3, 5)
-			attack_speed = player.attack_speed() #Attack speed controls the chance of being attacked by a mob when we attack
-			time.sleep(random.uniform(0.75, 1.25) / attack_speed)
-			if mob_name.endswith("creeper"):
-				creeper_turn += 1
-				if creeper_turn > 2 and not one_in(creeper_turn): #Increasing chance to explode after the first 2 turns
-					damage = max(random.randint(1, mob.attack_strength) for _ in range(3)) #attack_strength defines explosion power for creepers
-					print("The creeper explodes!")
-					player.damage(damage, "Killed by a creeper's explosion")
-					explosion_power = 6 if mob.name == "Charged Creeper" else 3
-					if action_verb == "mining":
-						minables.add("Stone", 3000) #Explosions drop the block instead of the item
-						minables.add("Coal Ore", 124)
-						minables.add("Iron Ore", 72)
-						minables.add("Lapis Lazuli Ore", 3)
-						minables.add("Gold Ore", 7)
-						minables.add("Diamond Ore", 3)
-						num = int((explosion_power * random.uniform(0.75, 1.25)) ** 2) + 1
-						found = {}
-						for _ in range(num):
-							if one_in(explosion_power):
-								s = minables.pick()
-								if s in found:
-									found[s] += 1
-								else:
-									found[s] = 1
-						if len(found) > 0:
-							print("You got the following items from the explosion:")
-							for item in found:
-								print(f"{found[item]}x {item}")
-								player.add_item(item, found[item])
-					else:
-						grass = random.randint(explosion_power // 3, explosion_power) + 1
-						dirt = int((explosion_power * random.uniform(0.75, 1.25)) ** 2) + 1
-						grass = binomial(grass, 1, explosion_power)
-						dirt = binomial(dirt, 1, explosion_power)
-						player.add_item("Dirt", dirt)
-						player.add_item("Grass", grass)
-						if grass > 0:
-							if dirt > 0:
-								print(f"You got {grass}x Grass and {dirt}x Dirt from the explosion")
-							else:
-								print(f"You got {grass}x Grass from the explosion")
-						elif dirt > 0:
-							print(f"You got {dirt}x Dirt from the explosion")
-					break
+					player.message(f"You got {grass}x Grass from the explosion")
+			elif dirt > 0:
+				player.message(f"You got {dirt}x Dirt from the explosion")
+
+class ActionResult:
+	"""The outcome of a single GameSession step
+	messages is a list of (text, color, attrs) tuples, and delay is how many seconds
+	the client should pause for pacing; the engine itself never sleeps"""
+	__slots__ = ("action", "ok", "messages", "delay", "data", "battle", "dead")
+
+	def __init__(self, action):
+		self.action = action
+		self.ok = True
+		self.messages = []
+		self.delay = 0
+		self.data = {}
+		self.battle = None
+		self.dead = False
+
+class GameSession:
+	"Runs the game rules for one player without touching stdin, stdout or the real clock"
+	__slots__ = ("player", "battle", "turn_started", "stats")
+
+	def __init__(self, player=None, seed=None, stats=None):
+		load_content()
+		self.player = player or Player(RNG(seed))
+		self.battle = None
+		self.turn_started = False
+		self.stats = stats #A stats.Stats to time each step with, if any
+
+	@property
+	def over(self):
+		return self.player.dead
+
+	def _step(self, action, func, *args, kind="turn"):
+		"""Runs one step of the game and collects its output
+		kind is "turn" for main menu actions, "battle" for battle actions, or "any" for steps allowed at any time"""
+		result = ActionResult(action)
+		if staged_content is not None:
+			apply_staged_content()
+		if self.player.dead:
+			result.ok = False
+			self.player.message("You are dead")
+		elif kind == "battle" and self.battle is None:
+			result.ok = False
+			self.player.message("You are not in a battle")
+		elif kind == "turn" and self.battle is not None:
+			result.ok = False
+			self.player.message("You can't do that during a battle")
+		else:
+			stats = self.stats
+			try:
+				if kind == "turn":
+					if not self.turn_started: #Every turn of the game loop ticks the player once
+						if stats is None:
+							self.player.tick()
+						else:
+							stats.run("tick", self.player.tick)
+					self.turn_started = False
+				if stats is None:
+					ok = func(result, *args)
 				else:
-					print("The creeper flashes...")
-			elif mob.behavior != MobBehaviorType.passive and x_in_y(1, attack_speed) and not one_in(8): #I use x_in_y instead of one_in because x_in_y works with floats
-				print(f"The {mob_name} attacks you!")
-				player.damage(round_stochastic(mob.attack_strength))
-			player.tick()
-			choice = choice_input("Attack", "Ignore" if mob.behavior == MobBehaviorType.passive else "Flee")
-			if choice == 2:
-				return
-				
-splashes = open("splashes.txt").read().splitlines()
-
-print("MINCERAFT" if one_in(10000) else "MINECRAFT") #An extremely rare easter egg
-cprint(random.choice(splashes), "yellow", attrs=["bold"])
-print()
-choice = choice_input("Play", "Quit")
-if choice == 2:
-	exit()
-	
-player = Player()
-
-while True:
-	player.tick()
-	if player.time.is_night():
-		print("It is currently nighttime")
-	player.print_health()
-	player.print_hunger()
-	if player.curr_weapon:
-		weapon = player.curr_weapon
-		print(f"Current weapon: {player.curr_weapon.name} - Durability {durability_message(weapon.durability, weapon.max_durability)}")
-	options = ["Explore", "Inventory", "Craft"]
-	if len(player.tools) > 0:
-		options.append("Switch Weapon")
-	foods_in_inv = list(filter(lambda item: item in foods, player.inventory))
-	if foods_in_inv:
-		options.append("Eat")
-	has_pickaxe = any("Pickaxe" in tool.name for tool in player.tools)
-	if has_pickaxe:
-		options.append("Mine")
-	if player.has_item("Furnace"):
-		options.append("Smelt")
-	choice = choice_input(*options, return_text=True)
-	if choice == "Explore":
-		print("You explore for a while.")
-		time_explore = random.randint(15, 20)
-		time.sleep(time_explore / 20)
+					ok = stats.run(action, func, result, *args)
+				result.ok = ok is not False
+			except PlayerDied:
+				result.dead = True
+				self.battle = None
+			if self.player.journal is not None:
+				self.player.journal.end_step(self.player)
+			if stats is not None:
+				stats.record_pacing(action, result.delay)
+			if self.battle is not None and self.battle.over:
+				self.battle = None
+		result.battle = self.battle
+		result.messages = self.player.take_messages()
+		return result
+
+	def _start_battle(self, night_mob, action_verb="exploring"):
+		self.battle = Battle.random_encounter(self.player, night_mob, action_verb)
+
+	def start_turn(self):
+		"Ticks the player and reports their status, like the top of each turn in the game loop"
+		self.turn_started = False
+		result = self._step("start_turn", self._start_turn)
+		self.turn_started = not result.dead and result.ok
+		return result
+
+	def _start_turn(self, result):
+		player = self.player
+		if player.time.is_night():
+			player.message("It is currently nighttime")
+		player.print_health()
+		player.print_hunger()
+		if player.curr_weapon:
+			weapon = player.curr_weapon
+			player.message(f"Current weapon: {weapon.name} - Durability {durability_message(weapon.durability, weapon.max_durability)}")
+		result.data["options"] = self.options()
+
+	def options(self):
+		player = self.player
+		if self.battle is not None:
+			return self.battle.options()
+		options = ["Explore", "Inventory", "Craft"]
+		if len(player.tools) > 0:
+			options.append("Switch Weapon")
+		if self.edible_foods():
+			options.append("Eat")
+		has_pickaxe = any("Pickaxe" in tool.name for tool in player.tools)
+		if has_pickaxe:
+			options.append("Mine")
+		if player.has_item("Furnace"):
+			options.append("Smelt")
+		return options
+
+	def explore(self):
+		return self._step("explore", self._explore)
+
+	def _explore(self, result):
+		player = self.player
+		rng = player.rng
+		player.message("You explore for a while.")
+		time_explore = rng.randint(15, 20)
+		result.delay = time_explore / 20
 		player.mod_food_exhaustion(0.001 * time_explore)
 		player.advance_time(time_explore)
 		mob_chance = 3 if player.time.is_night() else 8
-		if one_in(mob_chance):
-			random_battle(player, player.time.is_night())
-		elif x_in_y(3, 5):
+		if rng.one_in(mob_chance):
+			self._start_battle(player.time.is_night())
+		elif rng.x_in_y(3, 5):
 			explore_finds = [("Grass", 8), ("Dirt", 1), ("Wood", 4)]
 			choices = [val[0] for val in explore_finds]
 			weights = [val[1] for val in explore_finds]
-			found = random.choices(choices, weights=weights)[0]
-			print(f"You found 1x {found}")
+			found = rng.weighted_choice(choices, weights)
+			player.message(f"You found 1x {found}")
 			player.add_item(found)
-	elif choice == "Inventory":
+			result.data["found"] = {found: 1}
+
+	def inventory(self):
+		return self._step("inventory", self._inventory)
+
+	def _inventory(self, result):
+		player = self.player
 		if len(player.inventory) == 0:
-			print("There is nothing in your inventory")
+			player.message("There is nothing in your inventory")
 		else:
-			print("Your inventory:")
+			player.message("Your inventory:")
 			for item in player.inventory:
-				print(f"{player.inventory[item]}x {item}")
-			print("Your tools:")
+				player.message(f"{player.inventory[item]}x {item}")
+			player.message("Your tools:")
 			for index, tool in enumerate(player.tools):
-				print(f"{index+1}. {tool.name} - Durability {tool.durability}/{tool.max_durability}")
-	elif choice == "Craft":
-		craftable = []
-		for recipe in recipes:
-			info = recipes[recipe]
-			if player.can_make_recipe(info):
-				craftable.append((recipe, recipes[recipe]))
-		if len(craftable) == 0:
-			print("There are no items that you have the components to craft")
+				player.message(f"{index+1}. {tool.name} - Durability {tool.durability}/{tool.max_durability}")
+		result.data["inventory"] = dict(player.inventory)
+		result.data["tools"] = [(tool.name, tool.durability, tool.max_durability) for tool in player.tools]
+
+	def craftable(self):
+		"Returns a list of (name, recipe) pairs that the player has the components for, in the order of recipes.json"
+		return [(name, recipes[name]) for name in sorted(self.player.craftable_recipes(), key=recipe_order.get)]
+
+	def max_crafts(self, item_name):
+		"Returns how many times in a row the player could craft an item, e.g. for a craft max option"
+		if item_name not in self.player.craftable_recipes():
+			return 0
+		return self.player.max_crafts(recipes[item_name])
+
+	def craft(self, item_name, times=1):
+		return self._step("craft", self._craft, item_name, times)
+
+	def _craft(self, result, item_name, times):
+		player = self.player
+		if item_name not in player.craftable_recipes():
+			player.message("Invalid item")
+			return False
+		info = recipes[item_name]
+		if times < 1 or times > player.max_crafts(info):
+			player.message(f"You don't have the components to craft that {times} times")
+			return False
+		result.data["crafted"] = {item_name: self._make(item_name, info, times)}
+
+	def _make(self, item_name, info, times):
+		"Crafts a recipe the given number of times, once the components have been checked, and returns how many items were made"
+		player = self.player
+		for name, amount in info.components:
+			player.remove_item(name, amount * times)
+		quantity = info.quantity * times
+		if info.tool_data is not None:
+			for _ in range(times):
+				player.add_tool(Tool(item_name, info.tool_data))
 		else:
-			print("Items you can craft:")
-			for item in craftable:
-				name, info = item
-				quantity = info.quantity
-				string = f"{quantity}x {name} | Components: "
-				components = info.components
-				string += ", ".join(f"{c[1]}x {c[0]}" for c in components)
-				print(string)
-				print()		
-			print("What would you like to craft?")
-			item_name = input()
-			item = next((v for v in craftable if v[0] == item_name), None)
-			if item is not None:
-				name, info = item
-				components = info.components
-				quantity = info.quantity
-				for component in components:
-					player.remove_item(*component)
-				if info.tool_data is not None:
-					tool_data = info.tool_data
-					damage = tool_data.damage
-					durability = tool_data.durability
-					mining_mult = tool_data.mining_mult
-					attack_speed = tool_data.attack_speed
-					player.add_tool(Tool(name, damage, durability, mining_mult, attack_speed))
-				else:
-					player.add_item(name, quantity)
-				print(f"You have crafted {quantity}x {name}")
-			else:
-				print("Invalid item")
-	elif choice == "Switch Weapon":
-		player.switch_weapon_menu()
-	elif choice == "Eat":
-		choices = foods_in_inv + ["Cancel"]
-		print("Which food would you like to eat?")
-		num = choice_input(*choices)
-		if num <= len(foods_in_inv):
-			 food = foods_in_inv[num - 1]
-			 player.remove_item(food, 1)
-			 print(f"You eat the {food}.")
-			 saturation = foods[food]["saturation"]
-			 hunger = foods[food]["hunger"]
-			 player.restore_hunger(hunger, saturation)
-	elif choice == "Mine":
-		if player.curr_weapon and "Pickaxe" in player.curr_weapon.name:
-			tiers = ["Wooden Pickaxe", "Stone Pickaxe", "Iron Pickaxe"]
-			tier_num = tiers.index(player.curr_weapon.name) + 1
-			minables = WeightedList()
-			minables.add("Stone", 1500)
-			minables.add("Coal", 124)
-			if tier_num > 1:
-				minables.add("Raw Iron", 72)
-				minables.add("Lapis Lazuli", 3)
-				if tier_num > 2:
-					minables.add("Raw Gold", 7)
-					minables.add("Diamond", 3)
-			found = minables.pick()
-			if found == "Coal":
-				exp_gain = random.randint(0, 2)
-			elif found == "Lapis Lazuli":
-				exp_gain = random.randint(2, 5)
-			elif found == "Diamond":
-				exp_gain = random.randint(3, 7)
-			else:
-				exp_gain = 0
-			if found == "Lapis Lazuli":
-				quantity = random.randint(4, 9)
-			else:
-				quantity = 1
-			print("Mining...")
-			time.sleep(random.uniform(0.75, 1.5))
-			mine_mult = player.curr_weapon.mining_mult
-			mob_chance = 10 if player.time.is_night() else 15
-			mob_chance *= math.sqrt(mine_mult)
-			mob_chance = round(mob_chance)
-			if found == "Stone" and one_in(3):
-				print("You didn't find much of value")
-				player.advance_time(3)
+			player.add_item(item_name, quantity)
+		player.message(f"You have crafted {quantity}x {item_name}")
+		if player.events is not None:
+			player.events.publish(events.CRAFT, item_name, quantity)
+		return quantity
+
+	def plan_craft(self, item_name, times=1):
+		"Returns a CraftPlan for crafting an item along with everything it needs, from the player's current items"
+		load_content()
+		return recipe_graph.plan(item_name, times, self.player.inventory)
+
+	def craft_all(self, item_name, times=1):
+		"Crafts an item and every intermediate item it needs as one action"
+		return self._step("craft", self._craft_all, item_name, times)
+
+	def _craft_all(self, result, item_name, times):
+		player = self.player
+		if item_name not in recipes or times < 1:
+			player.message("Invalid item")
+			return False
+		plan = self.plan_craft(item_name, times)
+		result.data["missing"] = plan.missing
+		if not plan.ok:
+			player.message("You are missing:")
+			for item, amount in plan.missing.items():
+				player.message(f"{amount}x {item}")
+			return False
+		crafted = {}
+		for name, count in plan.crafts:
+			crafted[name] = self._make(name, recipes[name], count)
+		result.data["crafted"] = crafted
+
+	def switch_weapon(self, index):
+		return self._step("switch_weapon", self._switch_weapon, index, kind="any")
+
+	def _switch_weapon(self, result, index):
+		if index is not None and not 0 <= index < len(self.player.tools):
+			self.player.message("Invalid weapon")
+			return False
+		self.player.switch_weapon(index)
+
+	def edible_foods(self):
+		return list(filter(lambda item: item in foods, self.player.inventory))
+
+	def eat(self, food):
+		return self._step("eat", self._eat, food)
+
+	def _eat(self, result, food):
+		player = self.player
+		if food not in foods or not player.has_item(food):
+			player.message(f"You don't have any {food} to eat")
+			return False
+		player.remove_item(food, 1)
+		player.message(f"You eat the {food}.")
+		saturation = foods[food]["saturation"]
+		hunger = foods[food]["hunger"]
+		player.restore_hunger(hunger, saturation)
+
+	def mine(self):
+		return self._step("mine", self._mine)
+
+	def _mine(self, result):
+		player = self.player
+		rng = player.rng
+		if not (player.curr_weapon and "Pickaxe" in player.curr_weapon.name):
+			player.message("You need to switch to your pickaxe to mine")
+			return False
+		found = mining_tables[player.curr_weapon.name].pick(rng)
+		exp_gain = rng.randint(*mining_exp[found]) if found in mining_exp else 0
+		quantity = rng.randint(*mining_quantity[found]) if found in mining_quantity else 1
+		player.message("Mining...")
+		result.delay = rng.uniform(0.75, 1.5)
+		mine_mult = player.curr_weapon.mining_mult
+		mob_chance = 10 if player.time.is_night() else 15
+		mob_chance *= math.sqrt(mine_mult)
+		mob_chance = round(mob_chance)
+		if found == "Stone" and rng.one_in(3):
+			player.message("You didn't find much of value")
+			player.advance_time(3)
+		else:
+			player.message(f"You found {quantity}x {found}")
+			player.gain_exp(exp_gain)
+			player.add_item(found, quantity)
+			result.data["found"] = {found: quantity}
+			player.mod_food_exhaustion(0.005)
+			if found == "Stone":
+				base_mine_time = 1.5
 			else:
-				print(f"You found {quantity}x {found}")
-				player.gain_exp(exp_gain)
-				player.add_item(found, quantity)
-				player.mod_food_exhaustion(0.005)
-				if found == "Stone":
-					base_mine_time = 1.5
-				else:
-					base_mine_time = 3
-				mine_time = round(base_mine_time / mining_mult, 2)
-				player.advance_time(mine_time)
-				player.decrement_tool_durability()
-			if one_in(mob_chance):
-				random_battle(player, True, "mining")
+				base_mine_time = 3
+			mine_time = round(base_mine_time / mine_mult, 2)
+			player.advance_time(mine_time)
+			player.decrement_tool_durability()
+		if rng.one_in(mob_chance):
+			self._start_battle(True, "mining")
+
+	def mine_many(self, blocks):
+		"""Mines up to the given number of blocks as one action, stopping early if a mob shows up or the pickaxe breaks
+		The outcome has the same distribution as mining one block at a time, but takes a fixed number of random draws"""
+		return self._step("mine", self._mine_many, blocks)
+
+	def _mine_many(self, result, blocks):
+		player = self.player
+		rng = player.rng
+		pickaxe = player.curr_weapon
+		if not (pickaxe and "Pickaxe" in pickaxe.name):
+			player.message("You need to switch to your pickaxe to mine")
+			return False
+		if blocks < 1:
+			player.message("Invalid number of blocks")
+			return False
+		table = mining_tables[pickaxe.name]
+		mine_mult = pickaxe.mining_mult
+		mob_chance = round((10 if player.time.is_night() else 15) * math.sqrt(mine_mult))
+		#A third of the stone finds turn up nothing, and those don't wear the pickaxe
+		weights = [weight * 2 / 3 if item == "Stone" else weight for item, weight in zip(table.choices, table.weights)]
+		productive_chance = sum(weights) / sum(table.weights)
+		#Each block ends in a mob encounter with a chance of 1/mob_chance, and the pickaxe breaks on its (durability + 1)th productive block
+		encounter = rng.geometric(1 / max(mob_chance, 1))
+		lives = pickaxe.durability + 1
+		unproductive = rng.negative_binomial(lives, productive_chance)
+		breaks = lives + unproductive
+		mined = min(blocks, encounter, breaks)
+		if mined == breaks:
+			productive = lives
+		else: #Given where the pickaxe would break, the first mined blocks are a random draw from the ones before that
+			productive = rng.hypergeometric(lives - 1, unproductive, mined)
+		found = {}
+		exp_gain = 0
+		for item, count in zip(table.choices, rng.multinomial(productive, weights)):
+			if count == 0:
+				continue
+			if item in mining_exp:
+				exp_gain += int(sum(rng.randint(*mining_exp[item], size=count)))
+			found[item] = int(sum(rng.randint(*mining_quantity[item], size=count))) if item in mining_quantity else count
+		player.message(f"Mining {mined} blocks...")
+		result.delay = rng.uniform(0.75, 1.5)
+		if mined > productive:
+			player.message(f"You didn't find much of value in {mined - productive} of them")
+		if found:
+			player.message("You found:")
+			for item, amount in found.items():
+				player.message(f"{amount}x {item}")
+				player.add_item(item, amount)
+		result.data["found"] = found
+		result.data["mined"] = mined
+		if exp_gain > 0:
+			player.gain_exp(exp_gain)
+		exhaustion = 0.005 * productive
+		while exhaustion > 1e-9: #In steps, since each time exhaustion reaches 4 it lowers hunger once and starts over
+			step = min(exhaustion, max(4 - player.food_exhaustion, 0.005))
+			player.mod_food_exhaustion(step)
+			exhaustion -= step
+		stone = found.get("Stone", 0)
+		player.advance_time(3 * (mined - productive) + round(1.5 / mine_mult, 2) * stone + round(3 / mine_mult, 2) * (productive - stone))
+		if mined > 1:
+			player.fast_forward(mined - 1) #The turns that mining each block separately would have taken
+		if productive > 0:
+			player.decrement_tool_durability(productive)
+		if mined == encounter:
+			self._start_battle(True, "mining")
+
+	def smelting_options(self):
+		"Returns (smeltable, fuels, can_smelt, available_fuels) for the player's current inventory"
+		load_content()
+		player = self.player
+		can_smelt = [item for item in player.inventory if item in smeltable]
+		available_fuels = [fuel for fuel in fuels if player.count_fuel(fuel) > 0]
+		return smeltable, fuels, can_smelt, available_fuels
+
+	def smelt(self, item, fuel, count=1):
+		"Queues items in the player's furnace, which smelts them in the background as the game goes on"
+		return self._step("smelt", self._smelt, item, fuel, count)
+
+	def _smelt(self, result, smelted, source, count):
+		player = self.player
+		smeltable, fuels, can_smelt, all_sources = self.smelting_options()
+		if smelted not in can_smelt:
+			player.message(f"You don't have any {smelted} to smelt")
+			return False
+		if count < 1 or not player.has_item(smelted, count):
+			player.message(f"You don't have {count}x {smelted} to smelt")
+			return False
+		need = player.fuel_needed(count)
+		units = 0
+		if need > 0:
+			if source not in fuels:
+				player.message(f"You can't use {source} as fuel")
+				return False
+			units = math.ceil(need / fuels[source])
+			if player.count_fuel(source) < units:
+				player.message(f"You need {units}x {source} to smelt {count}x {smelted}")
+				return False
+		player.queue_smelting(smelted, count, source, units)
+		if player.events is not None:
+			player.events.publish(events.SMELT, smelted, count, source, units)
+		player.message(f"You put {count}x {smelted} in the furnace")
+		result.data["queued"] = {smelted: count}
+		result.data["fuel_used"] = {source: units} if units else {}
+		result.data["ready_in"] = player.furnace.work_left()
+
+	def max_smelts(self, item, fuel):
+		"Returns the most of an item that can be smelted with the player's items and the given fuel"
+		load_content()
+		player = self.player
+		if item not in smeltable or fuel not in fuels:
+			return 0
+		spare = player.furnace.spare_burn() if player.furnace is not None else 0
+		return min(player.inventory.get(item, 0), int((spare + player.count_fuel(fuel) * fuels[fuel]) // smelt_time))
+
+	def furnace_status(self):
+		"Returns (jobs, done, seconds_left) for the player's furnace"
+		furnace = self.player.furnace
+		if furnace is None:
+			return [], {}, 0
+		furnace.update(self.player.timers.now)
+		return [tuple(job) for job in furnace.jobs], dict(furnace.done), furnace.work_left()
+
+	def collect_furnace(self):
+		return self._step("collect_furnace", self._collect_furnace, kind="any")
+
+	def _collect_furnace(self, result):
+		collected = self.player.collect_furnace()
+		if not collected:
+			self.player.message("There's nothing to collect from the furnace")
+		result.data["found"] = collected
+
+	def battle_action(self, action):
+		"Takes a turn in the current battle; action is either 'attack' or 'leave' (flee/ignore)"
+		return self._step("battle", self._battle_action, action, kind="battle")
+
+	def _battle_action(self, result, action):
+		if action == "attack":
+			result.delay = self.battle.attack()
+		elif action in ("leave", "flee", "ignore"):
+			self.battle.leave()
 		else:
-			print("You need to switch to your pickaxe to mine")
-	elif choice == "Smelt":
-		smeltable = {
-			"Raw Iron": ("Iron Ingot", 0.7),
-			"Iron Ore": ("Iron Ingot", 0.7),
-			"Coal Ore": ("Coal", 0.1),
-			"Raw Mutton": ("Cooked Mutton", 0.35),
-			"Raw Porkchop": ("Cooked Porkchop", 0.35),
-			"Raw Chicken": ("Cooked Chicken", 0.35)
-		}
-		fuel_sources = {
-			"Coal": 80,
-			"Wooden Pickaxe": 10,
-			"Wooden Sword": 10
-		}
-		item_sources = list(filter(lambda item: item in player.inventory, fuel_sources))
-		tool_sources = list(filter(lambda tool: any(t.name == tool for t in player.tools), fuel_sources))
-		if player.has_any_item(item_sources) or player.has_any_tool(tool_sources):
-			can_smelt = list(filter(lambda item: item in smeltable, player.inventory))
-			if can_smelt:
-				print("Smelt which item?")
-				strings = list(map(lambda s: f"{s} -> {smeltable[s][0]}", can_smelt))
-				strings.append("Cancel")
-				choice = choice_input(*strings)
-				if choice <= len(can_smelt):
-					smelted = can_smelt[choice - 1]
-					smelt_into, exp = smeltable[smelted]
-					print("Which fuel source to use?")
-					all_sources = item_sources + tool_sources
-					choice = choice_input(*all_sources)
-					source = all_sources[choice - 1]
-					dur = fuel_sources[source]
-					is_tool = source in tool_sources
-					print("Smelting...")
-					time.sleep(dur / 10)
-					player.advance_time(dur)
-					if is_tool:
-						tool = next((t for t in player.tools if t.name == source), None)
-						if tool is not None:
-							player.tools.remove(tool)
-						else:
-							cprint("Could not find the tool to remove; this shouldn't happen", "yellow")
-					else:
-						player.remove_item(source, 1)
-					player.remove_item(smelted, 1)
-					player.add_item(smelt_into)
-					print(f"You got 1x {smelt_into}")
-					player.gain_exp(exp)
+			self.player.message(f"Unknown battle action {action!r}")
+			return False
+
+class GameOver(Exception):
+	"Raised by the menus once a client's game has ended"
+	pass
+
+class TerminalClient:
+	"Plays the game on stdin and stdout, writing out each turn's output at once when it asks for input"
+	
+	def __init__(self, output="text"):
+		self.out = Renderer(output, colored)
+	
+	def write(self, text="", color=None, attrs=None):
+		self.out.line(text, color, attrs)
+		
+	def flush(self):
+		text = self.out.take()
+		if text:
+			sys.stdout.write(text)
+			sys.stdout.flush()
+		
+	async def input(self, prompt=""):
+		try:
+			return input(self.out.prompt(prompt)) #Blocking is fine here, since the terminal only ever runs one session
+		except EOFError:
+			raise GameOver()
+			
+	async def sleep(self, secs):
+		self.flush()
+		await asyncio.sleep(secs)
+
+splashes = None
+
+def random_splash():
+	global splashes
+	if splashes is None:
+		with open(os.path.join(content_dir, "splashes.txt")) as f:
+			splashes = f.read().splitlines()
+	return random.choice(splashes)
+
+async def show(client, result):
+	client.out.result(result)
+	if result.delay > 0:
+		await client.sleep(result.delay)
+	if result.dead:
+		raise GameOver()
+
+async def switch_weapon_menu(client, session):
+	player = session.player
+	if len(player.tools) > 0:
+		client.write("Which weapon would you like to switch to?")
+		choice = await choice_input(client, *player.weapon_options())
+		await show(client, session.switch_weapon(None if choice == len(player.tools) + 1 else choice - 1))
+
+async def battle_menu(client, session):
+	first = True
+	while session.battle is not None:
+		choice = await choice_input(client, *session.battle.options())
+		if choice == 1:
+			if first and len(session.player.tools) > 0 and await yes_no(client, "Would you like to switch weapons?"):
+				await switch_weapon_menu(client, session)
+			await show(client, session.battle_action("attack"))
+		else:
+			await show(client, session.battle_action("leave"))
+		first = False
+
+async def craft_menu(client, session):
+	craftable = session.craftable()
+	if len(craftable) == 0:
+		client.write("There are no items that you have the components to craft")
+	else:
+		client.write("Items you can craft:")
+		for item in craftable:
+			name, info = item
+			quantity = info.quantity
+			string = f"{quantity}x {name} | Components: "
+			components = info.components
+			string += ", ".join(f"{c[1]}x {c[0]}" for c in components)
+			client.write(string)
+			client.write()
+		client.write("What would you like to craft?")
+		name = await client.input()
+		if name in recipes and name not in session.player.craftable_recipes():
+			plan = session.plan_craft(name)
+			if plan.ok:
+				steps = ", then ".join(step for step, _ in plan.crafts)
+				if await yes_no(client, f"You can make this by crafting {steps}. Craft all of them?"):
+					await show(client, session.craft_all(name))
 			else:
-				print("You don't have anything to smelt")
+				client.write("To craft this, you are missing " + ", ".join(f"{amount}x {item}" for item, amount in plan.missing.items()))
+			return
+		most = session.max_crafts(name)
+		times = 1
+		if most > 1:
+			answer = (await client.input(f"How many times? (1-{most}, or max) ")).strip().lower()
+			if answer == "max":
+				times = most
+			elif answer.isdigit():
+				times = int(answer)
+		await show(client, session.craft(name, times))
+
+async def eat_menu(client, session):
+	foods_in_inv = session.edible_foods()
+	choices = foods_in_inv + ["Cancel"]
+	client.write("Which food would you like to eat?")
+	num = await choice_input(client, *choices)
+	if num <= len(foods_in_inv):
+		await show(client, session.eat(foods_in_inv[num - 1]))
+
+async def smelt_menu(client, session):
+	jobs, done, seconds_left = session.furnace_status()
+	if jobs:
+		client.write("In the furnace: " + ", ".join(f"{count}x {item}" for item, count in jobs) + f" ({seconds_left:.0f}s left)")
+	if done:
+		client.write("Ready to collect: " + ", ".join(f"{count}x {item}" for item, count in done.items()))
+		if await yes_no(client, "Collect them?"):
+			await show(client, session.collect_furnace())
+	smeltable, fuels, can_smelt, all_sources = session.smelting_options()
+	if all_sources:
+		if can_smelt:
+			client.write("Smelt which item?")
+			strings = list(map(lambda s: f"{s} -> {smeltable[s][0]}", can_smelt))
+			strings.append("Cancel")
+			choice = await choice_input(client, *strings)
+			if choice <= len(can_smelt):
+				smelted = can_smelt[choice - 1]
+				client.write("Which fuel source to use?")
+				choice = await choice_input(client, *all_sources)
+				fuel = all_sources[choice - 1]
+				most = session.max_smelts(smelted, fuel)
+				count = 1
+				if most > 1:
+					answer = (await client.input(f"How many? (1-{most}, or max) ")).strip().lower()
+					if answer == "max":
+						count = most
+					elif answer.isdigit():
+						count = int(answer)
+				await show(client, session.smelt(smelted, fuel, count))
 		else:
-			print("You need a fuel source to smelt items")
\ No newline at end of file
+			client.write("You don't have anything to smelt")
+	else:
+		client.write("You need a fuel source to smelt items")
+
+def show_stats(client, stats):
+	if client.out.mode == "json":
+		client.out.event({"event": "stats", **stats.summary()})
+	else:
+		for line in stats.report().splitlines():
+			client.write(line)
+
+async def play(client, session=None, commands=None):
+	"""Runs the title screen and the game loop for one client, returning the session once the game ends
+	commands maps words that can be typed at the main menu to functions to call, as with choice_input()"""
+	client.write("MINCERAFT" if one_in(10000) else "MINECRAFT") #An extremely rare easter egg
+	client.write(random_splash(), "yellow", attrs=["bold"])
+	client.write()
+	choice = await choice_input(client, "Play", "Quit")
+	if choice == 2:
+		return None
+	if session is None:
+		session = GameSession()
+	commands = dict(commands or {})
+	if session.stats is not None: #A typed command rather than a menu option, so that the numbered choices are the same either way
+		commands["stats"] = lambda: show_stats(client, session.stats)
+	try:
+		while True:
+			result = session.start_turn()
+			await show(client, result)
+			choice = await choice_input(client, *result.data["options"], return_text=True, commands=commands)
+			if choice == "Explore":
+				await show(client, session.explore())
+			elif choice == "Inventory":
+				await show(client, session.inventory())
+			elif choice == "Craft":
+				await craft_menu(client, session)
+			elif choice == "Switch Weapon":
+				await switch_weapon_menu(client, session)
+			elif choice == "Eat":
+				await eat_menu(client, session)
+			elif choice == "Mine":
+				answer = (await client.input("How many blocks? (default 1) ")).strip()
+				if answer.isdigit() and int(answer) > 1:
+					await show(client, session.mine_many(int(answer)))
+				else:
+					await show(client, session.mine())
+			elif choice == "Smelt":
+				await smelt_menu(client, session)
+			await battle_menu(client, session)
+	except GameOver:
+		pass
+	return session
+
+def main():
+	parser = argparse.ArgumentParser(description="A text-based RPG game based on Minecraft")
+	parser.add_argument("--serve", action="store_true", help="host the game for TCP/telnet clients instead of playing in this terminal")
+	parser.add_argument("--host", default="127.0.0.1", help="address to listen on with --serve (default: %(default)s)")
+	parser.add_argument("--port", type=int, default=25565, help="port to listen on with --serve (default: %(default)s)")
+	parser.add_argument("--store", metavar="FILE", help="with --serve, save players to this file so they can come back to their game")
+	parser.add_argument("--workers", metavar="N", type=int, nargs="?", const=os.cpu_count(), help="with --serve, spread the players over N worker processes (default N: the number of cores)")
+	parser.add_argument("--events", metavar="FILE", help="write gameplay telemetry, like damage taken, drops and crafts, to this file")
+	parser.add_argument("--events-format", choices=events.formats, default="jsonl", help="jsonl for one event per line, or columns for one line per event type per batch (default: %(default)s)")
+	parser.add_argument("--output", choices=output_modes, default="text", help="text, plain (no colors), quiet (menus and prompts only), json events for automated clients, or none (default: %(default)s)")
+	parser.add_argument("--stats", action="store_true", help="time each step of the game; type stats at the main menu to see the timings")
+	parser.add_argument("--stats-dump", metavar="FILE", help="write the timings to this file as JSON on exit (implies --stats)")
+	parser.add_argument("--profile", metavar="STEP", help="run a step of the game, like explore or battle, under cProfile and print the top functions on exit (implies --stats)")
+	parser.add_argument("--profile-every", metavar="N", type=int, default=1, help="with --profile, only profile one in every N runs of the step (default: %(default)s)")
+	parser.add_argument("--record", metavar="FILE", help="save the seed and everything typed in to this file, so that the game can be replayed exactly")
+	parser.add_argument("--seed", type=int, help="seed for a new game")
+	parser.add_argument("--replay", metavar="FILE", nargs="+", help="replay recorded games as fast as possible, checking that each ends the same way")
+	parser.add_argument("--watch-content", action="store_true", help="reload mobs.json, recipes.json and foods.json when they change, without restarting")
+	args = parser.parse_args()
+	load_content()
+	bus = writer = stats = watcher = None
+	sharded = args.serve and args.workers #Then each worker keeps its own telemetry and timings
+	if args.events and not sharded:
+		bus = events.EventBus()
+		writer = events.EventWriter(bus, args.events, args.events_format).start()
+	if (args.stats or args.stats_dump or args.profile) and not sharded:
+		stats = Stats()
+		if args.profile:
+			stats.profile(args.profile, args.profile_every)
+	if args.watch_content and not args.replay and not sharded:
+		import hotreload
+		watcher = hotreload.ContentWatcher().start()
+	try:
+		if args.replay:
+			import replay
+			if not replay.replay_files(args.replay, stats):
+				sys.exit(1)
+		elif sharded:
+			import shard
+			shard.serve(args.host, args.port, args.workers, {
+				"store": args.store, "output": args.output, "events": args.events, "events_format": args.events_format,
+				"stats": bool(args.stats or args.stats_dump or args.profile), "stats_dump": args.stats_dump, "profile": args.profile, "profile_every": args.profile_every,
+				"watch_content": args.watch_content
+			})
+		elif args.serve:
+			import server
+			asyncio.run(server.serve(args.host, args.port, args.store, args.output, bus, stats))
+		else:
+			if not has_termcolor and args.output == "text":
+				offer_termcolor()
+			client = TerminalClient(args.output)
+			session = GameSession(seed=args.seed, stats=stats)
+			if bus is not None:
+				bus.attach(session.player)
+			if args.record:
+				import replay
+				client = replay.RecordingClient(client)
+			try:
+				asyncio.run(play(client, session))
+			finally:
+				client.flush()
+				if args.record:
+					replay.save_recording(args.record, session, client)
+	finally:
+		if watcher is not None:
+			watcher.close()
+		if writer is not None:
+			writer.close()
+		if stats is not None:
+			if args.stats_dump:
+				with open(args.stats_dump, "w") as f:
+					json.dump(stats.summary(), f, indent=1)
+			report = stats.profile_report()
+			if report:
+				print(report, file=sys.stderr)
+
+if __name__ == "__main__":
+	sys.modules.setdefault("MinecraftRPG", sys.modules[__name__]) #So that modules importing MinecraftRPG share this copy rather than loading it again
+	main()
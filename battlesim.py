@@ -0,0 +1,241 @@
+"""Monte Carlo battle simulator for balancing mobs.json and the tool_data in recipes.json
+Replays the rules of Battle.attack across many fights at once using NumPy. The simulated player
+always attacks and never flees, and a fight ends when the mob dies or (for creepers) explodes.
+Usage: python battlesim.py [-n TRIALS] [--mob NAME] [--tool NAME] [--seed SEED] [-j JOBS] [--json]"""
+import argparse, json, math, multiprocessing, os, time
+import numpy as np
+from MinecraftRPG import MobBehaviorType, mob_types, recipes
+from rng import RNG
+
+KILLED = 0
+EXPLODED = 1
+UNFINISHED = 2
+
+class BattleStats:
+
+	def __init__(self, mob, tool, rounds, damage_taken, durability_used, outcome, loot):
+		self.mob = mob
+		self.tool = tool
+		self.rounds = rounds
+		self.damage_taken = damage_taken
+		self.durability_used = durability_used
+		self.outcome = outcome
+		self.loot = loot #Total number of each item dropped across all trials
+
+	@property
+	def trials(self):
+		return len(self.outcome)
+
+	def summary(self):
+		n = self.trials
+		def dist(values):
+			p50, p95, p99 = np.percentile(values, [50, 95, 99])
+			return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(values.max())}
+		return {
+			"mob": self.mob,
+			"tool": self.tool,
+			"trials": n,
+			"killed": np.count_nonzero(self.outcome == KILLED) / n,
+			"exploded": np.count_nonzero(self.outcome == EXPLODED) / n,
+			"unfinished": np.count_nonzero(self.outcome == UNFINISHED) / n,
+			"lethal": np.count_nonzero(self.damage_taken >= 20) / n, #Fights that would have killed a player at full health
+			"rounds": dist(self.rounds),
+			"damage_taken": dist(self.damage_taken),
+			"durability_used": dist(self.durability_used),
+			"loot_per_fight": {item: count / n for item, count in sorted(self.loot.items())}
+		}
+
+def tool_choices():
+	"Returns (name, ToolData) pairs for every craftable tool, with None standing for being unarmed"
+	tools = [("Unarmed", None)]
+	for name, recipe in recipes.items():
+		if recipe.tool_data is not None:
+			tools.append((name, recipe.tool_data))
+	return tools
+
+def round_stochastic(rng, values):
+	low = np.floor(values)
+	return low + (rng.random(np.shape(values)) < values - low)
+
+def roll_drops(rng, mob_type, kills, loot):
+	"Adds the drops from the given number of kills to the loot dict"
+	if kills == 0:
+		return
+	items, exp = mob_type.drops.roll(kills, RNG(int(rng.integers(1 << 63)))) #Seeded from rng, so a --seed still gives the same results
+	for item, count in items.items():
+		loot[item] = loot.get(item, 0) + count
+	if exp:
+		loot["EXP"] = loot.get("EXP", 0) + exp
+
+CHUNK_SIZE = 1 << 14 #Fights are simulated in blocks small enough for their working arrays to stay in the CPU cache
+
+def simulate(mob_type, tool_name="Unarmed", tool_data=None, trials=100000, rng=None, max_rounds=1000):
+	"Simulates the given number of fights between the player and a mob type, returning a BattleStats"
+	if rng is None:
+		rng = np.random.default_rng()
+	rounds = np.empty(trials, np.int32)
+	damage_taken = np.empty(trials)
+	durability_used = np.empty(trials, np.int32)
+	outcome = np.empty(trials, np.int8)
+	loot = {}
+	for start in range(0, trials, CHUNK_SIZE):
+		end = min(start + CHUNK_SIZE, trials)
+		chunk = slice(start, end)
+		simulate_chunk(mob_type, tool_data, end - start, rng, max_rounds, rounds[chunk], damage_taken[chunk], durability_used[chunk], outcome[chunk], loot)
+	roll_drops(rng, mob_type, int(np.count_nonzero(outcome == KILLED)), loot)
+	return BattleStats(mob_type.name, tool_name, rounds, damage_taken, durability_used, outcome, loot)
+
+def simulate_chunk(mob_type, tool_data, n, rng, max_rounds, rounds, damage_taken, durability_used, outcome, loot):
+	"Simulates n fights, writing the results into the given output arrays"
+	hostile = mob_type.behavior == MobBehaviorType.hostile
+	passive = mob_type.behavior == MobBehaviorType.passive
+	is_creeper = mob_type.name.lower().endswith("creeper")
+	miss_chance = 1 / 5 if mob_type.name == "Enderman" else 1 / 10
+	crit_below = miss_chance + (1 - miss_chance) / 10 #A single uniform draw decides both the miss and the critical hit
+	strength = mob_type.attack_strength or 0
+	strength_low = math.floor(strength)
+	strength_frac = strength - strength_low
+	durability = tool_data.durability if tool_data else -1
+
+	outcome[:] = UNFINISHED
+	damage_taken[:] = 0
+	if hostile and not is_creeper:
+		damage_taken += (rng.random(n) < 0.5) * strength
+	if mob_type.name == "Chicken":
+		loot["Egg"] = loot.get("Egg", 0) + int(np.count_nonzero(rng.random(n) * 15 < 1))
+
+	if not passive and not is_creeper and (tool_data is None or durability >= mob_type.hp):
+		#Every hit does at least 1 damage, so the tool can't break mid-fight and the odds are the same each round
+		simulate_fixed_odds(mob_type, tool_data, n, rng, miss_chance, strength_low, strength_frac, rounds, damage_taken, durability_used, outcome)
+		return
+
+	#State of the fights that are still going on; these shrink as fights finish and are only written back at the end of each fight
+	idx = np.arange(n)
+	hp = np.full(n, mob_type.hp, np.int32)
+	taken = damage_taken.copy()
+	hits = np.zeros(n, np.int32)
+	run = np.zeros(n, np.int32) if passive else None
+	turn = 0
+	while len(idx) > 0 and turn < max_rounds:
+		turn += 1
+		m = len(idx)
+		#Each hit wears the tool by 1, so it can't break before the round after its durability runs out
+		armed = tool_data is not None and (turn <= durability or hits <= durability)
+		damage = np.where(armed, tool_data.damage, 1) if tool_data else 1
+		crit_damage = (damage * 3) // 2
+		speed = np.where(armed, tool_data.attack_speed, 4) if tool_data else 4
+		u = rng.random(m, np.float32)
+		hit = u >= miss_chance
+		if passive:
+			run -= run > 0
+			hit &= ~((run > 0) & (rng.random(m, np.float32) * (speed + 1) * 3 < 2))
+		dmg = np.where(u < crit_below, crit_damage, damage) * hit
+		hits += hit
+		hp -= dmg
+		killed = hp <= 0
+		done = killed
+		if passive:
+			start_run = hit & ~killed & (run == 0) & (rng.random(m, np.float32) * (dmg + 1) >= 1)
+			run[start_run] = rng.integers(3, 6, np.count_nonzero(start_run))
+		elif is_creeper:
+			if turn > 2:
+				explode = ~killed & (rng.random(m, np.float32) * turn >= 1)
+				taken[explode] += rng.integers(1, int(strength) + 1, (3, np.count_nonzero(explode))).max(axis=0)
+				outcome[idx[explode]] = EXPLODED
+				done = killed | explode
+		else:
+			if tool_data is not None and turn > durability:
+				speed = np.where(hits <= durability, tool_data.attack_speed, 4)
+			counter_below = np.minimum(1, 1 / speed) * 7 / 8
+			v = rng.random(m, np.float32)
+			counter = ~killed & (v < counter_below)
+			if strength_frac:
+				taken += counter * (strength_low + (v < counter_below * strength_frac))
+			else:
+				taken += counter * strength_low
+		if done.any():
+			finished = idx[done]
+			outcome[idx[killed]] = KILLED
+			rounds[finished] = turn
+			damage_taken[finished] = taken[done]
+			durability_used[finished] = hits[done]
+			keep = ~done
+			idx = idx[keep]
+			hp = hp[keep]
+			taken = taken[keep]
+			hits = hits[keep]
+			if passive:
+				run = run[keep]
+	rounds[idx] = turn
+	damage_taken[idx] = taken
+	durability_used[idx] = hits
+	np.minimum(durability_used, durability + 1, out=durability_used) #Hits after the tool breaks don't use any durability
+
+def simulate_fixed_odds(mob_type, tool_data, n, rng, miss_chance, strength_low, strength_frac, rounds, damage_taken, durability_used, outcome):
+	"""Samples whole fights at once for mobs that don't flee or explode, when the tool can't break mid-fight
+	Rounds are independent trials, so the misses before the killing hit follow a negative binomial
+	distribution and the counter-attacks in the remaining rounds follow a binomial distribution"""
+	damage = tool_data.damage if tool_data else 1
+	crit_damage = (damage * 3) // 2
+	speed = tool_data.attack_speed if tool_data else 4
+	max_hits = -(-mob_type.hp // damage)
+	dealt = np.cumsum(np.where(rng.random((n, max_hits), np.float32) < 0.1, crit_damage, damage), axis=1)
+	hits = np.argmax(dealt >= mob_type.hp, axis=1) + 1
+	misses = rng.negative_binomial(hits, 1 - miss_chance)
+	rounds[:] = hits + misses
+	durability_used[:] = hits if tool_data else 0
+	outcome[:] = KILLED
+	counters = rng.binomial(rounds - 1, min(1, 1 / speed) * 7 / 8) #No counter-attack on the round the mob dies
+	damage_taken += counters * strength_low
+	if strength_frac:
+		damage_taken += rng.binomial(counters, strength_frac)
+
+def simulate_pair(task):
+	mob_name, tool_name, trials, seed = task
+	tool_data = dict(tool_choices())[tool_name]
+	return simulate(mob_types[mob_name], tool_name, tool_data, trials, np.random.default_rng(seed))
+
+def sweep(trials, mobs=None, tools=None, seed=None, jobs=1):
+	"""Simulates every (mob, tool) pair, yielding a BattleStats for each
+	Each pair gets its own random stream, so the results don't depend on the number of jobs"""
+	pairs = []
+	for mob_name in mob_types:
+		if mobs and mob_name not in mobs:
+			continue
+		for tool_name, tool_data in tool_choices():
+			if tools and tool_name not in tools:
+				continue
+			pairs.append((mob_name, tool_name))
+	seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+	tasks = [(mob_name, tool_name, trials, pair_seed) for (mob_name, tool_name), pair_seed in zip(pairs, seeds)]
+	if jobs <= 1:
+		yield from map(simulate_pair, tasks)
+	else:
+		with multiprocessing.Pool(jobs) as pool:
+			yield from pool.imap(simulate_pair, tasks)
+
+def main():
+	parser = argparse.ArgumentParser(description="Simulate battles against every mob with every tool")
+	parser.add_argument("-n", "--trials", type=int, default=100000, help="number of fights per mob/tool pair")
+	parser.add_argument("--mob", action="append", help="only simulate this mob (can be repeated)")
+	parser.add_argument("--tool", action="append", help="only simulate this tool (can be repeated)")
+	parser.add_argument("--seed", type=int)
+	parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes (default: one per core)")
+	parser.add_argument("--json", action="store_true", help="print one JSON summary per line instead of a table")
+	args = parser.parse_args()
+	start = time.perf_counter()
+	if not args.json:
+		print(f"{'Mob':<16}{'Tool':<16}{'Win%':>7}{'Boom%':>7}{'Lethal%':>8}{'Rounds':>8}{'p95':>5}{'Dmg':>7}{'p95':>6}{'Dur':>7}")
+	for stats in sweep(args.trials, args.mob, args.tool, args.seed, args.jobs):
+		s = stats.summary()
+		if args.json:
+			print(json.dumps(s))
+		else:
+			print(f"{s['mob']:<16}{s['tool']:<16}{s['killed']*100:>7.1f}{s['exploded']*100:>7.1f}{s['lethal']*100:>8.1f}"
+				f"{s['rounds']['mean']:>8.2f}{s['rounds']['p95']:>5.0f}{s['damage_taken']['mean']:>7.2f}{s['damage_taken']['p95']:>6.1f}"
+				f"{s['durability_used']['mean']:>7.2f}")
+	if not args.json:
+		print(f"\nSimulated in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,73 @@
+"""Measures how long a large content pack takes to validate and load, and how many of its errors get reported
+Generates a pack with --mobs and --recipes entries (50,000 in all by default) and times MobType.from_dict and
+Recipe.from_dict over every entry, then build_content() over the whole pack. With --errors N, that many entries
+are broken first, to see how many of them a single load reports.
+Usage: python benchmarks/content.py [--mobs N] [--recipes N] [--errors N]"""
+import argparse, json, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import MinecraftRPG
+from MinecraftRPG import MobType, Recipe
+from suite import make_pack
+
+def timed(func):
+	start = time.perf_counter()
+	result = func()
+	return time.perf_counter() - start, result
+
+def break_entries(folder, count, seed=0):
+	"Breaks count entries of the pack's mobs and recipes in different ways"
+	rng = random.Random(seed)
+	with open(os.path.join(folder, "mobs.json")) as f:
+		mobs = json.load(f)
+	with open(os.path.join(folder, "recipes.json")) as f:
+		recipes = json.load(f)
+	names = list(recipes)
+	breakers = [
+		lambda: rng.choice(mobs).pop("HP"),
+		lambda: rng.choice(mobs).update(behavior="sleepy"),
+		lambda: rng.choice(mobs)["death_drops"][0].update(chance=[1]),
+		lambda: recipes[rng.choice(names)].update(components="Wood"),
+		lambda: recipes[rng.choice(names)].update(quantity="lots")
+	]
+	for i in range(count):
+		breakers[i % len(breakers)]()
+	with open(os.path.join(folder, "mobs.json"), "w") as f:
+		json.dump(mobs, f)
+	with open(os.path.join(folder, "recipes.json"), "w") as f:
+		json.dump(recipes, f)
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--mobs", type=int, default=25000)
+	parser.add_argument("--recipes", type=int, default=25000)
+	parser.add_argument("--errors", type=int, default=0, help="number of entries to break")
+	args = parser.parse_args()
+	with tempfile.TemporaryDirectory() as folder:
+		make_pack(folder, args.mobs, args.recipes)
+		with open(os.path.join(folder, "mobs.json")) as f:
+			mobs = json.load(f)
+		with open(os.path.join(folder, "recipes.json")) as f:
+			recipes = json.load(f)
+		secs, _ = timed(lambda: [MobType.from_dict(d) for d in mobs])
+		print(f"MobType.from_dict:  {secs * 1000:8.1f} ms ({secs / len(mobs) * 1e6:.2f} us per mob)")
+		secs, _ = timed(lambda: [Recipe.from_dict(d) for d in recipes.values()])
+		print(f"Recipe.from_dict:   {secs * 1000:8.1f} ms ({secs / len(recipes) * 1e6:.2f} us per recipe)")
+		MinecraftRPG.content_dir = folder
+		secs, _ = timed(MinecraftRPG.build_content)
+		print(f"build_content:      {secs * 1000:8.1f} ms for {len(mobs) + len(recipes)} entries, including parsing the JSON")
+		if args.errors:
+			break_entries(folder, args.errors)
+			start = time.perf_counter()
+			try:
+				MinecraftRPG.build_content()
+			except Exception as e:
+				secs = time.perf_counter() - start
+				reported = len(getattr(e, "errors", [e]))
+				print(f"With {args.errors} broken entries: {type(e).__name__} after {secs * 1000:.1f} ms, reporting {reported} error(s)")
+				print(str(e).splitlines()[0])
+			else:
+				print(f"With {args.errors} broken entries: no error was raised")
+
+if __name__ == "__main__":
+	main()
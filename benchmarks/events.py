@@ -0,0 +1,68 @@
+"""Measures what gameplay telemetry costs per event
+Times Player.gain_exp() with telemetry off, with a bus that nothing is subscribed to, and with an EventWriter
+writing to a temporary file, along with publishing on its own and the writer thread's cost of writing each event out.
+Usage: python benchmarks/events.py [-n EVENTS]"""
+import argparse, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(sys.path[0])
+import events
+from MinecraftRPG import Player
+
+def per_call(func, n):
+	"Returns the best time of three runs of func(n), divided by n"
+	best = float("inf")
+	for _ in range(3):
+		start = time.perf_counter()
+		func(n)
+		best = min(best, time.perf_counter() - start)
+	return best / n
+
+def gain_exp(player):
+	def run(n):
+		for _ in range(n):
+			player.gain_exp(1)
+			player.messages.clear()
+	return run
+
+def publish(publisher):
+	def run(n):
+		for i in range(n):
+			publisher.publish(events.DAMAGE, 1, 19, "Killed by Zombie")
+	return run
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("-n", "--events", type=int, default=200000)
+	args = parser.parse_args()
+	n = args.events
+	player = Player()
+	off = per_call(gain_exp(player), n)
+	bus = events.EventBus()
+	publisher = bus.attach(player)
+	idle = per_call(gain_exp(player), n)
+	idle_publish = per_call(publish(publisher), n)
+	print(f"gain_exp, telemetry off:      {off * 1e9:7.0f} ns")
+	print(f"gain_exp, no subscribers:     {idle * 1e9:7.0f} ns")
+	with tempfile.TemporaryDirectory() as folder:
+		for format in events.formats:
+			path = os.path.join(folder, f"events.{format}")
+			writer = events.EventWriter(bus, path, format, capacity=n * 4).start()
+			on = per_call(gain_exp(player), n)
+			published = per_call(publish(publisher), n)
+			start = time.perf_counter()
+			writer.close()
+			closing = time.perf_counter() - start
+			ring = writer.ring
+			#Time writing a batch on this thread too, since the writer thread's work is spread over the runs above
+			sample = [(events.DAMAGE, 1, i, time.time(), (1, 19, "Killed by Zombie")) for i in range(n)]
+			start = time.perf_counter()
+			"\n".join(writer.lines(sample))
+			encode = (time.perf_counter() - start) / n
+			print(f"gain_exp, writing {format + ':':9} {on * 1e9:7.0f} ns")
+			print(f"  publish:                    {published * 1e9:7.0f} ns (vs {idle_publish * 1e9:.0f} ns with no subscribers)")
+			print(f"  encoding on the writer:     {encode * 1e9:7.0f} ns")
+			print(f"  written: {writer.written}, dropped: {ring.dropped}, file size: {os.path.getsize(path) / writer.written:.0f} bytes per event, final flush {closing * 1000:.1f} ms")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,91 @@
+"""Measures how much memory idle game sessions and active battles take, next to what they take with the game's objects
+laid out the way they were before they were slotted
+For the "before" numbers, the same classes are rebuilt with a __dict__ instead of __slots__, and with every Mob and
+Tool keeping its own copy of its type's fields rather than sharing them, then the same sessions and battles are made
+with them. Only the object layout differs; the code that runs is the same. The same change also made the RNG's
+buffer smaller and allocated on first use, which isn't part of this comparison.
+Usage: python benchmarks/memory.py [-n SESSIONS]"""
+import argparse, os, sys, tracemalloc
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(sys.path[0])
+import MinecraftRPG
+from MinecraftRPG import load_content
+
+slotted = ("RNG", "Scheduler", "Time", "StatusEffect", "Furnace", "Player", "Battle", "ActionResult", "GameSession")
+copied = { #Fields that each Mob and Tool kept for itself before they shared them with their type
+	"Mob": ("name", "behavior", "death_drops", "attack_strength"),
+	"Tool": ("damage", "max_durability", "mining_mult", "attack_speed")
+}
+
+def unslotted(cls, copy=()):
+	"Returns a copy of a slotted class whose instances have a __dict__, which also copies the given properties into it"
+	slots = set(cls.__slots__)
+	namespace = {key: value for key, value in vars(cls).items() if key not in slots and key not in copy and key != "__slots__"}
+	if copy:
+		init = cls.__init__
+		def __init__(self, *args, **kwargs):
+			init(self, *args, **kwargs)
+			for name in copy:
+				setattr(self, name, getattr(cls, name).fget(self))
+		namespace["__init__"] = __init__
+	return type(cls.__name__, cls.__bases__, namespace)
+
+@contextmanager
+def dict_layout():
+	"Swaps the game's classes for unslotted copies while making sessions and battles"
+	originals = {name: getattr(MinecraftRPG, name) for name in slotted + tuple(copied)}
+	for name in slotted:
+		setattr(MinecraftRPG, name, unslotted(originals[name]))
+	for name, fields in copied.items():
+		setattr(MinecraftRPG, name, unslotted(originals[name], fields))
+	try:
+		yield
+	finally:
+		for name, cls in originals.items():
+			setattr(MinecraftRPG, name, cls)
+
+def measure(make, n):
+	"Returns the average number of bytes allocated by each of n calls to make"
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	objects = [make(i) for i in range(n)]
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	del objects
+	return (after - before) / n
+
+def idle_session(i):
+	"A session that has played a few turns and is now waiting for input"
+	session = MinecraftRPG.GameSession(seed=i)
+	for _ in range(3):
+		session.start_turn()
+		session.inventory()
+	session.player.rng.random()
+	return session
+
+def battle_only(session):
+	return MinecraftRPG.Battle(session.player, MinecraftRPG.Mob.new_mob("Zombie"))
+
+def measure_layout(n):
+	idle = measure(idle_session, n)
+	sessions = [idle_session(i) for i in range(n)]
+	battle = measure(lambda i: battle_only(sessions[i]), n)
+	return {"Idle session": idle, "Active battle": battle}
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("-n", "--sessions", type=int, default=10000)
+	args = parser.parse_args()
+	load_content()
+	with dict_layout():
+		before = measure_layout(args.sessions)
+	now = measure_layout(args.sessions)
+	print(f"{'Bytes':16}{'before':>8}{'now':>8}{'saved':>8}")
+	for name in now:
+		print(f"{name:16}{before[name]:8.0f}{now[name]:8.0f}{1 - now[name] / before[name]:8.0%}")
+	print("(an active battle is on top of its session)")
+
+if __name__ == "__main__":
+	main()
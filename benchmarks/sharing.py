@@ -0,0 +1,87 @@
+"""Measures how much of the content a --workers supervisor loads stays shared with the workers it forks
+A stand-in supervisor loads a large generated content pack, as in benchmarks/content.py, then forks workers that each
+play bots against it. Each worker reads its memory from /proc/self/smaps_rollup before and after playing: pages still
+shared with the supervisor are only in memory once for all of them, while private pages are each worker's own copy.
+Playing also allocates the sessions themselves, which are private either way, so the numbers to compare are the two
+runs, with and without gc.freeze() before forking as Supervisor.start() does. Needs Linux.
+Usage: python benchmarks/sharing.py [-w WORKERS] [--mobs N] [--recipes N] [--agents N] [--turns N]"""
+import argparse, gc, multiprocessing, os, sys, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(sys.path[0])
+import bots
+import MinecraftRPG
+from suite import make_pack
+
+def memory():
+	"Returns this process's shared and private memory in MiB"
+	fields = {}
+	with open("/proc/self/smaps_rollup") as f:
+		for line in f:
+			parts = line.split()
+			if len(parts) == 3 and parts[2] == "kB":
+				fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+	return {
+		"shared": fields["Shared_Clean"] + fields["Shared_Dirty"],
+		"private": fields["Private_Clean"] + fields["Private_Dirty"]
+	}
+
+def worker(conn, agents, turns, seed):
+	before = memory()
+	bots.run(bots.RandomPlayer, agents, turns, seed)
+	gc.collect() #A full collection, as a long-running worker will have had by now
+	conn.send((before, memory()))
+	conn.close()
+
+def supervise(conn, folder, freeze, workers, agents, turns):
+	"Loads the pack, then forks workers to play against it and sends back their memory before and after"
+	start = memory()
+	MinecraftRPG.content_dir = folder
+	MinecraftRPG.install_content(MinecraftRPG.build_tables(MinecraftRPG.build_content()))
+	gc.collect()
+	content = memory()["private"] - start["private"]
+	if freeze:
+		gc.freeze()
+	context = multiprocessing.get_context("fork")
+	pipes = []
+	for seed in range(workers):
+		parent_end, child_end = context.Pipe()
+		context.Process(target=worker, args=(child_end, agents, turns, seed)).start()
+		pipes.append(parent_end)
+	conn.send((content, [pipe.recv() for pipe in pipes]))
+	conn.close()
+
+def measure(folder, freeze, workers, agents, turns):
+	"Runs a supervisor in a new process, so that each run starts from the same memory"
+	context = multiprocessing.get_context("fork")
+	parent_end, child_end = context.Pipe()
+	process = context.Process(target=supervise, args=(child_end, folder, freeze, workers, agents, turns))
+	process.start()
+	result = parent_end.recv()
+	process.join()
+	return result
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("-w", "--workers", type=int, default=4)
+	parser.add_argument("--mobs", type=int, default=25000)
+	parser.add_argument("--recipes", type=int, default=25000)
+	parser.add_argument("--agents", type=int, default=50, help="bots played by each worker")
+	parser.add_argument("--turns", type=int, default=200)
+	args = parser.parse_args()
+	if not os.path.exists("/proc/self/smaps_rollup"):
+		sys.exit("This needs Linux's /proc/self/smaps_rollup")
+	with tempfile.TemporaryDirectory() as folder:
+		make_pack(folder, args.mobs, args.recipes)
+		print(f"{'MiB per worker':24}{'private':>10}{'shared':>10}")
+		for freeze in (False, True):
+			content, results = measure(folder, freeze, args.workers, args.agents, args.turns)
+			label = "with gc.freeze()" if freeze else "without gc.freeze()"
+			print(f"{label} (content: {content:.1f} MiB in the supervisor)")
+			for name, index in (("  after forking", 0), ("  after playing", 1)):
+				private = sum(result[index]["private"] for result in results) / len(results)
+				shared = sum(result[index]["shared"] for result in results) / len(results)
+				print(f"{name:24}{private:10.1f}{shared:10.1f}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,56 @@
+"""Measures how long a fresh process takes to import the game and get a session ready
+Each stage runs in a new interpreter, with the content cache either removed first (cold) or left in place (warm).
+Loading the content is also timed in this process, since it's small next to the noise of starting interpreters.
+Usage: python benchmarks/startup.py [-n RUNS]"""
+import argparse, os, statistics, subprocess, sys, time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+stages = {
+	"import": "import MinecraftRPG",
+	"load content": "import MinecraftRPG; MinecraftRPG.load_content()",
+	"first session": "import MinecraftRPG; MinecraftRPG.GameSession().start_turn()"
+}
+
+def run(code, cold):
+	"Returns how long a new interpreter takes to run code, in seconds"
+	if cold:
+		from MinecraftRPG import content_cache
+		if os.path.exists(content_cache):
+			os.remove(content_cache)
+	start = time.perf_counter()
+	subprocess.run([sys.executable, "-c", code], cwd=root, check=True, stdin=subprocess.DEVNULL)
+	return time.perf_counter() - start
+
+def time_content(runs):
+	"Returns the median time to get the content tables from the JSON files and from the content cache"
+	import MinecraftRPG
+	def timed(func):
+		times = []
+		for _ in range(runs):
+			start = time.perf_counter()
+			func()
+			times.append(time.perf_counter() - start)
+		return statistics.median(times)
+	MinecraftRPG.write_content_cache(MinecraftRPG.build_content())
+	return timed(MinecraftRPG.build_content), timed(MinecraftRPG.read_content_cache)
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("-n", "--runs", type=int, default=20)
+	args = parser.parse_args()
+	baseline = statistics.median(run("pass", False) for _ in range(args.runs))
+	print(f"Interpreter startup: {baseline * 1000:7.1f} ms")
+	if sys.dont_write_bytecode or os.environ.get("PYTHONDONTWRITEBYTECODE"):
+		print("Note: bytecode caching is disabled, so every run also compiles the modules from source")
+	for name, code in stages.items():
+		for cold in (True, False):
+			median = statistics.median(run(code, cold) for _ in range(args.runs))
+			print(f"{name + (' (cold)' if cold else ' (warm)'):24} {(median - baseline) * 1000:7.1f} ms on top of startup")
+	parse, cached = time_content(args.runs * 10)
+	print(f"Content from JSON:     {parse * 1000:7.2f} ms")
+	print(f"Content from cache:    {cached * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+	main()
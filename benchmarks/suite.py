@@ -0,0 +1,271 @@
+"""Times the game's hot paths and compares them against a saved baseline, e.g. to catch a slowdown before it's merged
+The gameplay paths run on the real content. Crafting and content loading also run on a synthetic content pack,
+generated with --mobs and --recipes of each, so that they can be timed at sizes the real files don't reach yet.
+Each path is timed in batches of calls big enough to take a few hundredths of a second, keeping the best of --repeat.
+Usage: python benchmarks/suite.py [--save] [--baseline FILE] [--threshold FRACTION] [--only NAME...] [--mobs N] [--recipes N]
+With --save, the results become the new baseline; otherwise the run fails (exit status 1) if any path is slower
+than its baseline by more than the threshold. Baselines are only comparable on the same machine and pack size."""
+import argparse, json, os, platform, random, shutil, sys, tempfile, time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+import MinecraftRPG
+from MinecraftRPG import Battle, GameSession, Mob, MobType, Player, RNG, Tool, WeightedList, load_content
+
+def make_pack(folder, num_mobs, num_recipes, seed=0):
+	"Writes a synthetic content pack to folder, with the real foods and smelting, and returns the names of its base items"
+	rng = random.Random(seed)
+	base_items = [f"Item {i}" for i in range(max(num_recipes // 4, 4))]
+	mobs = []
+	for i in range(num_mobs):
+		behavior = rng.choice(("passive", "neutral", "hostile"))
+		mob = {"name": f"Mob {i}", "HP": rng.randint(4, 40), "weight": rng.randint(1, 20), "behavior": behavior}
+		if behavior != "passive":
+			mob["attack_strength"] = rng.randint(1, 8)
+		mob["death_drops"] = [
+			{"item": rng.choice(base_items), "quantity": [0, rng.randint(1, 3)], "chance": [1, rng.randint(1, 4)]},
+			{"item": "EXP", "quantity": [1, 5]}
+		]
+		mob["night_mob"] = rng.random() < 0.3
+		mobs.append(mob)
+	recipes = {}
+	items = list(base_items)
+	for i in range(num_recipes):
+		name = f"Crafted {i}"
+		components = [[item, rng.randint(1, 4)] for item in rng.sample(items, min(rng.randint(1, 4), len(items)))]
+		recipes[name] = {"quantity": rng.randint(1, 4), "components": components}
+		items.append(name) #Later recipes can use earlier ones, as in the real recipes
+	with open(os.path.join(folder, "mobs.json"), "w") as f:
+		json.dump(mobs, f)
+	with open(os.path.join(folder, "recipes.json"), "w") as f:
+		json.dump(recipes, f)
+	for name in ("foods.json", "smelting.json"):
+		shutil.copy(os.path.join(root, name), folder)
+	return base_items
+
+def use_content(folder):
+	"Points the game at the content files in folder, replacing whatever content is loaded"
+	MinecraftRPG.content_dir = folder
+	MinecraftRPG.content_cache = os.path.join(folder, "__pycache__", "content.cache")
+	for name in MinecraftRPG.content_names:
+		MinecraftRPG.__dict__.pop(name, None)
+	load_content()
+
+#Each case takes the parsed arguments and returns a function that runs the path loops times
+
+def weighted_pick(args):
+	table = WeightedList()
+	for i in range(1000):
+		table.add(i, i % 17 + 1)
+	rng = RNG(0)
+	def run(loops):
+		pick = table.pick
+		for _ in range(loops):
+			pick(rng)
+	return run
+
+def loot_table_pick(args):
+	table = MinecraftRPG.day_mob_types
+	rng = RNG(0)
+	def run(loops):
+		pick = table.pick
+		for _ in range(loops):
+			pick(rng)
+	return run
+
+def mob_death(args):
+	player = Player(RNG(0))
+	def run(loops):
+		for _ in range(loops):
+			mob = Mob.new_mob("Zombie")
+			mob.damage(mob.HP, player)
+			player.messages.clear()
+	return run
+
+def drop_roll(args):
+	"Rolling the drops of 10,000 zombie kills at once, as for farms and simulations"
+	table = MinecraftRPG.mob_types["Zombie"].drops
+	rng = RNG(0)
+	def run(loops):
+		for _ in range(loops):
+			table.roll(10000, rng)
+	return run
+
+def battle(args):
+	"A whole random encounter, attacking with an iron sword until it's over"
+	state = {}
+	def new_player():
+		player = Player(RNG(0))
+		sword = Tool("Iron Sword", MinecraftRPG.recipes["Iron Sword"].tool_data)
+		player.add_tool(sword)
+		player.curr_weapon = sword
+		state["session"] = GameSession(player)
+	new_player()
+	def run(loops):
+		for _ in range(loops):
+			session = state["session"]
+			player = session.player
+			player.HP = player.hunger = 20
+			player.curr_weapon.durability = player.curr_weapon.max_durability
+			session.battle = Battle.random_encounter(player, False)
+			while session.battle is not None:
+				session.battle_action("attack")
+			if session.over:
+				new_player()
+			player.messages.clear()
+	return run
+
+def tick(args):
+	player = Player(RNG(0))
+	def run(loops):
+		for _ in range(loops):
+			player.hunger = 20
+			player.tick()
+		player.messages.clear()
+	return run
+
+def advance_time(args):
+	player = Player(RNG(0))
+	def run(loops):
+		for _ in range(loops):
+			player.advance_time(0.5)
+		player.messages.clear()
+	return run
+
+def craft_menu(args):
+	"Working out what can be crafted from scratch, e.g. for the craft menu of a newly loaded player"
+	session = GameSession(Player(RNG(0)))
+	player = session.player
+	rng = random.Random(0)
+	for item in args.base_items:
+		if rng.random() < 0.5:
+			player.inventory[item] = rng.randint(1, 20)
+	def run(loops):
+		for _ in range(loops):
+			player.craftable = None
+			session.craftable()
+	return run
+
+def craft_update(args):
+	"Keeping the craftable recipes up to date as items come and go"
+	player = Player(RNG(0))
+	player.craftable_recipes()
+	items = args.base_items[:50]
+	def run(loops):
+		for i in range(loops):
+			item = items[i % len(items)]
+			player.add_item(item, 3)
+			player.remove_item(item, 3)
+	return run
+
+def load_mobs(args):
+	with open(os.path.join(args.pack, "mobs.json")) as f:
+		dicts = json.load(f)
+	def run(loops):
+		for _ in range(loops):
+			for d in dicts:
+				MobType.from_dict(d)
+	return run
+
+def build_content(args):
+	"Parsing and validating every file of the pack, as when the content cache is out of date"
+	def run(loops):
+		for _ in range(loops):
+			MinecraftRPG.build_content()
+	return run
+
+real_cases = {"weighted_pick": weighted_pick, "loot_table_pick": loot_table_pick, "mob_death": mob_death, "drop_roll": drop_roll, "battle": battle, "tick": tick, "advance_time": advance_time}
+synthetic_cases = {"craft_menu": craft_menu, "craft_update": craft_update, "load_mobs": load_mobs, "build_content": build_content}
+
+def measure(run, repeat, min_time=0.05):
+	"Returns the best time per call, in seconds, of repeat batches that each take at least min_time"
+	loops = 1
+	while True:
+		start = time.perf_counter()
+		run(loops)
+		elapsed = time.perf_counter() - start
+		if elapsed >= min_time:
+			break
+		loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed * 1.2) + 1))
+	best = elapsed
+	for _ in range(repeat - 1):
+		start = time.perf_counter()
+		run(loops)
+		best = min(best, time.perf_counter() - start)
+	return best / loops
+
+def run_cases(args):
+	results = {}
+	def run_all(cases):
+		for name, case in cases.items():
+			if args.only and name not in args.only:
+				continue
+			results[name] = measure(case(args), args.repeat)
+			print(f"{name:16} {format_time(results[name])}", flush=True)
+	saved = MinecraftRPG.content_dir, MinecraftRPG.content_cache
+	load_content()
+	run_all(real_cases)
+	with tempfile.TemporaryDirectory() as folder:
+		args.pack = folder
+		args.base_items = make_pack(folder, args.mobs, args.recipes)
+		use_content(folder)
+		try:
+			run_all(synthetic_cases)
+		finally:
+			MinecraftRPG.content_dir, MinecraftRPG.content_cache = saved
+			use_content(MinecraftRPG.content_dir)
+	return results
+
+def format_time(secs):
+	if secs < 1e-3:
+		return f"{secs * 1e6:10.2f} us"
+	return f"{secs * 1e3:10.2f} ms"
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--baseline", default=os.path.join(root, "benchmarks", "baseline.json"), help="file to compare against or save to (default: benchmarks/baseline.json)")
+	parser.add_argument("--save", action="store_true", help="save the results as the new baseline instead of comparing")
+	parser.add_argument("--threshold", type=float, default=0.25, help="how much slower than the baseline a path may get, as a fraction (default: %(default)s)")
+	parser.add_argument("--only", nargs="+", metavar="NAME", choices=[*real_cases, *synthetic_cases], help="only run these paths")
+	parser.add_argument("--mobs", type=int, default=2000, help="number of mobs in the synthetic pack (default: %(default)s)")
+	parser.add_argument("--recipes", type=int, default=5000, help="number of recipes in the synthetic pack (default: %(default)s)")
+	parser.add_argument("--repeat", type=int, default=5)
+	args = parser.parse_args()
+	results = run_cases(args)
+	setup = {"mobs": args.mobs, "recipes": args.recipes, "python": platform.python_version(), "machine": platform.node()}
+	if args.save:
+		baseline = {"setup": setup, "results": results}
+		if os.path.exists(args.baseline) and args.only: #Keep the other paths' baselines when only some were run
+			with open(args.baseline) as f:
+				old = json.load(f)
+			if old.get("setup") == setup:
+				baseline["results"] = {**old["results"], **results}
+		with open(args.baseline, "w") as f:
+			json.dump(baseline, f, indent=1)
+		print(f"Saved the baseline to {args.baseline}")
+		return
+	if not os.path.exists(args.baseline):
+		print(f"No baseline at {args.baseline} to compare with; run with --save to make one")
+		return
+	with open(args.baseline) as f:
+		baseline = json.load(f)
+	if baseline.get("setup") != setup:
+		print(f"Warning: the baseline was made with {baseline.get('setup')}, not {setup}")
+	regressions = []
+	print()
+	for name, secs in results.items():
+		old = baseline["results"].get(name)
+		if old is None:
+			continue
+		change = secs / old - 1
+		flag = ""
+		if change > args.threshold:
+			regressions.append(name)
+			flag = "  REGRESSION"
+		print(f"{name:16} {change:+8.1%} vs {format_time(old).strip()}{flag}")
+	if regressions:
+		print(f"\n{len(regressions)} path(s) slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
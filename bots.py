@@ -0,0 +1,206 @@
+"""Load tests the game rules with many simulated players, to see how many turns a second one core can run
+Each agent plays its own GameSession, with a policy choosing its actions, and all of them take turns as coroutines on
+one event loop, the way the server runs its sessions. Pacing delays are skipped. The report has the turns per second,
+how long each kind of step takes to compute, how long each agent waits between its turns, and how the agents did:
+how long they survived, the EXP they gained and what killed them.
+A policy is anything with an act(session) method that returns the name of a GameSession method and its arguments,
+like ("explore",) or ("battle_action", "attack"); see Survivor and RandomPlayer.
+Usage: python bots.py [-n AGENTS] [--turns N] [--policy {survivor,random}] [--seed SEED] [--json]"""
+import argparse, asyncio, json, random, time
+from collections import Counter
+
+import MinecraftRPG
+from MinecraftRPG import GameSession, MobBehaviorType, load_content
+from stats import Histogram, Stats
+
+class Policy:
+	"""Base for policies, which choose what an agent does each turn
+	A policy's act(session) method returns the next action, as a tuple of the name of a GameSession method and its
+	arguments; this class only gives it a random number generator and some helpers"""
+
+	def __init__(self, seed=None):
+		self.rng = random.Random(seed) #For the policy's own choices, apart from the game's random draws
+
+	def battle_action(self, session, action):
+		return ("battle_action", "attack" if action == "Attack" else "leave")
+
+def best_tool(player, kind):
+	"Returns the index in player.tools of the best tool of a kind, like Sword or Pickaxe, or None"
+	best = None
+	for index, tool in enumerate(player.tools):
+		if kind in tool.name and (best is None or tool.damage > player.tools[best].damage):
+			best = index
+	return best
+
+class Survivor(Policy):
+	"""Plays the way a new player might: explores for wood, crafts its way up the tool chain, mines for stone and iron,
+	smelts the iron, eats when it gets hungry, and fights with its best sword, running away when its health gets low"""
+	tool_chain = ("Wooden Pickaxe", "Wooden Sword", "Stone Pickaxe", "Stone Sword", "Furnace", "Iron Pickaxe", "Iron Sword")
+
+	def __init__(self, seed=None, flee_hp=8, eat_below=14, mine_chance=0.5):
+		super().__init__(seed)
+		self.flee_hp = flee_hp
+		self.eat_below = eat_below
+		self.mine_chance = mine_chance #How often to mine rather than explore once it has a pickaxe
+
+	def act(self, session):
+		player = session.player
+		if session.battle is not None:
+			return self.fight(session)
+		if player.hunger < self.eat_below or (player.HP < 20 and player.hunger < 18): #Health only comes back with 18 hunger or more
+			foods = session.edible_foods()
+			if foods:
+				return ("eat", max(foods, key=lambda food: MinecraftRPG.foods[food]["hunger"]))
+		jobs = ()
+		if player.furnace is not None: #Only there once something has been smelted
+			jobs, done, seconds_left = session.furnace_status()
+			if done:
+				return ("collect_furnace",)
+		if not jobs and player.has_item("Furnace") and player.has_item("Raw Iron"):
+			count = session.max_smelts("Raw Iron", "Coal")
+			if count > 0:
+				return ("smelt", "Raw Iron", "Coal", count)
+		owned = {tool.name for tool in player.tools}
+		for target in self.tool_chain:
+			if target not in owned and not player.has_item(target) and session.plan_craft(target).ok:
+				return ("craft_all", target)
+		pickaxe = best_tool(player, "Pickaxe")
+		if pickaxe is not None and self.rng.random() < self.mine_chance:
+			if player.tools[pickaxe] is not player.curr_weapon:
+				return ("switch_weapon", pickaxe)
+			return ("mine",)
+		return ("explore",)
+
+	def fight(self, session):
+		player = session.player
+		battle = session.battle
+		sword = best_tool(player, "Sword")
+		hostile = battle.mob.behavior == MobBehaviorType.hostile
+		if player.HP <= self.flee_hp or battle.mob.name.endswith("Creeper") or (hostile and sword is None and player.HP < 20):
+			return ("battle_action", "leave")
+		if sword is not None and player.tools[sword] is not player.curr_weapon:
+			return ("switch_weapon", sword)
+		return ("battle_action", "attack")
+
+class RandomPlayer(Policy):
+	"Picks one of the menu options at random each turn, as a baseline that reaches every menu"
+
+	def act(self, session):
+		player = session.player
+		choice = self.rng.choice(session.options())
+		if session.battle is not None:
+			return self.battle_action(session, choice)
+		if choice == "Craft":
+			craftable = session.craftable()
+			if craftable:
+				return ("craft", self.rng.choice(craftable)[0])
+		elif choice == "Switch Weapon":
+			return ("switch_weapon", self.rng.randrange(len(player.tools)))
+		elif choice == "Eat":
+			return ("eat", self.rng.choice(session.edible_foods()))
+		elif choice == "Mine":
+			pickaxe = best_tool(player, "Pickaxe")
+			if player.tools[pickaxe] is not player.curr_weapon:
+				return ("switch_weapon", pickaxe)
+			return ("mine",)
+		elif choice == "Smelt":
+			return ("collect_furnace",)
+		elif choice == "Inventory":
+			return ("inventory",)
+		return ("explore",)
+
+policies = {"survivor": Survivor, "random": RandomPlayer}
+
+class Agent:
+	__slots__ = ("session", "policy", "turns")
+
+	def __init__(self, session, policy):
+		self.session = session
+		self.policy = policy
+		self.turns = 0
+
+async def run_agent(agent, turns, intervals):
+	"Plays up to the given number of turns, yielding to the other agents after each one"
+	session = agent.session
+	last = time.perf_counter_ns()
+	for _ in range(turns):
+		if session.over:
+			break
+		name, *args = agent.policy.act(session)
+		getattr(session, name)(*args)
+		agent.turns += 1
+		await asyncio.sleep(0)
+		now = time.perf_counter_ns()
+		intervals.add(now - last) #How long this agent waited for its turn, plus the turn itself
+		last = now
+
+async def drive(agents, turns, intervals):
+	await asyncio.gather(*(run_agent(agent, turns, intervals) for agent in agents))
+
+def run(policy=Survivor, num_agents=100, turns=1000, seed=0):
+	"Runs the agents and returns a report of how it went, as a dict that can be written out as JSON"
+	load_content()
+	seeds = random.Random(seed)
+	stats = Stats()
+	agents = []
+	for _ in range(num_agents):
+		agent_seed = seeds.getrandbits(64)
+		agents.append(Agent(GameSession(seed=agent_seed, stats=stats), policy(agent_seed)))
+	intervals = Histogram()
+	start = time.perf_counter()
+	asyncio.run(drive(agents, turns, intervals))
+	elapsed = time.perf_counter() - start
+	players = [agent.session.player for agent in agents]
+	dead = [player for player in players if player.dead]
+	total_turns = sum(agent.turns for agent in agents)
+	def dist(values):
+		values = sorted(values)
+		if not values:
+			return {"mean": 0, "p50": 0, "max": 0}
+		return {"mean": sum(values) / len(values), "p50": values[len(values) // 2], "max": values[-1]}
+	return {
+		"agents": num_agents,
+		"turns": total_turns,
+		"elapsed_s": elapsed,
+		"turns_per_s": total_turns / elapsed if elapsed > 0 else 0,
+		"turn_interval": intervals.summary(elapsed),
+		"steps": stats.summary()["compute"],
+		"survived": len(players) - len(dead),
+		"ticks_survived_by_dead": dist(player.ticks for player in dead),
+		"exp": dist(player.EXP for player in players),
+		"level": dist(player.level for player in players),
+		"deaths": dict(Counter(player.death_reason or "Unknown" for player in dead).most_common())
+	}
+
+def print_report(report):
+	print(f"{report['agents']} agents played {report['turns']} turns in {report['elapsed_s']:.2f} s ({report['turns_per_s']:,.0f} turns/s)")
+	interval = report["turn_interval"]
+	print(f"Wait between turns (ms): p50 {interval['p50_us'] / 1000:.2f}, p95 {interval['p95_us'] / 1000:.2f}, p99 {interval['p99_us'] / 1000:.2f}, max {interval['max_us'] / 1000:.2f}")
+	print(f"{'Step (us)':18}{'count':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+	for name, s in report["steps"].items():
+		print(f"  {name:16}{s['count']:9}" + "".join(f"{s[key]:9.1f}" for key in ("p50_us", "p95_us", "p99_us", "max_us")))
+	print(f"Survived: {report['survived']} of {report['agents']}")
+	ticks = report["ticks_survived_by_dead"]
+	print(f"Ticks survived by those who died: mean {ticks['mean']:.0f}, p50 {ticks['p50']}, max {ticks['max']}")
+	print(f"EXP: mean {report['exp']['mean']:.1f}, p50 {report['exp']['p50']}, max {report['exp']['max']}; level: mean {report['level']['mean']:.1f}, max {report['level']['max']}")
+	if report["deaths"]:
+		print("Deaths:")
+		for reason, count in report["deaths"].items():
+			print(f"{count:8}  {reason}")
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("-n", "--agents", type=int, default=100, help="number of agents (default: %(default)s)")
+	parser.add_argument("--turns", type=int, default=1000, help="most turns each agent plays (default: %(default)s)")
+	parser.add_argument("--policy", choices=policies, default="survivor", help="how the agents play (default: %(default)s)")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--json", action="store_true", help="print the report as JSON")
+	args = parser.parse_args()
+	report = run(policies[args.policy], args.agents, args.turns, args.seed)
+	if args.json:
+		print(json.dumps(report, indent=1))
+	else:
+		print_report(report)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,146 @@
+"""Plans crafting across the recipe graph, e.g. everything needed to get from Wood to a Wooden Pickaxe
+The recipes are compiled once, on the first plan, into a graph from each item to its components. Recipes in a cycle
+(like an ingot that can be crafted from a block of those ingots) are never expanded, which keeps the rest of the
+graph acyclic. The dependency order below each target is memoized, so a plan is one pass over that order."""
+
+class CraftPlan:
+	"The result of RecipeGraph.plan()"
+	__slots__ = ("target", "times", "crafts", "uses", "missing")
+
+	def __init__(self, target, times):
+		self.target = target
+		self.times = times
+		self.crafts = [] #(recipe name, times to craft it), in an order where each step's components are already made
+		self.uses = {} #Items taken from the inventory
+		self.missing = {} #Items that neither the inventory nor a recipe can provide
+
+	@property
+	def ok(self):
+		return not self.missing
+
+class RecipeGraph:
+
+	def __init__(self, recipes):
+		self.recipes = recipes
+		self.cycles = None
+		self.cyclic = None
+		self.orders = {} #Target -> items it depends on, each listed before its components
+
+	def compile(self):
+		if self.cycles is None:
+			self.cycles = self.find_cycles()
+			self.cyclic = {name for cycle in self.cycles for name in cycle if name in self.recipes}
+
+	def components(self, name):
+		recipe = self.recipes.get(name)
+		if recipe is None:
+			return ()
+		return [component[0] for component in recipe.components]
+
+	def find_cycles(self):
+		"Returns the strongly connected components of the graph that contain a cycle, using Tarjan's algorithm without recursion"
+		index = {}
+		low = {}
+		stack = []
+		on_stack = set()
+		cycles = []
+		counter = 0
+		for root in self.recipes:
+			if root in index:
+				continue
+			work = [(root, iter(self.components(root)))]
+			index[root] = low[root] = counter
+			counter += 1
+			stack.append(root)
+			on_stack.add(root)
+			while work:
+				node, children = work[-1]
+				for child in children:
+					if child not in index:
+						index[child] = low[child] = counter
+						counter += 1
+						stack.append(child)
+						on_stack.add(child)
+						work.append((child, iter(self.components(child))))
+						break
+					elif child in on_stack:
+						low[node] = min(low[node], index[child])
+				else:
+					work.pop()
+					if work:
+						parent = work[-1][0]
+						low[parent] = min(low[parent], low[node])
+					if low[node] == index[node]:
+						scc = []
+						while True:
+							item = stack.pop()
+							on_stack.discard(item)
+							scc.append(item)
+							if item == node:
+								break
+						if len(scc) > 1 or node in self.components(node):
+							cycles.append(scc)
+		return cycles
+
+	def expandable(self, name, target):
+		"Returns the recipe to make name with, or None if it has to come from the inventory"
+		recipe = self.recipes.get(name)
+		if recipe is None or name in self.cyclic:
+			return None
+		if recipe.tool_data is not None and name != target: #Crafted tools go to the player's tools rather than the inventory
+			return None
+		return recipe
+
+	def order(self, target):
+		"Returns target and every item below it, with each item listed before all of its components"
+		order = self.orders.get(target)
+		if order is None:
+			self.compile()
+			postorder = []
+			seen = {target}
+			work = [(target, iter(self.components(target) if self.expandable(target, target) else ()))]
+			while work:
+				node, children = work[-1]
+				for child in children:
+					if child not in seen:
+						seen.add(child)
+						expand = self.expandable(child, target) is not None
+						work.append((child, iter(self.components(child) if expand else ())))
+						break
+				else:
+					work.pop()
+					postorder.append(node)
+			order = tuple(reversed(postorder))
+			self.orders[target] = order
+		return order
+
+	def plan(self, target, times=1, inventory={}):
+		"""Works out how to craft target the given number of times, using up items in inventory before crafting more of them
+		Anything a recipe makes beyond what's needed, like spare planks, is left over in the inventory"""
+		plan = CraftPlan(target, times)
+		demand = {target: times * self.recipes[target].quantity} if target in self.recipes else {target: times}
+		for item in self.order(target):
+			need = demand.get(item, 0)
+			if need <= 0:
+				continue
+			if item != target:
+				have = min(inventory.get(item, 0), need)
+				if have > 0:
+					plan.uses[item] = have
+					need -= have
+					if need == 0:
+						continue
+			recipe = self.expandable(item, target)
+			if recipe is None:
+				plan.missing[item] = need
+				continue
+			crafts = -(-need // recipe.quantity)
+			plan.crafts.append((item, crafts))
+			for name, amount in recipe.components:
+				demand[name] = demand.get(name, 0) + amount * crafts
+		plan.crafts.reverse()
+		return plan
+
+	def bill(self, target, times=1):
+		"Returns all the raw materials needed to craft target from scratch"
+		return self.plan(target, times).missing
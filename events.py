@@ -0,0 +1,191 @@
+"""Gameplay telemetry, e.g. every hit a player takes, what each mob dropped and what was crafted
+Players publish typed events to an EventBus through their events attribute, which is None unless telemetry is on,
+so the game pays for a single attribute check when nobody is listening. An EventWriter keeps the events in a ring
+buffer without any locking and writes them out in batches from a background thread, either as JSON lines or in
+columns, rotating to a new file once the current one gets too big.
+Usage: python MinecraftRPG.py --events events.jsonl [--events-format columns]"""
+import json, os, threading, time
+
+encode_json = json.JSONEncoder(separators=(",", ":")).encode
+
+class EventType:
+	"A kind of event, with the names of the values each one carries"
+	__slots__ = ("name", "fields")
+
+	def __init__(self, name, fields):
+		self.name = name
+		self.fields = fields
+
+	def __repr__(self):
+		return f"EventType({self.name!r})"
+
+DAMAGE = EventType("damage", ("amount", "hp", "cause"))
+EXP = EventType("exp", ("amount", "total", "level"))
+DROP = EventType("drop", ("mob", "item", "amount"))
+CRAFT = EventType("craft", ("item", "quantity"))
+SMELT = EventType("smelt", ("item", "count", "fuel", "fuel_used"))
+DEATH = EventType("death", ("cause", "score", "level"))
+event_types = {typ.name: typ for typ in (DAMAGE, EXP, DROP, CRAFT, SMELT, DEATH)}
+
+class Publisher:
+	"Publishes the events of one player; events are (type, session, ticks, wall clock time, values) tuples"
+	__slots__ = ("bus", "session", "player")
+
+	def __init__(self, bus, session, player):
+		self.bus = bus
+		self.session = session
+		self.player = player
+
+	def publish(self, typ, *values):
+		subscribers = self.bus.subscribers
+		if subscribers:
+			event = (typ, self.session, self.player.ticks, time.time(), values)
+			for subscriber in subscribers:
+				subscriber(event)
+
+class EventBus:
+
+	def __init__(self):
+		self.subscribers = []
+		self.sessions = 0
+
+	def subscribe(self, subscriber):
+		"Calls subscriber(event) for every event published from now on"
+		self.subscribers.append(subscriber)
+
+	def unsubscribe(self, subscriber):
+		self.subscribers.remove(subscriber)
+
+	def attach(self, player, session=None):
+		"Starts publishing a player's events, under a session name or else a number"
+		if session is None:
+			self.sessions += 1
+			session = self.sessions
+		player.events = Publisher(self, session, player)
+		return player.events
+
+class RingBuffer:
+	"""A fixed number of slots with one thread adding items and another taking them
+	Each side only ever moves its own index, so no lock is needed. Items that arrive while it's full are dropped and counted."""
+	__slots__ = ("slots", "mask", "head", "tail", "dropped")
+
+	def __init__(self, capacity=65536):
+		size = 1
+		while size < capacity:
+			size *= 2
+		self.slots = [None] * size
+		self.mask = size - 1
+		self.head = 0 #Total number of items added, only changed by the adding side
+		self.tail = 0 #Total number of items taken, only changed by the taking side
+		self.dropped = 0
+
+	def __len__(self):
+		return self.head - self.tail
+
+	def push(self, item):
+		head = self.head
+		if head - self.tail > self.mask:
+			self.dropped += 1
+			return
+		self.slots[head & self.mask] = item
+		self.head = head + 1
+
+	def take(self):
+		"Returns every item added so far, oldest first"
+		head = self.head
+		start = self.tail & self.mask
+		end = head & self.mask
+		if head == self.tail:
+			return []
+		if start < end:
+			items = self.slots[start:end]
+		else:
+			items = self.slots[start:] + self.slots[:end]
+		self.tail = head
+		return items
+
+def jsonl_lines(events):
+	for typ, session, ticks, wall_time, values in events:
+		record = {"type": typ.name, "session": session, "ticks": ticks, "time_ms": int(wall_time * 1000)}
+		record.update(zip(typ.fields, values))
+		yield encode_json(record)
+
+def column_lines(events):
+	"Yields one line per event type in the batch, holding a list of every value of each field"
+	batches = {}
+	for typ, session, ticks, wall_time, values in events:
+		batch = batches.get(typ)
+		if batch is None:
+			batch = batches[typ] = []
+		batch.append((session, ticks, int(wall_time * 1000)) + values)
+	for typ, rows in batches.items():
+		columns = zip(*rows)
+		record = {"type": typ.name, "count": len(rows)}
+		record.update(zip(("session", "ticks", "time_ms") + typ.fields, map(list, columns)))
+		yield encode_json(record)
+
+formats = {"jsonl": jsonl_lines, "columns": column_lines}
+
+class EventWriter:
+	"Subscribes to a bus and writes its events to path from a background thread, every interval seconds"
+
+	def __init__(self, bus, path, format="jsonl", interval=0.5, max_bytes=64 * 2**20, capacity=65536):
+		if format not in formats:
+			raise ValueError(f"Unknown event format {format!r}")
+		self.bus = bus
+		self.path = path
+		self.lines = formats[format]
+		self.interval = interval
+		self.max_bytes = max_bytes
+		self.ring = RingBuffer(capacity)
+		self.file = None
+		self.written = 0
+		self.stopping = threading.Event()
+		self.thread = threading.Thread(target=self.run, name="EventWriter", daemon=True)
+
+	def start(self):
+		self.file = open(self.path, "a", encoding="utf-8")
+		self.bus.subscribe(self.ring.push)
+		self.thread.start()
+		return self
+
+	def close(self):
+		"Stops listening, then writes whatever is left"
+		if self.file is None:
+			return
+		self.bus.unsubscribe(self.ring.push)
+		self.stopping.set()
+		self.thread.join()
+		self.file.close()
+		self.file = None
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def run(self):
+		while not self.stopping.wait(self.interval):
+			self.write(self.ring.take())
+		self.write(self.ring.take())
+
+	def write(self, events):
+		if not events:
+			return
+		text = "\n".join(self.lines(events)) + "\n"
+		self.file.write(text)
+		self.file.flush()
+		if self.file.tell() >= self.max_bytes:
+			self.rotate()
+		self.written += len(events)
+
+	def rotate(self):
+		"Moves the current file to the next free name, like events.1.jsonl, and starts a new one"
+		self.file.close()
+		root, ext = os.path.splitext(self.path)
+		number = 1
+		while os.path.exists(f"{root}.{number}{ext}"):
+			number += 1
+		os.replace(self.path, f"{root}.{number}{ext}")
+		self.file = open(self.path, "a", encoding="utf-8")
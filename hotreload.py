@@ -0,0 +1,125 @@
+"""Reloads mobs.json, recipes.json and foods.json while the game is running, so balance changes don't need a restart
+A background thread waits for the files to change, using inotify on Linux and checking their modification times
+elsewhere. Only the changed files are parsed and validated, off the game loop, and only their tables are rebuilt; a
+file with errors is reported and the old content kept. The new tables are swapped in all together at the start of
+the next step of each game, so a step never sees half of a reload, and battles already going on finish with the
+mobs they started with. smelting.json isn't reloaded, since furnaces keep smelting with its times in the background.
+Usage: python MinecraftRPG.py --watch-content [--serve ...]"""
+import ctypes, ctypes.util, os, select, struct, sys, threading
+
+import MinecraftRPG
+from schema import ValidationError
+
+watched_files = ("mobs.json", "recipes.json", "foods.json")
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80 #Editors often save by writing a new file and renaming it over the old one
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+EVENT = struct.Struct("iIII")
+
+def open_inotify(folder):
+	"Returns a file descriptor that becomes readable when a file in folder is written, or None if inotify isn't available"
+	if not sys.platform.startswith("linux"):
+		return None
+	try:
+		libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+		fd = libc.inotify_init1(IN_NONBLOCK)
+	except (OSError, AttributeError):
+		return None
+	if fd < 0:
+		return None
+	if libc.inotify_add_watch(fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+		os.close(fd)
+		return None
+	return fd
+
+def changed_names(fd):
+	"Reads all of the waiting inotify events, returning the names of the files they were about"
+	names = set()
+	while True:
+		try:
+			buf = os.read(fd, 1 << 16)
+		except BlockingIOError:
+			return names
+		pos = 0
+		while pos < len(buf):
+			wd, mask, cookie, length = EVENT.unpack_from(buf, pos)
+			pos += EVENT.size
+			names.add(os.fsdecode(buf[pos:pos + length].rstrip(b"\0")))
+			pos += length
+
+class ContentWatcher:
+
+	def __init__(self, files=watched_files, interval=1.0, settle=0.2, report=None):
+		self.files = files
+		self.interval = interval #Seconds between checks when polling
+		self.settle = settle #Seconds to wait after a change for more of it, since a save can take several writes
+		self.report = report or (lambda message: print(message, file=sys.stderr))
+		self.folder = MinecraftRPG.content_dir
+		self.stamps = {}
+		self.fd = None
+		self.stopped = threading.Event()
+		self.thread = None
+		self.reloads = 0
+
+	def stamp(self, name):
+		try:
+			stat = os.stat(os.path.join(self.folder, name))
+		except OSError:
+			return None
+		return (stat.st_mtime_ns, stat.st_size)
+
+	def start(self):
+		MinecraftRPG.load_content()
+		self.stamps = {name: self.stamp(name) for name in self.files}
+		self.fd = open_inotify(self.folder)
+		self.thread = threading.Thread(target=self.run, name="content-watcher", daemon=True)
+		self.thread.start()
+		return self
+
+	def wait(self):
+		"Waits for something in the folder to change, or for the polling interval, returning False once stopped"
+		if self.fd is None:
+			return not self.stopped.wait(self.interval)
+		while not self.stopped.is_set():
+			readable, _, _ = select.select([self.fd], [], [], self.interval) #Wakes up now and then to notice close()
+			if readable and not changed_names(self.fd).isdisjoint(self.files):
+				if self.stopped.wait(self.settle):
+					return False
+				changed_names(self.fd) #Anything that came in while settling is covered by this reload
+				return True
+		return False
+
+	def run(self):
+		while self.wait():
+			self.check()
+
+	def check(self):
+		"Reloads the files that changed since they were last loaded, returning the names of the ones that were"
+		changed = []
+		for name in self.files:
+			stamp = self.stamp(name)
+			if stamp is not None and stamp != self.stamps[name]:
+				changed.append(name)
+				self.stamps[name] = stamp #A file with errors isn't tried again until it changes again
+		if not changed:
+			return changed
+		try:
+			data = MinecraftRPG.build_content(changed)
+			tables = MinecraftRPG.build_tables(data)
+		except (ValidationError, OSError, ValueError) as e: #Including a file caught halfway through being written, which isn't valid JSON
+			self.report(f"Not reloading {', '.join(changed)}: {e}")
+			return []
+		MinecraftRPG.stage_content(tables)
+		self.reloads += 1
+		self.report(f"Reloaded {', '.join(changed)}")
+		return changed
+
+	def close(self):
+		self.stopped.set()
+		if self.thread is not None:
+			self.thread.join()
+		if self.fd is not None:
+			os.close(self.fd)
+			self.fd = None
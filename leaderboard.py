@@ -0,0 +1,148 @@
+"""Ranks players by score, the most EXP they've had in any one game, which is what's shown as their score when they die
+Entries are kept sorted, best first, in a list of short sorted lists. Adding, moving or removing a player only
+touches one of them, so updates stay cheap with millions of players, and a player's rank is their position in
+their list plus the sizes of the lists before it. A PlayerStore's scores are read straight from its snapshots, and
+from the best scores it keeps for players' finished games.
+Usage: python leaderboard.py players.db [-k 10] [--player NAME]"""
+import argparse
+from bisect import bisect_left, insort
+
+try:
+	import numpy as np
+except ModuleNotFoundError:
+	np = None
+
+import events
+
+class Leaderboard:
+
+	def __init__(self, load=1000):
+		self.load = load #How big the lists can get before they're split in two
+		self.lists = [] #Sorted lists of (-score, name)
+		self.maxes = [] #The last key of each list, for finding the list a key belongs in
+		self.scores = {}
+
+	def __len__(self):
+		return len(self.scores)
+
+	def __contains__(self, name):
+		return name in self.scores
+
+	def score(self, name):
+		return self.scores.get(name)
+
+	def build(self, names, scores):
+		"Replaces everything with the given players, sorting them all at once rather than adding them one by one"
+		if np is not None and len(names) > 0:
+			names_array = np.array(names)
+			negated = -np.asarray(scores)
+			order = np.lexsort((names_array, negated)) #By score, then by name for ties
+			keys = list(zip(negated[order].tolist(), names_array[order].tolist()))
+		else:
+			keys = sorted(zip((-score for score in scores), names))
+		self.scores = {name: -negated for negated, name in keys}
+		self.lists = [keys[i:i + self.load] for i in range(0, len(keys), self.load)]
+		self.maxes = [chunk[-1] for chunk in self.lists]
+
+	def find(self, key):
+		"Returns the index of the list that key belongs in"
+		index = bisect_left(self.maxes, key)
+		return min(index, len(self.lists) - 1)
+
+	def insert(self, key):
+		if not self.lists:
+			self.lists.append([key])
+			self.maxes.append(key)
+			return
+		index = self.find(key)
+		keys = self.lists[index]
+		insort(keys, key)
+		self.maxes[index] = keys[-1]
+		if len(keys) > self.load * 2:
+			half = len(keys) // 2
+			self.lists[index:index + 1] = [keys[:half], keys[half:]]
+			self.maxes[index:index + 1] = [keys[half - 1], keys[-1]]
+
+	def delete(self, key):
+		index = self.find(key)
+		keys = self.lists[index]
+		del keys[bisect_left(keys, key)]
+		if keys:
+			self.maxes[index] = keys[-1]
+		else:
+			del self.lists[index]
+			del self.maxes[index]
+
+	def update(self, name, score):
+		"Sets a player's score, adding them if they're new"
+		old = self.scores.get(name)
+		if old == score:
+			return
+		if old is not None:
+			self.delete((-old, name))
+		self.scores[name] = score
+		self.insert((-score, name))
+
+	def raise_score(self, name, score):
+		"Sets a player's score if it's better than the one they have, so that starting a new game doesn't lower it"
+		old = self.scores.get(name)
+		if old is None or score > old:
+			self.update(name, score)
+
+	def remove(self, name):
+		score = self.scores.pop(name, None)
+		if score is not None:
+			self.delete((-score, name))
+
+	def rank(self, name):
+		"Returns a player's position, starting from 1 for the best score, or None if they aren't on the leaderboard"
+		score = self.scores.get(name)
+		if score is None:
+			return None
+		key = (-score, name)
+		index = self.find(key)
+		return sum(map(len, self.lists[:index])) + bisect_left(self.lists[index], key) + 1
+
+	def top(self, k=10):
+		"Returns the k best (name, score) pairs, best first"
+		top = []
+		for keys in self.lists:
+			for score, name in keys[:k - len(top)]:
+				top.append((name, -score))
+			if len(top) >= k:
+				break
+		return top
+
+	def on_event(self, event):
+		"Keeps scores up to date as players gain EXP, when subscribed to an EventBus"
+		typ, session, ticks, wall_time, values = event
+		if typ is events.EXP:
+			self.raise_score(session, values[1])
+
+	@staticmethod
+	def from_store(store):
+		board = Leaderboard()
+		names, exps, levels = store.scores()
+		board.build(names, exps)
+		return board
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("store", help="player store file, as given to --store")
+	parser.add_argument("-k", type=int, default=10, help="number of players to list (default: %(default)s)")
+	parser.add_argument("--player", help="also show this player's rank")
+	args = parser.parse_args()
+	from shard import open_store
+	store = open_store(args.store, readonly=True) #Every partition if it was split by --workers, left unchanged in case a server has it open
+	try:
+		board = Leaderboard.from_store(store)
+	finally:
+		store.close()
+	for rank, (name, score) in enumerate(board.top(args.k), 1):
+		print(f"{rank:4}. {name:20} {score}")
+	if args.player:
+		rank = board.rank(args.player)
+		print(f"{args.player} is not on the leaderboard" if rank is None else f"{args.player} is ranked {rank} of {len(board)} with {board.score(args.player)}")
+
+if __name__ == "__main__":
+	main()
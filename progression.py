@@ -0,0 +1,67 @@
+"""Levels from EXP, e.g. a player with 100 EXP is at level 8
+The EXP needed for each level is worked out once into a table, which grows as higher levels are reached, so finding
+a player's level is a binary search however much EXP they gained at once. Levels for many players at once,
+like everyone in a PlayerStore, use NumPy's searchsorted when it's installed."""
+from bisect import bisect_right
+
+try:
+	import numpy as np
+except ModuleNotFoundError:
+	np = None
+
+def get_exp_required_for_level(level):
+	"Returns the total EXP at which a player at this level moves up to the next one"
+	assert level >= 0
+	if level <= 16:
+		return level ** 2 + 6 * level
+	if level < 32:
+		return round(2.5 * level**2 - 40.5 * level + 360)
+	return round(4.5 * level**2 - 160.5 * level + 2220)
+
+class ProgressionTable:
+	__slots__ = ("thresholds", "array")
+
+	def __init__(self, levels=128):
+		self.thresholds = [get_exp_required_for_level(level) for level in range(levels)]
+		self.array = None #The thresholds as a NumPy array, made when first needed
+
+	def extend(self, exp=0, level=0):
+		"Makes sure the table goes past the given EXP and level"
+		thresholds = self.thresholds
+		if thresholds[-1] <= exp or len(thresholds) <= level:
+			size = len(thresholds)
+			while get_exp_required_for_level(size - 1) <= exp or size <= level:
+				size *= 2
+			thresholds.extend(get_exp_required_for_level(level) for level in range(len(thresholds), size))
+			self.array = None
+
+	def exp_required(self, level):
+		if level >= len(self.thresholds):
+			self.extend(level=level)
+		return self.thresholds[level]
+
+	def level_for(self, exp):
+		"Returns the level of a player with this much EXP"
+		if exp <= 0: #Players start at level 0, and only go up once they gain some EXP
+			return 0
+		self.extend(exp)
+		return bisect_right(self.thresholds, exp)
+
+	def levels_for(self, exps):
+		"Returns the levels for a sequence of EXP totals, as a NumPy array if NumPy is installed or else a list"
+		if np is None:
+			return [self.level_for(exp) for exp in exps]
+		exps = np.asarray(exps)
+		if len(exps) == 0:
+			return np.zeros(0, dtype=np.int64)
+		self.extend(int(exps.max()))
+		if self.array is None:
+			self.array = np.array(self.thresholds, dtype=np.int64)
+		levels = np.searchsorted(self.array, exps, side="right")
+		levels[exps <= 0] = 0
+		return levels
+
+table = ProgressionTable()
+exp_required = table.exp_required
+level_for = table.level_for
+levels_for = table.levels_for
@@ -0,0 +1,98 @@
+"""Collects a client's output and writes it out in one go, rather than a line at a time
+Everything written during a turn, like the status lines, the game's messages and the menu, is buffered until the client
+waits for input or pauses, so a turn costs a single write. Colors come from a cache of escape codes for each style.
+The modes are:
+	text - colored text, if termcolor is installed
+	plain - text without colors
+	quiet - only the menus and prompts, without formatting or writing the game's messages
+	json - one compact JSON event per line for automated clients, e.g. {"event":"result","action":"explore",...}
+	none - nothing at all, e.g. when replaying a recorded session"""
+import json, re
+
+modes = ("text", "plain", "quiet", "json", "none")
+ansi_escape = re.compile(r"\x1b\[[0-9;]*m")
+encode_json = json.JSONEncoder(separators=(",", ":")).encode #json.dumps() makes a new encoder on every call when given separators
+
+def strip_colors(text):
+	return ansi_escape.sub("", text) if "\x1b" in text else text
+
+class Renderer:
+	__slots__ = ("mode", "colored", "newline", "buffer", "styles")
+
+	def __init__(self, mode="text", colored=None, newline="\n"):
+		"colored is termcolor's colored() function, or None for no colors"
+		if mode not in modes:
+			raise ValueError(f"Unknown output mode {mode!r}")
+		self.mode = mode
+		self.colored = colored if mode == "text" else None
+		self.newline = newline
+		self.buffer = []
+		self.styles = {} #(color, attrs) -> the escape codes to put before and after the text
+
+	def style(self, color, attrs):
+		key = (color, tuple(attrs) if attrs else None)
+		style = self.styles.get(key)
+		if style is None:
+			style = tuple(self.colored("\0", color, attrs=attrs).split("\0", 1))
+			self.styles[key] = style
+		return style
+
+	def line(self, text="", color=None, attrs=None):
+		if self.mode == "none":
+			return
+		if self.mode == "json":
+			self.event({"event": "text", "text": strip_colors(text)})
+			return
+		if self.colored is None:
+			text = strip_colors(text)
+		elif color or attrs:
+			before, after = self.style(color, attrs)
+			text = before + text + after
+		self.buffer.append(text)
+		self.buffer.append(self.newline)
+
+	def event(self, event):
+		self.buffer.append(encode_json(event))
+		self.buffer.append(self.newline)
+
+	def choices(self, choices):
+		if self.mode == "none":
+			return
+		if self.mode == "json":
+			self.event({"event": "choices", "options": list(choices)})
+		else:
+			for index, choice in enumerate(choices):
+				self.line(f"{index + 1}. {choice}")
+
+	def result(self, result):
+		"Adds the output of an ActionResult"
+		mode = self.mode
+		if mode == "quiet" or mode == "none":
+			return
+		if mode == "json":
+			self.event({
+				"event": "result",
+				"action": result.action,
+				"ok": result.ok,
+				"messages": [strip_colors(text) for text, _, _ in result.messages],
+				"data": result.data,
+				"battle": result.battle.mob_name if result.battle is not None else None,
+				"dead": result.dead
+			})
+		else:
+			for text, color, attrs in result.messages:
+				self.line(text, color, attrs)
+
+	def prompt(self, text):
+		"Adds a prompt for input and returns everything that's waiting to be written"
+		if self.mode == "json":
+			self.event({"event": "prompt", "text": text})
+		elif self.mode != "none":
+			self.buffer.append(text)
+		return self.take()
+
+	def take(self):
+		"Returns everything that's waiting to be written and empties the buffer"
+		text = "".join(self.buffer)
+		self.buffer.clear()
+		return text
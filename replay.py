@@ -0,0 +1,146 @@
+"""Records a session's seed and input so that it can be played again exactly, e.g. to reproduce a bug report
+Every random draw in the game rules comes from the player's own seeded RNG, so the seed and the lines typed in are
+enough to replay a session. A replay skips all the pacing delays and output, and checks the player's state at the end
+against the state saved in the recording. The title screen's splashes use their own randomness and aren't replayed.
+Usage: python MinecraftRPG.py --record FILE [--seed SEED], then python MinecraftRPG.py --replay FILE..."""
+import asyncio, hashlib, json, time
+import rng
+from MinecraftRPG import GameOver, GameSession, content_hashes, play
+from render import Renderer
+
+RECORDING_VERSION = 1
+
+def rng_backend():
+	return "numpy" if rng.np is not None else "random"
+
+def content_hash():
+	return hashlib.sha256(b"".join(content_hashes())).hexdigest()
+
+def player_state(player):
+	"Returns what a replay needs to reproduce about a player, as plain data that can be saved as JSON"
+	state = {
+		"HP": player.HP,
+		"hunger": player.hunger,
+		"saturation": player.saturation,
+		"food_exhaustion": player.food_exhaustion,
+		"EXP": player.EXP,
+		"level": player.level,
+		"ticks": player.ticks,
+		"time": [player.time.mins, player.time.secs],
+		"dead": player.dead,
+		"death_reason": player.death_reason,
+		"inventory": dict(player.inventory),
+		"tools": [[tool.name, tool.durability] for tool in player.tools],
+		"weapon": player.tools.index(player.curr_weapon) if player.curr_weapon is not None else None,
+		"effects": {name: [effect.level, player.effect_time_left(name)] for name, effect in player.status_effects.items()}
+	}
+	furnace = player.furnace
+	if furnace is not None:
+		state["furnace"] = {"jobs": [list(job) for job in furnace.jobs], "done": dict(furnace.done), "burn": furnace.burn, "progress": furnace.progress, "exp": furnace.exp}
+	return json.loads(json.dumps(state)) #So that it compares equal to a state loaded back from a recording
+
+class RecordingClient:
+	"Passes everything through to another client, keeping each line of input"
+
+	def __init__(self, client):
+		self.client = client
+		self.out = client.out
+		self.inputs = []
+
+	def write(self, text="", color=None, attrs=None):
+		self.client.write(text, color, attrs)
+
+	def flush(self):
+		self.client.flush()
+
+	async def input(self, prompt=""):
+		line = await self.client.input(prompt)
+		self.inputs.append(line)
+		return line
+
+	async def sleep(self, secs):
+		await self.client.sleep(secs)
+
+class ReplayClient:
+	"Plays back recorded input as fast as possible, without any output or pacing"
+
+	def __init__(self, inputs):
+		self.out = Renderer("none")
+		self.inputs = iter(inputs)
+		self.used = 0
+
+	def write(self, text="", color=None, attrs=None):
+		pass
+
+	def flush(self):
+		pass
+
+	async def input(self, prompt=""):
+		for line in self.inputs:
+			self.used += 1
+			return line
+		raise GameOver() #The recording ended here, like the player closing the game
+
+	async def sleep(self, secs):
+		pass
+
+def save_recording(path, session, client):
+	player = session.player
+	recording = {
+		"version": RECORDING_VERSION,
+		"seed": player.rng.seed,
+		"rng": rng_backend(),
+		"content": content_hash(),
+		"inputs": client.inputs,
+		"final": player_state(player)
+	}
+	with open(path, "w") as f:
+		json.dump(recording, f, separators=(",", ":"))
+
+def load_recording(path):
+	with open(path) as f:
+		recording = json.load(f)
+	if recording.get("version") != RECORDING_VERSION:
+		raise ValueError(f"{path} is not a recording this version can replay")
+	return recording
+
+def differences(expected, actual):
+	"Returns a list of the keys of two player states that differ, with both values"
+	return [(key, expected.get(key), actual.get(key)) for key in sorted(expected.keys() | actual.keys()) if expected.get(key) != actual.get(key)]
+
+def replay(recording, stats=None):
+	"""Replays a loaded recording, returning (warnings, differences from the recorded final state, inputs used, seconds taken)
+	The warnings are about anything that could make the replay go differently, like changed content files"""
+	warnings = []
+	if recording["rng"] != rng_backend():
+		warnings.append(f"the recording used the {recording['rng']} random backend, but this is using {rng_backend()}")
+	if recording["content"] != content_hash():
+		warnings.append("the content files have changed since the recording was made")
+	session = GameSession(seed=recording["seed"], stats=stats)
+	client = ReplayClient(recording["inputs"])
+	start = time.perf_counter()
+	asyncio.run(play(client, session))
+	elapsed = time.perf_counter() - start
+	return warnings, differences(recording["final"], player_state(session.player)), client.used, elapsed
+
+def replay_files(paths, stats=None):
+	"Replays each recording and reports how it went, returning whether they all matched"
+	all_ok = True
+	for path in paths:
+		recording = load_recording(path)
+		warnings, diffs, used, elapsed = replay(recording, stats)
+		for warning in warnings:
+			print(f"{path}: warning: {warning}")
+		ticks = recording["final"]["ticks"]
+		print(f"{path}: replayed {used} inputs and {ticks} ticks in {elapsed:.3f} s")
+		if used < len(recording["inputs"]):
+			print(f"{path}: the game ended before the last {len(recording['inputs']) - used} inputs")
+			all_ok = False
+		if diffs:
+			all_ok = False
+			print(f"{path}: the final state doesn't match the recording:")
+			for key, expected, actual in diffs:
+				print(f"  {key}: recorded {expected!r}, replayed {actual!r}")
+		else:
+			print(f"{path}: the final state matches")
+	return all_ok
@@ -0,0 +1,186 @@
+"""Seedable random primitives for the game rules
+Each Player carries its own RNG, so sessions can be seeded and replayed independently of each other.
+Single draws are served from a buffer of uniform numbers that is refilled in bulk, and the batch forms
+(size=n, binomial, multinomial) resolve many trials with one call. NumPy is used when it is installed;
+a given seed gives a reproducible stream as long as the same backend is used."""
+import math, random
+from array import array
+from bisect import bisect
+from itertools import accumulate
+
+try:
+	import numpy as np
+except ModuleNotFoundError:
+	np = None
+
+class RNG:
+	__slots__ = ("seed", "gen", "buffer", "pos")
+	buffer_size = 64
+
+	def __init__(self, seed=None):
+		if seed is None:
+			seed = random.getrandbits(64)
+		self.seed = seed
+		if np is not None:
+			self.gen = np.random.default_rng(seed)
+		else:
+			self.gen = random.Random(seed)
+		self.buffer = None #Allocated on the first draw, so idle sessions don't pay for it
+		self.pos = 0
+
+	def refill(self):
+		#A packed array of doubles takes a third of the memory of a list of floats
+		if np is not None:
+			self.buffer = array("d", self.gen.random(self.buffer_size).tobytes())
+		else:
+			rand = self.gen.random
+			self.buffer = array("d", [rand() for _ in range(self.buffer_size)])
+		self.pos = 0
+
+	def random(self):
+		"Returns a uniform float in [0, 1)"
+		if self.buffer is None or self.pos >= self.buffer_size:
+			self.refill()
+		value = self.buffer[self.pos]
+		self.pos += 1
+		return value
+
+	def randoms(self, size):
+		"Returns size uniform floats in [0, 1), as an array if NumPy is available"
+		if np is not None:
+			return self.gen.random(size)
+		return [self.random() for _ in range(size)]
+
+	def uniform(self, a, b):
+		return a + (b - a) * self.random()
+
+	def randint(self, a, b, size=None):
+		"Returns a random integer N such that a <= N <= b; with size, returns that many of them"
+		if size is None:
+			return a + int(self.random() * (b - a + 1))
+		if np is not None:
+			return self.gen.integers(a, b + 1, size)
+		return [a + int(self.random() * (b - a + 1)) for _ in range(size)]
+
+	def randint_sum(self, a, b, size, chunk_size=1 << 16):
+		"Returns the total of size random integers N such that a <= N <= b, drawn in chunks to bound the memory used"
+		total = 0
+		for start in range(0, size, chunk_size):
+			n = min(chunk_size, size - start)
+			if np is not None:
+				total += int(self.gen.integers(a, b + 1, n).sum())
+			else:
+				total += sum(a + int(self.random() * (b - a + 1)) for _ in range(n))
+		return total
+
+	def choice(self, seq):
+		return seq[int(self.random() * len(seq))]
+
+	def weighted_choice(self, population, weights):
+		cum_weights = list(accumulate(weights))
+		return population[bisect(cum_weights, self.random() * cum_weights[-1])]
+
+	def one_in(self, x, size=None):
+		"Returns True with a probability of 1/x, otherwise returns False; with size, returns that many results"
+		if size is None:
+			return x <= 1 or self.random() * x < 1
+		if x <= 1:
+			return np.ones(size, bool) if np is not None else [True] * size
+		if np is not None:
+			return self.gen.random(size) * x < 1
+		return [self.random() * x < 1 for _ in range(size)]
+
+	def x_in_y(self, x, y, size=None):
+		"Returns True with a probability of x/y, otherwise returns False; with size, returns that many results"
+		if size is None:
+			return self.random() * y < x
+		if np is not None:
+			return self.gen.random(size) * y < x
+		return [self.random() * y < x for _ in range(size)]
+
+	def binomial(self, num, x, y=100):
+		"Returns how many of num independent trials succeed, where each one succeeds with a probability of x/y"
+		p = x / y
+		if num <= 0 or p <= 0:
+			return 0
+		if p >= 1:
+			return num
+		if np is not None:
+			return int(self.gen.binomial(num, p))
+		return self._binomial(num, p)
+
+	def _binomial(self, num, p):
+		#Inversion sampling, using one uniform draw per call; large means are split in half to keep it fast and avoid underflow
+		if p > 0.5:
+			return num - self._binomial(num, 1 - p)
+		if num * p > 50:
+			half = num // 2
+			return self._binomial(half, p) + self._binomial(num - half, p)
+		q = 1 - p
+		u = self.random()
+		prob = q ** num
+		cdf = prob
+		k = 0
+		while u >= cdf and k < num:
+			prob *= (num - k) / (k + 1) * p / q
+			k += 1
+			cdf += prob
+		return k
+
+	def geometric(self, p):
+		"Returns the number of trials up to and including the first success, where each one succeeds with probability p"
+		if p >= 1:
+			return 1
+		if p <= 0:
+			return math.inf
+		if np is not None:
+			return int(self.gen.geometric(p))
+		return 1 + int(math.log(1 - self.random()) / math.log(1 - p))
+
+	def negative_binomial(self, n, p):
+		"Returns the number of failures before the nth success, where each trial succeeds with probability p"
+		if n <= 0 or p >= 1:
+			return 0
+		if np is not None:
+			return int(self.gen.negative_binomial(n, p))
+		return sum(self.geometric(p) - 1 for _ in range(n))
+
+	def hypergeometric(self, good, bad, sample):
+		"Returns how many good items are among sample items drawn without replacement from good + bad items"
+		if np is not None:
+			return int(self.gen.hypergeometric(good, bad, sample))
+		count = 0
+		for _ in range(sample):
+			if self.random() * (good + bad) < good:
+				count += 1
+				good -= 1
+			else:
+				bad -= 1
+		return count
+
+	def multinomial(self, num, weights):
+		"Distributes num trials among outcomes with the given weights, returning a list of counts"
+		total = sum(weights)
+		if np is not None:
+			return self.gen.multinomial(num, [w / total for w in weights]).tolist()
+		counts = []
+		for w in weights[:-1]:
+			count = self.binomial(num, w, total) if total > 0 else 0
+			counts.append(count)
+			num -= count
+			total -= w
+		counts.append(num)
+		return counts
+
+	def round_stochastic(self, value):
+		"""Randomly rounds a number up or down, based on its decimal part
+		For example, 5.3 has a 70% chance to be rounded to 5, 30% chance to be rounded to 6
+		And 2.8 has an 80% chance to be rounded to 3, 20% chance to be rounded to 2
+		Also accepts a list or NumPy array, rounding each element"""
+		if np is not None and isinstance(value, np.ndarray):
+			low = np.floor(value)
+			return (low + (self.gen.random(value.shape) < value - low)).astype(int)
+		if isinstance(value, (list, tuple)):
+			return [self.round_stochastic(v) for v in value]
+		low = math.floor(value)
+		return low + (self.random() < value - low)
@@ -0,0 +1,262 @@
+"""Declarative schemas for the JSON content files, compiled once into fast validators
+A schema is built out of Value, ListOf, MapOf and Object, and compiled into a chain of closures that check a whole
+file in one pass. Each error is collected with its JSON path rather than stopping at the first one, and objects
+are built straight from the parsed JSON, e.g.
+	drop = Object({"item": Field((str, list)), "quantity": Field(int, 1)})
+	loader = Loader(ListOf(drop))
+	drops = loader.load(json.load(f), "drops.json") #Raises a ValidationError listing every problem in the file"""
+
+number = (int, float)
+MISSING = object() #A field that isn't there, or a value that failed validation
+REQUIRED = object()
+OPTIONAL = object() #Left out of the result when it isn't there
+
+class ValidationError(Exception):
+	"Every problem found in some content; errors is a list of (path, message) pairs"
+
+	def __init__(self, errors, limit=50):
+		self.errors = errors
+		lines = [f"{len(errors)} error{'s' if len(errors) != 1 else ''} in the content:"]
+		lines.extend(f"  {path}: {message}" for path, message in errors[:limit])
+		if len(errors) > limit:
+			lines.append(f"  ...and {len(errors) - limit} more")
+		super().__init__("\n".join(lines))
+
+def format_path(path):
+	"Turns a path of nested (parent, key) pairs into text like mobs.json[3].death_drops[0]"
+	keys = []
+	while path is not None:
+		path, key = path
+		keys.append(key)
+	text = ""
+	for key in reversed(keys):
+		if isinstance(key, int):
+			text += f"[{key}]"
+		elif not text:
+			text = key
+		elif key.isidentifier():
+			text += f".{key}"
+		else:
+			text += f"[{key!r}]"
+	return text or "(top level)"
+
+def type_names(types):
+	if not isinstance(types, tuple):
+		types = (types,)
+	names = {int: "an integer", float: "a number", str: "a string", bool: "true or false", list: "a list", dict: "an object"}
+	if set(types) == {int, float}:
+		return "a number"
+	return " or ".join(names.get(typ, typ.__name__) for typ in types)
+
+def json_type(value):
+	return {bool: "true/false", int: "an integer", float: "a number", str: "a string", list: "a list", dict: "an object", type(None): "null"}.get(type(value), type(value).__name__)
+
+class Value:
+	"A single value of the given type or types, optionally one of some choices or passing check(value), which returns an error message or None"
+	passthrough = True #Valid values come out as they went in
+
+	def __init__(self, types, choices=None, check=None):
+		self.types = types
+		self.choices = choices
+		self.check = check
+
+	def compile(self):
+		types, choices, check = self.types, self.choices, self.check
+		expected = type_names(types)
+		def validate(value, path, errors):
+			if not isinstance(value, types):
+				errors.append((path, f"expected {expected}, got {json_type(value)}"))
+				return MISSING
+			if choices is not None and value not in choices:
+				errors.append((path, f"{value!r} isn't one of {', '.join(map(repr, choices))}"))
+				return MISSING
+			if check is not None:
+				message = check(value)
+				if message:
+					errors.append((path, message))
+					return MISSING
+			return value
+		return validate
+
+class ListOf:
+	"A list of items that all match a schema, optionally of a fixed length"
+
+	def __init__(self, item, length=None, build=None):
+		self.item = as_node(item)
+		self.length = length
+		self.build = build
+
+	@property
+	def passthrough(self):
+		return self.build is None and self.item.passthrough
+
+	def compile(self):
+		item, length, build = self.item, self.length, self.build
+		if isinstance(item, Value) and item.choices is None and item.check is None:
+			types = item.types #Checked inline; the list is only gone through again to find the bad items
+		else:
+			types = None
+		passthrough = item.passthrough #Then the list itself can be kept, rather than a copy of it
+		item = item.compile()
+		def validate(value, path, errors):
+			if type(value) is not list:
+				errors.append((path, f"expected a list, got {json_type(value)}"))
+				return MISSING
+			if length is not None and len(value) != length:
+				errors.append((path, f"expected a list of {length} items, got {len(value)}"))
+				return MISSING
+			if types is not None:
+				for entry in value:
+					if not isinstance(entry, types):
+						break
+				else:
+					return build(value) if build is not None else value
+			count = len(errors)
+			if passthrough:
+				for index, entry in enumerate(value):
+					item(entry, (path, index), errors)
+				result = value
+			else:
+				result = [item(entry, (path, index), errors) for index, entry in enumerate(value)]
+			if len(errors) > count:
+				return MISSING
+			return build(result) if build is not None else result
+		return validate
+
+class MapOf:
+	"An object with any keys, whose values all match a schema, like recipes.json"
+
+	def __init__(self, value, build=None):
+		self.value = as_node(value)
+		self.build = build
+
+	@property
+	def passthrough(self):
+		return self.build is None and self.value.passthrough
+
+	def compile(self):
+		passthrough = self.value.passthrough
+		item = self.value.compile()
+		build = self.build
+		def validate(value, path, errors):
+			if type(value) is not dict:
+				errors.append((path, f"expected an object, got {json_type(value)}"))
+				return MISSING
+			count = len(errors)
+			if passthrough:
+				for key, entry in value.items():
+					item(entry, (path, key), errors)
+				result = value
+			else:
+				result = {key: item(entry, (path, key), errors) for key, entry in value.items()}
+			if len(errors) > count:
+				return MISSING
+			return build(result) if build is not None else result
+		return validate
+
+class Field:
+	"A field of an Object, with the schema of its value and either a default, REQUIRED or OPTIONAL"
+
+	def __init__(self, schema, default=REQUIRED):
+		self.schema = schema
+		self.default = default
+
+class Object:
+	"""An object with known fields, built into something else by build(fields) once they're all valid
+	checks are functions of the fields that return an error message or None, for rules across fields"""
+
+	def __init__(self, fields, build=None, checks=()):
+		self.fields = {name: field if isinstance(field, Field) else Field(field) for name, field in fields.items()}
+		self.build = build
+		self.checks = checks
+
+	@property
+	def passthrough(self):
+		"Without a build or defaults to fill in, a valid object comes out as it went in, including any fields it doesn't know"
+		return self.build is None and all(field.default in (REQUIRED, OPTIONAL) and as_node(field.schema).passthrough for field in self.fields.values())
+
+	def compile(self):
+		#Generates a function that checks each field in turn, with the types, defaults and messages filled in, which
+		#runs about as fast as checking the fields by hand
+		namespace = {"MISSING": MISSING, "json_type": json_type, "build": self.build}
+		passthrough = self.passthrough
+		lines = [
+			"def validate(value, path, errors):",
+			"	if type(value) is not dict:",
+			"		errors.append((path, 'expected an object, got ' + json_type(value)))",
+			"		return MISSING",
+			"	count = len(errors)",
+			"	get = value.get",
+			"	fields = value" if passthrough else "	fields = {}"
+		]
+		for i, (name, field) in enumerate(self.fields.items()):
+			schema, key = field.schema, repr(name)
+			lines.append(f"	v = get({key}, MISSING)")
+			lines.append("	if v is MISSING:")
+			if field.default is REQUIRED:
+				message = f"missing required field {name!r}"
+				lines.append(f"		errors.append((path, {message!r}))")
+			elif field.default is OPTIONAL:
+				lines.append("		pass")
+			else:
+				namespace[f"default{i}"] = field.default
+				lines.append(f"		fields[{key}] = default{i}")
+			schema = as_node(schema)
+			if isinstance(schema, Value): #Checked inline, which saves a call per field
+				namespace[f"types{i}"] = schema.types
+				lines.append(f"	elif not isinstance(v, types{i}):")
+				message = f"expected {type_names(schema.types)}, got "
+				lines.append(f"		errors.append(((path, {key}), {message!r} + json_type(v)))")
+				if schema.choices is not None:
+					namespace[f"choices{i}"] = schema.choices
+					lines.append(f"	elif v not in choices{i}:")
+					message = f" isn't one of {', '.join(map(repr, schema.choices))}"
+					lines.append(f"		errors.append(((path, {key}), repr(v) + {message!r}))")
+				if schema.check is not None:
+					namespace[f"check{i}"] = schema.check
+					lines.append(f"	elif message := check{i}(v):")
+					lines.append(f"		errors.append(((path, {key}), message))")
+				if not passthrough:
+					lines.append("	else:")
+					lines.append(f"		fields[{key}] = v")
+			else:
+				namespace[f"schema{i}"] = schema.compile()
+				call = f"schema{i}(v, (path, {key}), errors)"
+				lines.append("	else:")
+				lines.append(f"		{call}" if passthrough else f"		fields[{key}] = {call}")
+		lines.append("	if len(errors) > count:")
+		lines.append("		return MISSING")
+		for i, check in enumerate(self.checks): #Only once the fields themselves are valid
+			namespace[f"rule{i}"] = check
+			lines.append(f"	if message := rule{i}(fields):")
+			lines.append("		errors.append((path, message))")
+			lines.append("		return MISSING")
+		lines.append("	return build(fields)" if self.build is not None else "	return fields")
+		exec("\n".join(lines), namespace)
+		return namespace["validate"]
+
+def as_node(schema):
+	"Lets a plain type or tuple of types stand for a Value"
+	return Value(schema) if isinstance(schema, (type, tuple)) else schema
+
+class Loader:
+	"A compiled schema"
+
+	def __init__(self, schema):
+		self.schema = as_node(schema)
+		self.validate = self.schema.compile()
+
+	def check(self, value, source, errors):
+		"Validates and builds value, adding any errors to the list with paths starting at source, e.g. a file name"
+		return self.validate(value, (None, source), errors)
+
+	def load(self, value, source=""):
+		"Validates and builds value, raising a ValidationError with all of its problems if there are any"
+		errors = []
+		result = self.check(value, source, errors)
+		if errors:
+			raise ValidationError(format_errors(errors))
+		return result
+
+def format_errors(errors):
+	return [(format_path(path), message) for path, message in errors]
@@ -0,0 +1,167 @@
+"""Hosts the game for many players at once over line-based TCP, e.g. with telnet or netcat
+Every connection gets its own GameSession, and all of them run as coroutines on one event loop,
+so pacing delays and slow clients only hold up their own session.
+With a PlayerStore, players pick a name when they connect and carry on from where they left off.
+Usage: python MinecraftRPG.py --serve [--host HOST] [--port PORT] [--store FILE] [--output MODE]"""
+import asyncio
+from MinecraftRPG import GameOver, GameSession, Player, colored, play
+from render import Renderer
+from leaderboard import Leaderboard
+from events import EventBus
+
+class SocketClient:
+
+	def __init__(self, reader, writer, output="text"):
+		self.reader = reader
+		self.writer = writer
+		self.out = Renderer(output, colored, "\r\n") #Output is sent once per prompt or pause rather than per line
+
+	def write(self, text="", color=None, attrs=None):
+		self.out.line(text, color, attrs)
+
+	def flush(self):
+		text = self.out.take()
+		if text and not self.writer.is_closing():
+			self.writer.write(text.encode())
+
+	async def input(self, prompt=""):
+		if self.writer.is_closing():
+			raise GameOver()
+		self.writer.write(self.out.prompt(prompt).encode())
+		await self.writer.drain() #Waits here if the client isn't keeping up with our output
+		line = await self.reader.readline()
+		if not line:
+			raise GameOver()
+		return bytes(b for b in line if b < 128).decode().strip() #Drops telnet option negotiation and other non-ASCII bytes
+
+	async def sleep(self, secs):
+		self.flush()
+		await self.writer.drain()
+		await asyncio.sleep(secs)
+
+class GameServer:
+
+	def __init__(self, host="127.0.0.1", port=25565, max_line=1024, store=None, output="text", events=None, stats=None, flush_interval=5):
+		self.host = host
+		self.port = port
+		self.max_line = max_line
+		self.store = store
+		self.output = output
+		self.events = events #An EventBus to attach each player to, if telemetry is on
+		self.stats = stats #A Stats shared by every session, if they're being timed
+		self.flush_interval = flush_interval #Seconds between writing out the store's journal, the most play a crash can lose
+		self.leaderboard = None
+		if store is not None:
+			self.leaderboard = Leaderboard.from_store(store)
+			if self.events is None:
+				self.events = EventBus()
+			self.events.subscribe(self.leaderboard.on_event) #So that ranks change as soon as players gain EXP
+		self.clients = set()
+		self.players = {} #Name -> Player for everyone currently playing, so the same player can't be loaded twice
+		self.server = None
+
+	async def start(self):
+		self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=self.max_line, backlog=1024)
+		self.start_flushing()
+		return self.server
+
+	def start_flushing(self):
+		"Starts writing out the store every flush_interval seconds in the background, if there is one"
+		if self.store is not None:
+			return asyncio.get_running_loop().create_task(self.flush_periodically())
+
+	async def flush_periodically(self):
+		while True:
+			await asyncio.sleep(self.flush_interval)
+			self.store.flush()
+
+	async def adopt(self, sock, name=None):
+		"Serves a connection accepted somewhere else, like by a shard.Supervisor, which may have asked for the player's name already"
+		reader, writer = await asyncio.open_connection(sock=sock, limit=self.max_line)
+		await self.handle(reader, writer, name)
+
+	async def handle(self, reader, writer, given_name=None):
+		client = SocketClient(reader, writer, self.output)
+		self.clients.add(client)
+		name = None
+		try:
+			if self.store is not None:
+				name = await self.login(client, given_name)
+				session = GameSession(self.players[name], stats=self.stats)
+			else:
+				session = GameSession(stats=self.stats)
+			if self.events is not None:
+				self.events.attach(session.player, name)
+			commands = None
+			if self.leaderboard is not None:
+				commands = {"top": lambda: self.show_leaderboard(client, name)}
+			session = await play(client, session, commands)
+			if session is not None:
+				client.write("Thanks for playing!")
+			client.flush()
+			await writer.drain()
+		except (ConnectionError, GameOver, ValueError): #ValueError is raised for lines longer than max_line
+			pass
+		finally:
+			if name is not None:
+				self.save(name)
+			self.clients.discard(client)
+			writer.close()
+
+	async def login(self, client, name=None):
+		"Asks for a player name, unless it was asked for already, then loads that player from the store, or starts a new one"
+		ask = name is None
+		while True:
+			if ask:
+				name = await client.input("Name: ")
+				if not name:
+					continue
+			if name not in self.players:
+				break
+			client.write("That player is already playing")
+			if not ask: #This worker was picked for the name, so a different one can't be given here
+				client.flush()
+				raise GameOver()
+		player = self.store.load(name)
+		if player is None or player.dead:
+			if player is not None: #Their last game's score stays on the leaderboard
+				self.store.record_score(name, player.EXP)
+			player = Player()
+		else:
+			client.write(f"Welcome back, {name}")
+		self.store.track(name, player)
+		self.players[name] = player
+		self.leaderboard.raise_score(name, player.EXP)
+		client.write(f"You are ranked {self.leaderboard.rank(name)} of {len(self.leaderboard)}; type top at the menu to see the leaderboard")
+		return name
+
+	def show_leaderboard(self, client, name, k=10):
+		for rank, (player, score) in enumerate(self.leaderboard.top(k), 1):
+			client.write(f"{rank:3}. {player:20} {score}")
+		client.write(f"You are ranked {self.leaderboard.rank(name)} of {len(self.leaderboard)}")
+
+	def save(self, name):
+		player = self.players.pop(name, None)
+		if player is not None:
+			self.store.save(name, player)
+			self.store.flush()
+
+	def save_all(self):
+		for name in list(self.players):
+			self.save(name)
+
+async def serve(host="127.0.0.1", port=25565, store_path=None, output="text", events=None, stats=None):
+	store = None
+	if store_path is not None:
+		from store import PlayerStore
+		store = PlayerStore(store_path)
+	game_server = GameServer(host, port, store=store, output=output, events=events, stats=stats)
+	server = await game_server.start()
+	print(f"Serving on {host}:{port}")
+	try:
+		async with server:
+			await server.serve_forever()
+	finally:
+		if store is not None:
+			game_server.save_all()
+			store.close()
@@ -0,0 +1,460 @@
+"""Spreads the sessions of --serve over several worker processes, so that the server can use more than one core
+A supervisor process accepts every connection, asks for the player's name if there's a store, and picks a worker for
+the player by consistent hashing, so the same player always goes to the same worker. The connection itself is then
+passed to that worker, which runs the game for it like a single-process server. The content is loaded once by the
+supervisor before the workers are forked, so they don't each parse the files again. Its pages start out shared, but
+reference counting copies the pages of whatever a worker uses into that worker; benchmarks/sharing.py measures how much.
+A store can only be written by one process, so it's split into a fixed number of partitions (players.part0.db and
+so on), with each player always in the same one, picked from their name. Partitions rather than players are spread
+over the workers, and each partition is only ever open in one of them. A worker that dies is started again, and its
+players can reconnect to the new one; if it keeps dying straight after starting, it's taken out and its partitions
+go to the other workers instead, so its players keep their progress. The same goes for changing the number of
+workers. Passing connections between processes needs Unix domain sockets, so this is only available on Unix.
+Usage: python MinecraftRPG.py --serve --workers [N] [--store FILE] ..."""
+import asyncio, gc, hashlib, json, multiprocessing, os, selectors, signal, socket, sys, time
+from bisect import bisect
+
+from MinecraftRPG import colored, load_content
+from render import Renderer
+from store import PlayerStore, StoreError
+
+class HashRing:
+	"""Consistent hashing: each node has many points on a ring, and a key goes to the node of the first point after its hash
+	Taking a node out only moves the keys that were on it, spreading them over the others"""
+
+	def __init__(self, nodes=(), replicas=100):
+		self.replicas = replicas
+		self.hashes = []
+		self.nodes = []
+		for node in nodes:
+			self.add(node)
+
+	@staticmethod
+	def hash(key):
+		return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "big")
+
+	def __len__(self):
+		return len(set(self.nodes))
+
+	def __contains__(self, node):
+		return node in self.nodes
+
+	def add(self, node):
+		for i in range(self.replicas):
+			h = self.hash(f"{node}#{i}")
+			index = bisect(self.hashes, h)
+			self.hashes.insert(index, h)
+			self.nodes.insert(index, node)
+
+	def remove(self, node):
+		points = [(h, n) for h, n in zip(self.hashes, self.nodes) if n != node]
+		self.hashes = [h for h, _ in points]
+		self.nodes = [n for _, n in points]
+
+	def node_for(self, key):
+		if not self.hashes:
+			raise LookupError("there are no nodes to pick from")
+		return self.nodes[bisect(self.hashes, self.hash(key)) % len(self.hashes)]
+
+def shard_path(path, shard):
+	"Returns the file a worker uses in place of path, e.g. events.shard0.jsonl for events.jsonl"
+	root, ext = os.path.splitext(path)
+	return f"{root}.shard{shard}{ext}"
+
+def partition_path(path, partition):
+	"Returns the file of one partition of a store, e.g. players.part0.db for players.db"
+	root, ext = os.path.splitext(path)
+	return f"{root}.part{partition}{ext}"
+
+def store_partitions(path, default=64):
+	"""Returns how many partitions a store is split into, which is recorded next to it when it's first used, since
+	changing it would move players to different files"""
+	manifest = path + ".partitions"
+	try:
+		with open(manifest) as f:
+			return int(f.read())
+	except FileNotFoundError:
+		with open(manifest, "w") as f:
+			f.write(f"{default}\n")
+		return default
+
+def partition_of(name, partitions):
+	return HashRing.hash(name) % partitions
+
+class PartitionedStore:
+	"""The partitions of a store that one worker has open, with the same methods as a PlayerStore
+	A worker opens the partitions it was given when it starts, and any others when their players are sent to it
+	after the worker that had them is taken out. With owned=None, every partition is opened. Partitions that have no
+	players yet are only created once they get one."""
+
+	def __init__(self, path, partitions, owned=None, readonly=False):
+		self.path = path
+		self.partitions = partitions
+		self.readonly = readonly
+		self.stores = {}
+		for partition in range(partitions) if owned is None else owned:
+			if os.path.exists(partition_path(path, partition)):
+				self.open(partition)
+
+	def open(self, partition):
+		store = self.stores.get(partition)
+		if store is None:
+			store = self.stores[partition] = PlayerStore(partition_path(self.path, partition), readonly=self.readonly)
+		return store
+
+	def store_for(self, name):
+		return self.open(partition_of(name, self.partitions))
+
+	def __contains__(self, name):
+		return name in self.store_for(name)
+
+	def load(self, name):
+		return self.store_for(name).load(name)
+
+	def save(self, name, player):
+		self.store_for(name).save(name, player)
+
+	def track(self, name, player):
+		self.store_for(name).track(name, player)
+
+	def record_score(self, name, score):
+		self.store_for(name).record_score(name, score)
+
+	def flush(self):
+		for store in self.stores.values():
+			store.flush()
+
+	def player_names(self):
+		return [name for store in self.stores.values() for name in store.player_names()]
+
+	def scores(self):
+		names, exps, levels = [], [], []
+		for store in self.stores.values():
+			more_names, more_exps, more_levels = store.scores()
+			names += more_names
+			exps += more_exps
+			levels += more_levels
+		return names, exps, levels
+
+	def close(self):
+		for store in self.stores.values():
+			store.close()
+
+def open_store(path, readonly=False):
+	"Opens a store given to --store, as a PartitionedStore of all of its partitions if it was used with --workers"
+	if os.path.exists(path + ".partitions"):
+		return PartitionedStore(path, store_partitions(path), readonly=readonly)
+	return PlayerStore(path, readonly=readonly)
+
+class OtherPartitions:
+	"""Keeps a worker's leaderboard up to date with the players in the partitions that other workers have open
+	Their files are opened read-only and caught up every so often, so those players' scores are as recent as the
+	last time their worker wrote out its store. Only the players with new records are looked at each time."""
+
+	def __init__(self, store, leaderboard):
+		self.store = store #The worker's own PartitionedStore
+		self.leaderboard = leaderboard
+		self.readers = {}
+
+	def refresh(self):
+		for partition in range(self.store.partitions):
+			reader = self.readers.get(partition)
+			if partition in self.store.stores: #Open in this worker, whose leaderboard already has its players' scores as they change
+				if reader is not None:
+					del self.readers[partition]
+					reader.close()
+				continue
+			try:
+				if reader is None:
+					path = partition_path(self.store.path, partition)
+					if not os.path.exists(path):
+						continue
+					reader = self.readers[partition] = PlayerStore(path, readonly=True)
+				names, scores, levels = reader.scores(reader.refresh())
+			except (OSError, StoreError): #Caught part way through being created or compacted; tried again next time
+				if reader is not None:
+					del self.readers[partition]
+					reader.close()
+				continue
+			for name, score in zip(names, scores):
+				self.leaderboard.raise_score(name, score)
+
+	async def refresh_periodically(self, interval):
+		while True:
+			self.refresh()
+			await asyncio.sleep(interval)
+
+	def close(self):
+		for reader in self.readers.values():
+			reader.close()
+		self.readers.clear()
+
+class WorkerProcess:
+	__slots__ = ("shard", "process", "channel", "started")
+
+	def __init__(self, shard, process, channel):
+		self.shard = shard
+		self.process = process
+		self.channel = channel #The supervisor's end of the socket that connections are passed over
+		self.started = time.monotonic()
+
+class Supervisor:
+
+	def __init__(self, host="127.0.0.1", port=25565, workers=None, options=None, max_line=1024, login_timeout=60, min_uptime=5):
+		self.host = host
+		self.port = port
+		self.num_workers = workers or os.cpu_count() or 1
+		self.options = options or {} #Passed on to each worker; see run_worker()
+		self.max_line = max_line
+		self.login_timeout = login_timeout
+		self.min_uptime = min_uptime #A worker that dies sooner than this after starting isn't started again
+		self.renderer = Renderer(self.options.get("output", "text"), colored, "\r\n")
+		self.ring = HashRing(range(self.num_workers))
+		self.partitions = None #How many partitions the store is split into, once started with one
+		self.workers = {}
+		self.logins = {} #Connection -> (name read so far, when it connected), for connections still giving their name
+		self.selector = selectors.DefaultSelector()
+		self.listener = None
+		methods = multiprocessing.get_all_start_methods()
+		self.context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+	def inherited(self):
+		"Returns the supervisor's own file descriptors, which a forked worker closes"
+		if self.context.get_start_method() != "fork":
+			return []
+		fds = [worker.channel.fileno() for worker in self.workers.values()]
+		fds.extend(conn.fileno() for conn in self.logins)
+		if self.listener is not None:
+			fds.append(self.listener.fileno())
+		return fds
+
+	def start_worker(self, shard):
+		channel, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+		owned = [] if self.partitions is None else [partition for partition in range(self.partitions) if self.ring.node_for(partition) == shard]
+		process = self.context.Process(target=run_worker, args=(shard, child, self.options, owned, self.inherited() + [channel.fileno()]), name=f"worker-{shard}", daemon=True)
+		process.start()
+		child.close()
+		worker = self.workers[shard] = WorkerProcess(shard, process, channel)
+		self.selector.register(process.sentinel, selectors.EVENT_READ, ("died", worker))
+
+	def start(self):
+		load_content()
+		if self.options.get("store"):
+			self.partitions = self.options["partitions"] = store_partitions(self.options["store"])
+		gc.freeze() #Keeps the collector from copying the content's pages into the workers; using the content still copies some, see benchmarks/sharing.py
+		for shard in range(self.num_workers):
+			self.start_worker(shard)
+		self.listener = socket.create_server((self.host, self.port), backlog=1024)
+		self.listener.setblocking(False)
+		self.selector.register(self.listener, selectors.EVENT_READ, ("accept", None))
+
+	def serve_forever(self):
+		while True:
+			for key, _ in self.selector.select(timeout=1):
+				what, value = key.data
+				if what == "accept":
+					self.accept()
+				elif what == "login":
+					self.read_name(value)
+				else:
+					self.worker_died(value)
+			self.expire_logins()
+
+	def accept(self):
+		try:
+			conn, address = self.listener.accept()
+		except (BlockingIOError, ConnectionError):
+			return
+		if self.options.get("store") is None: #Without names, players are spread out by where they connect from
+			self.hand_off(conn, f"{address[0]}:{address[1]}")
+			return
+		conn.setblocking(False)
+		self.logins[conn] = (b"", time.monotonic())
+		self.selector.register(conn, selectors.EVENT_READ, ("login", conn))
+		self.send(conn, self.renderer.prompt("Name: "))
+
+	def send(self, conn, text):
+		try:
+			conn.send(text.encode())
+		except OSError:
+			pass
+
+	def read_name(self, conn):
+		"""Reads what's arrived of a player's name, handing the connection off once the whole line is in
+		Input is peeked at first so that nothing after the name is taken, since that belongs to the worker"""
+		line, connected = self.logins[conn]
+		try:
+			data = conn.recv(self.max_line, socket.MSG_PEEK)
+		except BlockingIOError:
+			return
+		except OSError:
+			data = b""
+		end = data.find(b"\n")
+		if data:
+			line += conn.recv(len(data) if end < 0 else end + 1)
+		if not data or len(line) > self.max_line:
+			self.drop_login(conn)
+			return
+		if end < 0:
+			self.logins[conn] = (line, connected)
+			return
+		name = bytes(b for b in line if b < 128).decode().strip() #The same as SocketClient.input()
+		if not name:
+			self.logins[conn] = (b"", connected)
+			self.send(conn, self.renderer.prompt("Name: "))
+			return
+		self.selector.unregister(conn)
+		del self.logins[conn]
+		conn.setblocking(True)
+		self.hand_off(conn, name, name)
+
+	def drop_login(self, conn):
+		self.selector.unregister(conn)
+		del self.logins[conn]
+		conn.close()
+
+	def expire_logins(self):
+		now = time.monotonic()
+		for conn, (line, connected) in list(self.logins.items()):
+			if now - connected > self.login_timeout:
+				self.drop_login(conn)
+
+	def worker_for(self, key, name=None):
+		"Returns the shard of the worker for a player, by the partition of their name if there's a store, or else by key"
+		if name is not None and self.partitions is not None:
+			return self.ring.node_for(partition_of(name, self.partitions))
+		return self.ring.node_for(key)
+
+	def hand_off(self, conn, key, name=None):
+		"Passes a connection to the worker for a player, closing the supervisor's copy of it"
+		worker = self.workers.get(self.worker_for(key, name))
+		try:
+			if worker is None:
+				raise ConnectionError("the worker isn't running")
+			socket.send_fds(worker.channel, [json.dumps({"name": name}).encode()], [conn.fileno()])
+		except OSError:
+			self.send(conn, "The server is busy, try again soon\r\n")
+		conn.close()
+
+	def worker_died(self, worker):
+		self.selector.unregister(worker.process.sentinel)
+		worker.process.join()
+		worker.channel.close()
+		del self.workers[worker.shard]
+		code = worker.process.exitcode
+		if time.monotonic() - worker.started < self.min_uptime:
+			self.ring.remove(worker.shard)
+			print(f"Worker {worker.shard} keeps dying (exit code {code}); its players will go to the other workers", file=sys.stderr) #Which open its partitions as they're needed
+			if not self.workers:
+				raise RuntimeError("every worker has died")
+		else:
+			print(f"Worker {worker.shard} died (exit code {code}); starting it again", file=sys.stderr)
+			self.start_worker(worker.shard)
+
+	def close(self):
+		if self.listener is not None:
+			self.listener.close()
+		for conn in list(self.logins):
+			self.drop_login(conn)
+		for worker in self.workers.values():
+			worker.channel.close() #Workers stop, saving their players, once their channel closes
+		for worker in self.workers.values():
+			worker.process.join()
+		self.selector.close()
+
+def run_worker(shard, channel, options, owned=(), inherited=()):
+	for signum in (signal.SIGINT, signal.SIGTERM): #These go to the supervisor, which closes the channel to stop this
+		signal.signal(signum, signal.SIG_IGN)
+	for fd in inherited:
+		os.close(fd)
+	asyncio.run(worker_main(shard, channel, options, owned))
+
+async def worker_main(shard, channel, options, owned=()):
+	"Runs a GameServer for the connections passed over channel, until the supervisor closes it"
+	import events
+	from server import GameServer
+	from stats import Stats
+	store = bus = writer = stats = watcher = None
+	if options.get("store"):
+		store = PartitionedStore(options["store"], options["partitions"], owned)
+	if options.get("events"):
+		bus = events.EventBus()
+		writer = events.EventWriter(bus, shard_path(options["events"], shard), options.get("events_format", "jsonl")).start()
+	if options.get("stats"):
+		stats = Stats()
+		if options.get("profile"):
+			stats.profile(options["profile"], options.get("profile_every", 1))
+	if options.get("watch_content"): #Each worker reloads its own copy of the tables that changed
+		import hotreload
+		watcher = hotreload.ContentWatcher().start()
+	game_server = GameServer(store=store, output=options.get("output", "text"), events=bus, stats=stats)
+	flusher = game_server.start_flushing()
+	loop = asyncio.get_running_loop()
+	others = refresher = None
+	if store is not None: #So that ranks and the top players cover every worker's players, not just this one's
+		others = OtherPartitions(store, game_server.leaderboard)
+		refresher = loop.create_task(others.refresh_periodically(options.get("leaderboard_interval", 10)))
+	closed = loop.create_future()
+	sessions = set()
+	def receive():
+		try:
+			message, fds, _, _ = socket.recv_fds(channel, 4096, 1)
+		except BlockingIOError:
+			return
+		except OSError:
+			message, fds = b"", []
+		if not message:
+			for fd in fds:
+				os.close(fd)
+			if not closed.done():
+				closed.set_result(None)
+			return
+		task = loop.create_task(game_server.adopt(socket.socket(fileno=fds[0]), json.loads(message)["name"]))
+		sessions.add(task)
+		task.add_done_callback(sessions.discard)
+	channel.setblocking(False)
+	loop.add_reader(channel.fileno(), receive)
+	try:
+		await closed
+	finally:
+		loop.remove_reader(channel.fileno())
+		channel.close()
+		for task in sessions: #Ending the sessions saves their players, before the store closes
+			task.cancel()
+		await asyncio.gather(*sessions, return_exceptions=True)
+		if flusher is not None:
+			flusher.cancel()
+		if refresher is not None:
+			refresher.cancel()
+			others.close()
+		if watcher is not None:
+			watcher.close()
+		if store is not None:
+			game_server.save_all()
+			store.close()
+		if writer is not None:
+			writer.close()
+		if stats is not None:
+			if options.get("stats_dump"):
+				with open(shard_path(options["stats_dump"], shard), "w") as f:
+					json.dump(stats.summary(), f, indent=1)
+			report = stats.profile_report()
+			if report:
+				print(f"Worker {shard}:\n{report}", file=sys.stderr)
+
+def stop(signum, frame):
+	raise KeyboardInterrupt #So that SIGTERM shuts down the same way as Ctrl+C, saving every player
+
+def serve(host="127.0.0.1", port=25565, workers=None, options=None):
+	if not hasattr(socket, "send_fds"):
+		raise RuntimeError("--workers needs Unix domain sockets, which this platform doesn't have")
+	supervisor = Supervisor(host, port, workers, options)
+	supervisor.start()
+	signal.signal(signal.SIGTERM, stop)
+	print(f"Serving on {host}:{port} with {supervisor.num_workers} workers")
+	try:
+		supervisor.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		supervisor.close()
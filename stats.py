@@ -0,0 +1,148 @@
+"""Latency and throughput of each kind of game step, e.g. how long an explore or a round of battle takes to compute
+A GameSession with stats times every step with the monotonic clock, along with the tick at the start of each turn,
+and keeps the pacing delay the step asked the client to sleep for in a histogram of its own, apart from compute time.
+Histograms have buckets an eighth of a power of two wide, so percentiles are within about 6% of the true value
+and recording a time doesn't allocate anything once its bucket exists.
+One action can also be run under cProfile, every time or one time in every few."""
+import io, time
+
+class Histogram:
+	"Counts durations in nanoseconds in logarithmic buckets"
+	__slots__ = ("count", "total", "min", "max", "buckets")
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0
+		self.min = None
+		self.max = 0
+		self.buckets = {}
+
+	def add(self, ns):
+		if ns < 16:
+			index = ns
+		else:
+			shift = ns.bit_length() - 4
+			index = shift * 8 + (ns >> shift) #The top four bits of ns, after the number of bits below them
+		buckets = self.buckets
+		buckets[index] = buckets.get(index, 0) + 1
+		self.count += 1
+		self.total += ns
+		if self.min is None or ns < self.min:
+			self.min = ns
+		if ns > self.max:
+			self.max = ns
+
+	@staticmethod
+	def bucket_value(index):
+		"Returns the middle of the range of values that fall into a bucket"
+		if index < 16:
+			return index
+		shift, top = divmod(index, 8)
+		shift -= 1
+		top += 8
+		return (top << shift) + (1 << shift) // 2
+
+	def percentile(self, q):
+		if self.count == 0:
+			return 0
+		rank = q / 100 * self.count
+		seen = 0
+		for index in sorted(self.buckets):
+			seen += self.buckets[index]
+			if seen >= rank:
+				return min(max(self.bucket_value(index), self.min), self.max)
+		return self.max
+
+	def summary(self, elapsed):
+		"Returns the count, rate and percentiles, in microseconds"
+		return {
+			"count": self.count,
+			"per_s": self.count / elapsed if elapsed > 0 else 0,
+			"total_s": self.total / 1e9,
+			"mean_us": self.total / self.count / 1e3 if self.count else 0,
+			"p50_us": self.percentile(50) / 1e3,
+			"p95_us": self.percentile(95) / 1e3,
+			"p99_us": self.percentile(99) / 1e3,
+			"max_us": self.max / 1e3
+		}
+
+class Stats:
+	"Timings for one or more sessions; a server can share one between all of its sessions"
+
+	def __init__(self):
+		self.started = time.monotonic()
+		self.timings = {} #Step name -> Histogram of compute time
+		self.pacing = {} #Step name -> Histogram of the pacing delay it asked for
+		self.profiled = None
+		self.profile_every = 1
+		self.profile_runs = 0
+		self.profiler = None
+
+	def histogram(self, table, name):
+		histogram = table.get(name)
+		if histogram is None:
+			histogram = table[name] = Histogram()
+		return histogram
+
+	def run(self, name, func, *args):
+		"Calls func(*args), timing it under name"
+		if name == self.profiled:
+			self.profile_runs += 1
+			if self.profile_runs % self.profile_every == 0:
+				return self.run_profiled(name, func, *args)
+		start = time.perf_counter_ns()
+		try:
+			return func(*args)
+		finally:
+			self.histogram(self.timings, name).add(time.perf_counter_ns() - start)
+
+	def run_profiled(self, name, func, *args):
+		start = time.perf_counter_ns()
+		self.profiler.enable()
+		try:
+			return func(*args)
+		finally:
+			self.profiler.disable()
+			self.histogram(self.timings, name).add(time.perf_counter_ns() - start) #Includes the profiler's overhead
+
+	def record_pacing(self, name, secs):
+		if secs > 0:
+			self.histogram(self.pacing, name).add(int(secs * 1e9))
+
+	def profile(self, name, every=1):
+		"Runs one in every few of the steps called name under cProfile, adding them all up"
+		import cProfile
+		self.profiled = name
+		self.profile_every = max(every, 1)
+		self.profile_runs = 0
+		self.profiler = cProfile.Profile()
+
+	def profile_report(self, limit=20, sort="cumulative"):
+		"Returns the profiler's top functions as text, or None if nothing has been profiled"
+		if self.profiler is None or self.profiler.getstats() == []:
+			return None
+		import pstats
+		out = io.StringIO()
+		pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(limit)
+		return out.getvalue()
+
+	def summary(self):
+		"Returns everything as a dict that can be written out as JSON"
+		elapsed = time.monotonic() - self.started
+		return {
+			"uptime_s": elapsed,
+			"compute": {name: histogram.summary(elapsed) for name, histogram in sorted(self.timings.items())},
+			"pacing": {name: histogram.summary(elapsed) for name, histogram in sorted(self.pacing.items())}
+		}
+
+	def report(self):
+		"Returns a table of the compute and pacing times of each step"
+		summary = self.summary()
+		lines = [f"{'':16}{'count':>8}{'per s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"]
+		for section, title, unit in (("compute", "Compute (us):", 1), ("pacing", "Pacing (ms):", 1000)):
+			if summary[section]:
+				lines.append(title)
+			for name, s in summary[section].items():
+				times = "".join(f"{s[key] / unit:10.1f}" for key in ("p50_us", "p95_us", "p99_us", "max_us"))
+				lines.append(f"  {name:14}{s['count']:8}{s['per_s']:9.1f}{times}")
+		return "\n".join(lines)
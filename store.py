@@ -0,0 +1,552 @@
+"""Persistent storage for player state
+Each player is saved as a compact, versioned binary snapshot in a single memory-mapped data file, with
+item names interned into a string table. Small changes between snapshots (items gained or lost, tools
+crafted, worn, broken or wielded) are appended to a journal, which gets folded back into the snapshots by a
+background compaction once it grows large enough. At the end of each step of the game, the player's stats and time
+are journaled too if they changed, so the journal always replays to the state after some whole step, never items
+from one step with the EXP from an earlier one. Anything written before the last flush() survives a crash.
+Furnace changes, and steps taken while a status effect or the furnace is working, are saved as a new snapshot, since
+those carry on with time. The RNG state, queued messages and any battle in progress are not stored.
+Another process can read a store while it's open, with readonly=True, catching up on what's been written out since
+with refresh()."""
+import mmap, os, struct, threading, zlib
+import MinecraftRPG
+from MinecraftRPG import Furnace, Player, Tool
+
+MAGIC = b"MCRPGDB\x01"
+VERSION = 2 #Version 2 added the furnace
+
+#Record kinds
+NAME = 1
+SNAPSHOT = 2
+OP = 3
+PLAYER_STATS = 4
+BEST = 5 #A player's best score from a game that has ended
+
+#Journal operations; tool indexes count tools whose recipe was removed, which are dropped only after replaying
+ADD_ITEM = 1
+REMOVE_ITEM = 2
+ADD_TOOL = 3
+REMOVE_TOOL = 4
+TOOL_DURABILITY = 5
+SWITCH_WEAPON = 6
+SET_STATS = 7 #Read from PLAYER_STATS records, with the stats in place of the name ID
+
+FRAME = struct.Struct("<BII") #Kind, payload length, CRC32 of the payload
+NAME_ID = struct.Struct("<I")
+BEST_SCORE = struct.Struct("<Ii") #Player ID, score
+SNAPSHOT_HEADER = struct.Struct("<BQI") #Version, sequence number, player ID
+STATS = struct.Struct("<dddiiiiBd?HHHh") #HP, saturation, exhaustion, hunger, EXP, level, ticks, mins, secs, dead, then counts and weapon index
+ITEM = struct.Struct("<Ii")
+EFFECT = struct.Struct("<Ihd")
+FURNACE = struct.Struct("<dddHH") #Burn time left, progress, EXP, then counts of queued and finished items
+OP_ENTRY = struct.Struct("<QIBii") #Sequence number, player ID, operation, name ID or tool index, amount or durability
+STATS_ENTRY = struct.Struct("<QIdddiiiiBd?") #Sequence number, player ID, then HP to dead as in STATS
+
+class StoreError(Exception):
+	pass
+
+def replaced(file, path):
+	"Returns whether the file open as file has since been replaced by another one at path, like by a compaction"
+	if file is None:
+		return False
+	try:
+		return os.stat(path).st_ino != os.fstat(file.fileno()).st_ino
+	except FileNotFoundError:
+		return True
+
+def frame(kind, payload):
+	return FRAME.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+def journal_frame(entry):
+	seq, player_id, op, a, b = entry
+	if op == SET_STATS:
+		return frame(PLAYER_STATS, STATS_ENTRY.pack(seq, player_id, *a))
+	return frame(OP, OP_ENTRY.pack(*entry))
+
+def player_stats(player):
+	return (player.HP, player.saturation, player.food_exhaustion, player.hunger, player.EXP, player.level, player.ticks,
+		player.time.mins, player.time.secs, player.dead)
+
+class PlayerJournal:
+	"Attached to a Player as player.journal to record its small changes in the store's journal"
+	__slots__ = ("store", "player_id", "stats")
+
+	def __init__(self, store, player_id):
+		self.store = store
+		self.player_id = player_id
+		self.stats = None #As last saved
+
+	def add_item(self, item, amount):
+		self.store.log(self.player_id, ADD_ITEM, self.store.intern(item), amount)
+
+	def remove_item(self, item, amount):
+		self.store.log(self.player_id, REMOVE_ITEM, self.store.intern(item), amount)
+
+	def add_tool(self, tool):
+		self.store.log(self.player_id, ADD_TOOL, self.store.intern(tool.name), tool.durability)
+
+	def remove_tool(self, index):
+		self.store.log(self.player_id, REMOVE_TOOL, index, 0)
+
+	def tool_durability(self, index, durability):
+		self.store.log(self.player_id, TOOL_DURABILITY, index, durability)
+
+	def switch_weapon(self, index):
+		self.store.log(self.player_id, SWITCH_WEAPON, index, 0)
+
+	def snapshot(self, player):
+		"Saves the whole player, for changes that the journal doesn't cover"
+		self.stats = player_stats(player)
+		self.store.save_id(self.player_id, player)
+
+	def end_step(self, player):
+		"Records the player's stats and time if a step of the game changed them, then writes out the journal if it's full"
+		stats = player_stats(player)
+		if stats != self.stats:
+			if player.status_effects or (player.furnace is not None and player.furnace.jobs):
+				self.snapshot(player)
+			else:
+				self.stats = stats
+				self.store.log(self.player_id, SET_STATS, stats, 0)
+		self.store.step_done()
+
+class PlayerStore:
+
+	def __init__(self, path, compact_threshold=1 << 20, journal_buffer=1 << 12, durable=False, readonly=False):
+		self.path = path
+		self.journal_path = path + ".journal"
+		self.compact_threshold = compact_threshold #Journal size in bytes that triggers a background compaction
+		self.journal_buffer = journal_buffer #Journal bytes to buffer in memory before writing them out
+		self.durable = durable #Whether flushes also fsync to disk, rather than just handing the data to the OS
+		self.readonly = readonly #For reading a store that another process has open, without changing its files
+		self.lock = threading.RLock()
+		self.compactor = None
+		self.open()
+
+	def open(self):
+		self.names = []
+		self.name_ids = {}
+		self.index = {} #Player ID -> (offset, length, sequence number) of their latest snapshot
+		self.pending = {} #Player ID -> journal operations newer than their latest snapshot
+		self.best = {} #Player ID -> best score from the games they've finished
+		self.seq = 0
+		self.buffer = bytearray()
+		self.changed = set() if self.readonly else None #IDs of the players whose records have been read since the last refresh()
+		if not os.path.exists(self.path) and not self.readonly:
+			with open(self.path, "wb") as f:
+				f.write(MAGIC)
+		self.data = open(self.path, "rb" if self.readonly else "r+b")
+		self.map = None
+		self.journal = None
+		if self.data.read(len(MAGIC)) != MAGIC:
+			self.data.close()
+			raise StoreError(f"{self.path!r} is not a player store")
+		self.remap()
+		end = self.data_end = self.scan(self.map, len(MAGIC), self.read_data_record)
+		if end < len(self.map) and not self.readonly: #Drop a record that was cut off by a crash
+			self.map.close()
+			self.data.truncate(end)
+			self.remap()
+		self.data.seek(0, os.SEEK_END)
+		if self.readonly:
+			self.journal_end = 0
+			if os.path.exists(self.journal_path):
+				self.journal = open(self.journal_path, "rb")
+				self.read_journal()
+			return
+		self.journal = open(self.journal_path, "a+b")
+		self.journal.seek(0)
+		contents = self.journal.read()
+		end = self.scan(contents, 0, self.read_journal_record)
+		if end < len(contents):
+			self.journal.truncate(end)
+		self.journal.seek(0, os.SEEK_END)
+
+	def read_journal(self):
+		"Reads the journal records added since the last read, for a read-only store"
+		self.journal.seek(self.journal_end)
+		contents = self.journal.read()
+		self.journal_end += self.scan(contents, 0, self.read_journal_record)
+
+	def refresh(self):
+		"""Catches a read-only store up with what the process writing it has written out since it was last read,
+		starting over if that process has compacted it, and returns the IDs of the players whose records were read
+		A record that's only partly written yet is left for the next refresh"""
+		if replaced(self.data, self.path) or replaced(self.journal, self.journal_path):
+			self.close()
+			self.open()
+		else:
+			self.remap()
+			self.data_end = self.scan(self.map, self.data_end, self.read_data_record)
+			if self.journal is None and os.path.exists(self.journal_path):
+				self.journal = open(self.journal_path, "rb")
+			if self.journal is not None:
+				self.read_journal()
+		changed = self.changed
+		self.changed = set()
+		return changed
+
+	def remap(self):
+		if self.map is not None:
+			self.map.close()
+		self.data.flush()
+		self.map = mmap.mmap(self.data.fileno(), 0, access=mmap.ACCESS_READ)
+
+	def scan(self, buf, pos, read_record):
+		"Reads every complete record in buf starting at pos, returning where the last one ends"
+		while pos + FRAME.size <= len(buf):
+			kind, length, crc = FRAME.unpack_from(buf, pos)
+			start = pos + FRAME.size
+			if start + length > len(buf) or zlib.crc32(buf[start:start + length]) != crc:
+				break
+			read_record(buf, kind, start, length)
+			pos = start + length
+		return pos
+
+	def read_data_record(self, buf, kind, start, length):
+		if kind == NAME:
+			self.add_name(NAME_ID.unpack_from(buf, start)[0], bytes(buf[start + NAME_ID.size:start + length]).decode())
+		elif kind == SNAPSHOT:
+			version, seq, player_id = SNAPSHOT_HEADER.unpack_from(buf, start)
+			if version > VERSION:
+				raise StoreError(f"snapshot version {version} is newer than this game supports")
+			self.index[player_id] = (start, length, seq)
+			self.pending.pop(player_id, None)
+			self.seq = max(self.seq, seq)
+			if self.changed is not None:
+				self.changed.add(player_id)
+		elif kind == BEST:
+			player_id, score = BEST_SCORE.unpack_from(buf, start)
+			self.best[player_id] = score
+			if self.changed is not None:
+				self.changed.add(player_id)
+		else:
+			raise StoreError(f"unknown record kind {kind} in {self.path!r}")
+
+	def read_journal_record(self, buf, kind, start, length):
+		if kind == OP:
+			op = OP_ENTRY.unpack_from(buf, start)
+		elif kind == PLAYER_STATS:
+			entry = STATS_ENTRY.unpack_from(buf, start)
+			op = (entry[0], entry[1], SET_STATS, entry[2:], 0)
+		else:
+			raise StoreError(f"unknown record kind {kind} in {self.journal_path!r}")
+		seq, player_id = op[0], op[1]
+		snapshot = self.index.get(player_id)
+		if snapshot is not None and seq > snapshot[2]:
+			self.pending.setdefault(player_id, []).append(op)
+			if self.changed is not None:
+				self.changed.add(player_id)
+		self.seq = max(self.seq, seq)
+
+	def add_name(self, name_id, name):
+		while len(self.names) <= name_id:
+			self.names.append(None)
+		self.names[name_id] = name
+		self.name_ids[name] = name_id
+
+	def intern(self, name):
+		"Returns the ID of a name, adding it to the string table if it's new"
+		name_id = self.name_ids.get(name)
+		if name_id is None:
+			with self.lock:
+				name_id = self.name_ids.get(name) #Another thread, like the compactor, may have added it while this one waited
+				if name_id is None:
+					name_id = len(self.names)
+					self.add_name(name_id, name)
+					self.write_data(NAME, NAME_ID.pack(name_id) + name.encode())
+		return name_id
+
+	def write_data(self, kind, payload):
+		offset = self.data.tell() + FRAME.size
+		self.data.write(frame(kind, payload))
+		return offset
+
+	def log(self, player_id, op, a, b):
+		"Appends a journal operation for the player with the given interned ID"
+		with self.lock:
+			if player_id not in self.index:
+				return
+			self.seq += 1
+			entry = (self.seq, player_id, op, a, b)
+			self.pending.setdefault(player_id, []).append(entry)
+			self.buffer += journal_frame(entry)
+
+	def step_done(self):
+		"Writes out the journal once enough is buffered; only between steps, so that a step is never half written"
+		if len(self.buffer) >= self.journal_buffer:
+			self.flush()
+
+	def flush(self):
+		"Writes out buffered journal operations and snapshots"
+		with self.lock:
+			self.data.flush() #First, since journal operations can refer to names and snapshots in the data file
+			if self.durable:
+				os.fsync(self.data.fileno())
+			if self.buffer:
+				self.journal.write(self.buffer)
+				self.buffer.clear()
+			self.journal.flush()
+			if self.durable:
+				os.fsync(self.journal.fileno())
+			if self.journal.tell() >= self.compact_threshold and self.compactor is None:
+				self.compactor = threading.Thread(target=self.compact, daemon=True)
+				self.compactor.start()
+
+	def __contains__(self, name):
+		return name in self.name_ids and self.name_ids[name] in self.index
+
+	def player_names(self):
+		return [self.names[player_id] for player_id in self.index]
+
+	def scores(self, player_ids=None):
+		"""Returns lists of the name, score and level of every player, or of the players with the given IDs, read from
+		their snapshots and journaled stats without loading the players
+		A player's score is their EXP, or the best score from a game they've finished if that's higher"""
+		with self.lock:
+			if self.data.tell() > len(self.map):
+				self.remap()
+			index, pending, best = self.index, self.pending, self.best
+			names, exps, levels = [], [], []
+			for player_id in index if player_ids is None else player_ids:
+				if player_id not in index: #A best score read before the snapshot that's written after it
+					continue
+				offset, length, seq = index[player_id]
+				stats = STATS.unpack_from(self.map, offset + SNAPSHOT_HEADER.size)
+				exp, level = stats[4], stats[5]
+				for op in reversed(pending.get(player_id, ())):
+					if op[2] == SET_STATS:
+						exp, level = op[3][4], op[3][5]
+						break
+				names.append(self.names[player_id])
+				exps.append(max(exp, best.get(player_id, 0)))
+				levels.append(level)
+			return names, exps, levels
+
+	def record_score(self, name, score):
+		"Keeps the final score of a player's game that has ended, if it's their best, before they start a new one"
+		with self.lock:
+			player_id = self.intern(name)
+			if score > self.best.get(player_id, 0):
+				self.best[player_id] = score
+				self.write_data(BEST, BEST_SCORE.pack(player_id, score))
+
+	def encode(self, player_id, player, seq):
+		intern = self.intern
+		parts = [
+			SNAPSHOT_HEADER.pack(VERSION, seq, player_id),
+			STATS.pack(player.HP, player.saturation, player.food_exhaustion, player.hunger, player.EXP, player.level, player.ticks,
+				player.time.mins, player.time.secs, player.dead, len(player.inventory), len(player.tools), len(player.status_effects),
+				player.tools.index(player.curr_weapon) if player.curr_weapon is not None else -1)
+		]
+		for item, amount in player.inventory.items():
+			parts.append(ITEM.pack(intern(item), amount))
+		for tool in player.tools:
+			parts.append(ITEM.pack(intern(tool.name), tool.durability))
+		for name, effect in player.status_effects.items():
+			parts.append(EFFECT.pack(intern(name), effect.level, player.effect_time_left(name)))
+		furnace = player.furnace
+		if furnace is None:
+			parts.append(FURNACE.pack(0, 0, 0, 0, 0))
+		else:
+			furnace.update(player.timers.now)
+			parts.append(FURNACE.pack(furnace.burn, furnace.progress, furnace.exp, len(furnace.jobs), len(furnace.done)))
+			for item, count in furnace.jobs:
+				parts.append(ITEM.pack(intern(item), count))
+			for item, count in furnace.done.items():
+				parts.append(ITEM.pack(intern(item), count))
+		return b"".join(parts)
+
+	def decode(self, buf, start):
+		names = self.names
+		player = Player()
+		version = buf[start]
+		pos = start + SNAPSHOT_HEADER.size
+		(player.HP, player.saturation, player.food_exhaustion, player.hunger, player.EXP, player.level, player.ticks,
+			player.time.mins, player.time.secs, player.dead, num_items, num_tools, num_effects, weapon) = STATS.unpack_from(buf, pos)
+		pos += STATS.size
+		if player.HP.is_integer(): #HP is stored as a double, but is usually a whole number in game
+			player.HP = int(player.HP)
+		for _ in range(num_items):
+			name_id, amount = ITEM.unpack_from(buf, pos)
+			player.inventory[names[name_id]] = amount
+			pos += ITEM.size
+		for _ in range(num_tools):
+			name_id, durability = ITEM.unpack_from(buf, pos)
+			player.tools.append(self.make_tool(names[name_id], durability))
+			pos += ITEM.size
+		player.reset_timers() #Now that the time of day is known
+		for _ in range(num_effects):
+			name_id, level, duration = EFFECT.unpack_from(buf, pos)
+			player.apply_status_effect(names[name_id], level, duration)
+			pos += EFFECT.size
+		if version >= 2:
+			burn, progress, exp, num_jobs, num_done = FURNACE.unpack_from(buf, pos)
+			pos += FURNACE.size
+			if burn or num_jobs or num_done or exp:
+				furnace = player.furnace = Furnace()
+				furnace.burn, furnace.progress, furnace.exp = burn, progress, exp
+				for _ in range(num_jobs):
+					name_id, count = ITEM.unpack_from(buf, pos)
+					furnace.jobs.append([names[name_id], count])
+					pos += ITEM.size
+				for _ in range(num_done):
+					name_id, count = ITEM.unpack_from(buf, pos)
+					furnace.done[names[name_id]] = count
+					pos += ITEM.size
+				player.schedule_furnace()
+		if weapon >= 0:
+			player.curr_weapon = player.tools[weapon]
+		return player
+
+	def make_tool(self, name, durability):
+		recipe = MinecraftRPG.recipes.get(name) #Looked up each time, since --watch-content can replace the recipes
+		if recipe is None or recipe.tool_data is None:
+			return None
+		return Tool(name, recipe.tool_data, durability)
+
+	def apply(self, player, ops):
+		names = self.names
+		restarted = False
+		for seq, player_id, op, a, b in ops:
+			if op == ADD_ITEM:
+				player.inventory[names[a]] = player.inventory.get(names[a], 0) + b
+			elif op == REMOVE_ITEM:
+				left = player.inventory.get(names[a], 0) - b
+				if left > 0:
+					player.inventory[names[a]] = left
+				else:
+					player.inventory.pop(names[a], None)
+			elif op == ADD_TOOL:
+				player.tools.append(self.make_tool(names[a], b))
+			elif op == REMOVE_TOOL:
+				tool = player.tools.pop(a)
+				if tool is player.curr_weapon:
+					player.curr_weapon = None
+			elif op == TOOL_DURABILITY:
+				if player.tools[a] is not None:
+					player.tools[a].durability = b
+			elif op == SWITCH_WEAPON:
+				player.curr_weapon = player.tools[a] if a >= 0 else None
+			elif op == SET_STATS:
+				(player.HP, player.saturation, player.food_exhaustion, player.hunger, player.EXP, player.level, player.ticks,
+					player.time.mins, player.time.secs, player.dead) = a
+				restarted = True
+		player.tools = [tool for tool in player.tools if tool is not None] #Drops tools whose recipe has since been removed
+		if restarted:
+			if isinstance(player.HP, float) and player.HP.is_integer():
+				player.HP = int(player.HP)
+			player.reset_timers() #From the new time of day; status effects were over, or there'd be a newer snapshot
+			if player.furnace is not None:
+				player.schedule_furnace()
+
+	def save(self, name, player):
+		"Writes a full snapshot of a player, which supersedes their journal so far"
+		self.save_id(self.intern(name), player)
+
+	def save_id(self, player_id, player):
+		with self.lock:
+			self.seq += 1
+			payload = self.encode(player_id, player, self.seq)
+			offset = self.write_data(SNAPSHOT, payload)
+			self.index[player_id] = (offset, len(payload), self.seq)
+			self.pending.pop(player_id, None)
+
+	def load(self, name):
+		"Returns the stored Player with the given ID, or None if there isn't one"
+		with self.lock:
+			player_id = self.name_ids.get(name)
+			if player_id not in self.index:
+				return None
+			return self.load_id(player_id)
+
+	def load_id(self, player_id):
+		with self.lock:
+			offset, length, seq = self.index[player_id]
+			if offset + length > len(self.map):
+				self.remap()
+			player = self.decode(self.map, offset)
+			self.apply(player, self.pending.get(player_id, ()))
+			return player
+
+	def track(self, name, player):
+		"Saves a player and attaches a journal to it, so later inventory and tool changes are recorded automatically"
+		self.save(name, player)
+		journal = player.journal = PlayerJournal(self, self.intern(name))
+		journal.stats = player_stats(player)
+
+	def compact(self):
+		"""Rewrites the data file with one snapshot per player, folding in and then clearing the journal
+		The lock is only held to copy the records at the start and to swap the files at the end, so players keep
+		playing while the snapshots are encoded and written; anything they do in between is carried over"""
+		try:
+			with self.lock:
+				self.flush_data()
+				folded = self.seq #Operations up to here end up in the new snapshots
+				num_names = len(self.names)
+				records = {player_id: (bytes(self.map[offset:offset + length]), list(self.pending.get(player_id, ())))
+					for player_id, (offset, length, seq) in self.index.items()}
+			tmp_path = self.path + ".tmp"
+			with open(tmp_path, "wb") as f:
+				f.write(MAGIC)
+				for name_id, name in enumerate(self.names[:num_names]): #Names keep their IDs, since attached journals refer to them
+					f.write(frame(NAME, NAME_ID.pack(name_id) + name.encode()))
+				for player_id, (snapshot, ops) in records.items():
+					player = self.decode(snapshot, 0)
+					self.apply(player, ops)
+					f.write(frame(SNAPSHOT, self.encode(player_id, player, folded)))
+				with self.lock:
+					self.flush_data()
+					for name_id in range(num_names, len(self.names)): #Interned while the snapshots were being written
+						f.write(frame(NAME, NAME_ID.pack(name_id) + self.names[name_id].encode()))
+					for player_id, score in self.best.items():
+						f.write(frame(BEST, BEST_SCORE.pack(player_id, score)))
+					for player_id, (offset, length, seq) in self.index.items():
+						if seq > folded: #Saved while the snapshots were being written
+							f.write(frame(SNAPSHOT, self.map[offset:offset + length]))
+					f.flush()
+					os.fsync(f.fileno())
+					self.swap(tmp_path, folded)
+		finally:
+			self.compactor = None
+
+	def flush_data(self):
+		"Writes out the data file and maps everything in it"
+		self.data.flush()
+		if self.data.tell() > len(self.map):
+			self.remap()
+
+	def swap(self, tmp_path, folded):
+		"Replaces the data file with a compacted one and rewrites the journal with only the operations after folded"
+		ops = sorted((op for player_ops in self.pending.values() for op in player_ops if op[0] > folded), key=lambda op: op[0])
+		self.buffer.clear() #Any of these that are still needed are in ops
+		self.map.close()
+		self.data.close()
+		os.replace(tmp_path, self.path) #A crash after this replays the old journal, skipping what the snapshots include
+		journal_tmp = self.journal_path + ".tmp"
+		with open(journal_tmp, "wb") as f:
+			for op in ops:
+				f.write(journal_frame(op))
+			f.flush()
+			os.fsync(f.fileno())
+		self.journal.close()
+		os.replace(journal_tmp, self.journal_path)
+		self.open()
+
+	def close(self):
+		if self.readonly: #Also after open() failed part way, e.g. on a file that's still being created
+			if self.map is not None:
+				self.map.close()
+			self.data.close()
+			if self.journal is not None:
+				self.journal.close()
+			return
+		with self.lock:
+			self.flush()
+		if self.compactor is not None:
+			self.compactor.join()
+		with self.lock:
+			self.map.close()
+			self.data.close()
+			self.journal.close()
@@ -0,0 +1,16 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import leaderboard, progression, rng
+
+@pytest.fixture(params=["numpy", "random"])
+def backend(request, monkeypatch):
+	"Runs a test once with NumPy and once with the fallbacks for when it isn't installed"
+	if request.param == "random":
+		for module in (rng, progression, leaderboard):
+			monkeypatch.setattr(module, "np", None)
+	elif rng.np is None:
+		pytest.skip("NumPy isn't installed")
+	return request.param
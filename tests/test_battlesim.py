@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy") #The simulator needs it
+
+import MinecraftRPG
+from MinecraftRPG import Battle, Mob, Player, Tool, load_content
+from rng import RNG
+
+load_content()
+import battlesim #Reads the mob types and recipes when it's imported
+
+def play_battle(seed, mob_name, tool_name):
+	"Plays a fight with the game's own Battle, always attacking, and returns (killed, rounds, damage taken, durability used)"
+	player = Player(RNG(seed))
+	player.HP = 10 ** 6 #So that the player never dies or heals
+	if tool_name != "Unarmed":
+		tool = Tool(tool_name, MinecraftRPG.recipes[tool_name].tool_data)
+		player.add_tool(tool)
+		player.curr_weapon = tool
+	battle = Battle(player, Mob.new_mob(mob_name))
+	battle.encounter()
+	while not battle.over and battle.rounds < 1000:
+		battle.attack()
+	used = 0
+	if tool_name != "Unarmed":
+		used = tool.data.durability - tool.durability if tool in player.tools else tool.data.durability + 1
+	return battle.mob.HP <= 0, battle.rounds, 10 ** 6 - player.HP, used
+
+@pytest.mark.parametrize("mob_name, tool_name", [
+	("Zombie", "Unarmed"),
+	("Zombie", "Stone Sword"),
+	("Spider", "Wooden Sword"),
+	("Pig", "Unarmed"), #Runs away
+	("Creeper", "Wooden Sword") #Explodes
+])
+def test_simulation_matches_the_game(mob_name, tool_name):
+	trials = 3000
+	played = np.array([play_battle(seed, mob_name, tool_name) for seed in range(trials)], dtype=float)
+	tool_data = dict(battlesim.tool_choices())[tool_name]
+	stats = battlesim.simulate(MinecraftRPG.mob_types[mob_name], tool_name, tool_data, trials * 10, np.random.default_rng(0))
+	simulated = [stats.outcome == battlesim.KILLED, stats.rounds, stats.damage_taken, stats.durability_used]
+	for name, game, sim in zip(("killed", "rounds", "damage taken", "durability used"), played.T, simulated):
+		sim = np.asarray(sim, dtype=float)
+		error = math.sqrt(game.var() / len(game) + sim.var() / len(sim))
+		assert abs(game.mean() - sim.mean()) <= 4 * error + 1e-9, (name, game.mean(), sim.mean())
+
+def test_summary_and_sweep():
+	results = list(battlesim.sweep(200, mobs=["Zombie", "Pig"], tools=["Unarmed", "Wooden Sword"], seed=1))
+	assert [(stats.mob, stats.tool) for stats in results] == [(mob, tool) for mob in ("Pig", "Zombie") for tool in ("Unarmed", "Wooden Sword")]
+	summary = results[0].summary()
+	assert summary["trials"] == 200
+	assert summary["killed"] + summary["exploded"] + summary["unfinished"] == pytest.approx(1)
+	again = list(battlesim.sweep(200, mobs=["Zombie", "Pig"], tools=["Unarmed", "Wooden Sword"], seed=1))
+	assert [stats.summary() for stats in again] == [stats.summary() for stats in results]
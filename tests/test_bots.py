@@ -0,0 +1,17 @@
+from MinecraftRPG import GameSession, load_content
+from bots import Survivor
+
+load_content()
+
+def test_survivor_smelts_its_way_to_an_iron_pickaxe():
+	session = GameSession(seed=1)
+	policy = Survivor(1)
+	steps = set()
+	for _ in range(1000):
+		if session.over or any(tool.name == "Iron Pickaxe" for tool in session.player.tools):
+			break
+		name, *args = policy.act(session)
+		getattr(session, name)(*args)
+		steps.add(name)
+	assert "smelt" in steps
+	assert any(tool.name == "Iron Pickaxe" for tool in session.player.tools)
@@ -0,0 +1,73 @@
+import json
+
+import events
+from MinecraftRPG import GameSession, load_content
+from events import EventBus, EventWriter, RingBuffer
+
+load_content()
+
+def read_lines(path):
+	with open(path, encoding="utf-8") as file:
+		return [json.loads(line) for line in file]
+
+def test_ring_buffer_wraps_around_and_counts_drops():
+	ring = RingBuffer(4)
+	for i in range(3):
+		ring.push(i)
+	assert ring.take() == [0, 1, 2]
+	for i in range(3, 9):
+		ring.push(i)
+	assert len(ring) == 4 and ring.dropped == 2
+	assert ring.take() == [3, 4, 5, 6]
+	assert ring.take() == []
+
+def test_players_publish_only_when_attached():
+	session = GameSession(seed=0)
+	bus = EventBus()
+	received = []
+	bus.subscribe(received.append)
+	session.player.damage(2)
+	assert received == []
+	bus.attach(session.player, "alice")
+	session.player.damage(3, "Fell")
+	typ, name, ticks, _, values = received[0]
+	assert typ is events.DAMAGE and name == "alice" and values == (3, 15, "Fell")
+
+def test_writer_writes_json_lines(tmp_path):
+	path = str(tmp_path / "events.jsonl")
+	bus = EventBus()
+	player = GameSession(seed=0).player
+	bus.attach(player, "alice")
+	with EventWriter(bus, path, interval=0.01):
+		player.damage(1)
+		player.gain_exp(5)
+	records = read_lines(path)
+	assert [record["type"] for record in records] == ["damage", "exp"]
+	assert records[0]["session"] == "alice" and records[0]["amount"] == 1 and records[0]["hp"] == 19
+
+def test_writer_writes_columns(tmp_path):
+	path = str(tmp_path / "events.jsonl")
+	bus = EventBus()
+	player = GameSession(seed=0).player
+	bus.attach(player)
+	writer = EventWriter(bus, path, format="columns", interval=60).start()
+	for amount in (1, 2, 3):
+		player.damage(amount)
+	writer.close()
+	[record] = read_lines(path)
+	assert record["type"] == "damage" and record["count"] == 3
+	assert record["amount"] == [1, 2, 3] and record["hp"] == [19, 17, 14] and record["session"] == [1, 1, 1]
+
+def test_writer_rotates_big_files(tmp_path):
+	path = str(tmp_path / "events.jsonl")
+	bus = EventBus()
+	player = GameSession(seed=0).player
+	bus.attach(player)
+	writer = EventWriter(bus, path, interval=60, max_bytes=1).start()
+	player.damage(1)
+	writer.write(writer.ring.take())
+	player.damage(1)
+	writer.close()
+	assert len(read_lines(str(tmp_path / "events.1.jsonl"))) == 1
+	assert len(read_lines(str(tmp_path / "events.2.jsonl"))) == 1
+	assert read_lines(path) == []
@@ -0,0 +1,53 @@
+import pytest
+
+from MinecraftRPG import Furnace, GameSession, load_content
+
+load_content()
+
+def session_with(**items):
+	session = GameSession(seed=0)
+	for item, count in items.items():
+		session.player.add_item(item.replace("_", " "), count)
+	return session
+
+def test_updating_in_steps_matches_one_update():
+	whole, steps = Furnace(), Furnace()
+	for furnace in (whole, steps):
+		furnace.add("Raw Iron", 3, 80)
+		furnace.add("Raw Chicken", 2, 0)
+	whole.update(37)
+	for now in (1, 9.5, 10, 22, 30, 37):
+		steps.update(now)
+	for furnace in (whole, steps):
+		assert furnace.done == {"Iron Ingot": 3}
+		assert furnace.jobs == [["Raw Chicken", 2]]
+		assert furnace.progress == pytest.approx(7)
+		assert furnace.burn == pytest.approx(43)
+		assert furnace.exp == pytest.approx(2.1)
+
+def test_smelting_runs_in_the_background():
+	session = session_with(Raw_Iron=3, Coal=1)
+	result = session.smelt("Raw Iron", "Coal", 3)
+	player = session.player
+	assert result.ok and result.data["fuel_used"] == {"Coal": 1} and result.data["ready_in"] == 30
+	assert "Raw Iron" not in player.inventory and "Coal" not in player.inventory
+	player.advance_time(15)
+	assert session.furnace_status() == ([("Raw Iron", 2)], {"Iron Ingot": 1}, 15)
+	assert session.collect_furnace().data["found"] == {"Iron Ingot": 1}
+	player.advance_time(15)
+	assert player.inventory["Iron Ingot"] == 3 #Collected by itself once the queue finished
+	assert player.furnace.jobs == [] and player.furnace.spare_burn() == 50
+
+def test_leftover_fuel_is_used_first():
+	session = session_with(Raw_Iron=8, Coal=1)
+	assert session.smelt("Raw Iron", "Coal", 3).ok
+	assert session.max_smelts("Raw Iron", "Coal") == 5
+	result = session.smelt("Raw Iron", "Coal", 5)
+	assert result.ok and result.data["fuel_used"] == {}
+
+def test_smelting_without_enough_fuel_takes_nothing():
+	session = session_with(Raw_Iron=9, Coal=1)
+	result = session.smelt("Raw Iron", "Coal", 9)
+	assert not result.ok
+	assert session.player.inventory == {"Raw Iron": 9, "Coal": 1}
+	assert session.player.furnace is None
@@ -0,0 +1,64 @@
+import random
+
+import events, progression
+from MinecraftRPG import GameSession, load_content
+from leaderboard import Leaderboard
+from progression import ProgressionTable, get_exp_required_for_level
+
+load_content()
+
+def slow_level_for(exp):
+	level = 0
+	while exp > 0 and get_exp_required_for_level(level) <= exp:
+		level += 1
+	return level
+
+def test_levels_match_the_thresholds(backend):
+	table = ProgressionTable(levels=4) #Small, so that it has to grow
+	exps = [0, -5, 1, 6, 7, 100, 352, 353, 1000, 10 ** 6, 10 ** 9] + list(range(0, 2000, 7))
+	expected = [slow_level_for(exp) for exp in exps]
+	assert [table.level_for(exp) for exp in exps] == expected
+	assert list(ProgressionTable(levels=4).levels_for(exps)) == expected
+	assert progression.level_for(100) == 8
+
+def expected_order(scores):
+	return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+def test_updates_keep_the_order():
+	board = Leaderboard(load=4) #Small lists, so that they get split and emptied
+	scores = {}
+	rand = random.Random(0)
+	for _ in range(3000):
+		name = f"player{rand.randrange(60)}"
+		if rand.random() < 0.1:
+			board.remove(name)
+			scores.pop(name, None)
+		else:
+			scores[name] = rand.randrange(50)
+			board.update(name, scores[name])
+	order = expected_order(scores)
+	assert board.top(len(scores) + 5) == order
+	assert board.top(3) == order[:3]
+	assert [board.rank(name) for name, _ in order] == list(range(1, len(order) + 1))
+	assert board.rank("nobody") is None and len(board) == len(scores)
+
+def test_build_matches_adding_one_by_one(backend):
+	rand = random.Random(1)
+	scores = {f"player{i}": rand.randrange(20) for i in range(500)}
+	built, added = Leaderboard(load=8), Leaderboard(load=8)
+	built.build(list(scores), list(scores.values()))
+	for name, score in scores.items():
+		added.update(name, score)
+	assert built.top(500) == added.top(500) == expected_order(scores)
+	built.update("player0", 1000)
+	assert built.rank("player0") == 1
+
+def test_scores_follow_exp_events():
+	bus = events.EventBus()
+	board = Leaderboard()
+	bus.subscribe(board.on_event)
+	for name, exp in (("alice", 5), ("bob", 9)):
+		player = GameSession(seed=0).player
+		bus.attach(player, name)
+		player.gain_exp(exp)
+	assert board.top() == [("bob", 9), ("alice", 5)]
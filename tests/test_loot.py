@@ -0,0 +1,52 @@
+import pytest
+
+import MinecraftRPG
+from MinecraftRPG import LootTable, WeightedList, load_content, mining_tables
+from rng import RNG
+
+load_content()
+
+def frequencies(table, n=50000, seed=0):
+	rng = RNG(seed)
+	counts = dict.fromkeys(table.choices, 0)
+	for _ in range(n):
+		counts[table.pick(rng)] += 1
+	return {value: count / n for value, count in counts.items()}
+
+@pytest.mark.parametrize("weights", [[1, 1], [1, 2, 3, 4], [1500, 124, 72, 3, 7, 3], [1, 1000]])
+def test_pick_follows_the_weights(backend, weights):
+	table = LootTable(enumerate(weights))
+	total = sum(weights)
+	for value, freq in frequencies(table).items():
+		expected = weights[value] / total
+		assert abs(freq - expected) < 5 * (expected * (1 - expected) / 50000) ** 0.5 + 1e-9
+
+def test_pick_many_counts_add_up(backend):
+	table = LootTable([("a", 1), ("b", 3)])
+	counts = table.pick_many(40000, RNG(1))
+	assert sum(counts.values()) == 40000
+	assert counts["b"] / 40000 == pytest.approx(0.75, rel=0.02)
+
+def test_entries_without_weight_are_dropped():
+	table = LootTable([("a", 0), ("b", 2)])
+	assert len(table) == 1 and table.pick(RNG(0)) == "b"
+	with pytest.raises(ValueError):
+		LootTable([("a", 0)])
+
+def test_weighted_list_compiles_to_the_same_distribution():
+	weighted = WeightedList()
+	for value, weight in [("a", 1), ("b", 2), ("c", 7)]:
+		weighted.add(value, weight)
+	table = weighted.compile()
+	assert table.choices == ("a", "b", "c") and table.weights == (1, 2, 7)
+
+def test_better_pickaxes_find_more():
+	assert set(mining_tables["Wooden Pickaxe"].choices) == {"Stone", "Coal"}
+	assert "Raw Iron" in mining_tables["Stone Pickaxe"].choices
+	assert "Diamond" not in mining_tables["Stone Pickaxe"].choices
+	assert "Diamond" in mining_tables["Iron Pickaxe"].choices
+
+def test_spawn_tables_keep_to_their_time_of_day():
+	mob_types = MinecraftRPG.mob_types
+	assert not any(mob_types[typ].night_mob for typ in MinecraftRPG.day_mob_types.choices)
+	assert all(mob_types[typ].night_mob for typ in MinecraftRPG.night_mob_types.choices)
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+import MinecraftRPG
+import rng
+from MinecraftRPG import GameSession, Tool, load_content
+
+load_content()
+
+def session_with_pickaxe(seed, durability=10):
+	session = GameSession(seed=seed)
+	player = session.player
+	pickaxe = Tool("Stone Pickaxe", MinecraftRPG.recipes["Stone Pickaxe"].tool_data, durability)
+	player.add_tool(pickaxe)
+	player.curr_weapon = pickaxe
+	return session
+
+def outcome(session, start_durability):
+	"Blocks mined, items found, EXP, pickaxe wear and whether a mob turned up"
+	player = session.player
+	pickaxe = next((tool for tool in player.tools if tool.name == "Stone Pickaxe"), None)
+	wear = start_durability + 1 if pickaxe is None else start_durability - pickaxe.durability
+	return {
+		"items": sum(player.inventory.values()),
+		"iron": player.inventory.get("Raw Iron", 0),
+		"exp": player.EXP,
+		"wear": wear,
+		"encounter": int(session.battle is not None)
+	}
+
+def mine_at_once(seed, blocks):
+	session = session_with_pickaxe(seed)
+	result = session.mine_many(blocks)
+	return dict(outcome(session, 10), mined=result.data["mined"])
+
+def mine_one_at_a_time(seed, blocks):
+	session = session_with_pickaxe(seed)
+	mined = 0
+	while mined < blocks and session.battle is None and session.mine().ok:
+		mined += 1
+	return dict(outcome(session, 10), mined=mined)
+
+def compare(trials=2000, blocks=20):
+	at_once = [mine_at_once(seed, blocks) for seed in range(trials)]
+	one_at_a_time = [mine_one_at_a_time(seed + trials, blocks) for seed in range(trials)]
+	for key in at_once[0]:
+		a = [o[key] for o in at_once]
+		b = [o[key] for o in one_at_a_time]
+		mean_a, mean_b = sum(a) / trials, sum(b) / trials
+		var_a = sum((x - mean_a) ** 2 for x in a) / (trials - 1)
+		var_b = sum((x - mean_b) ** 2 for x in b) / (trials - 1)
+		error = math.sqrt((var_a + var_b) / trials)
+		assert abs(mean_a - mean_b) <= 4 * error + 1e-9, (key, mean_a, mean_b)
+
+@pytest.mark.parametrize("blocks", [5, 20])
+def test_mine_many_matches_mining_one_block_at_a_time(blocks):
+	compare(blocks=blocks)
+
+@pytest.mark.parametrize("blocks", [5, 20])
+def test_mine_many_matches_without_numpy(monkeypatch, blocks):
+	monkeypatch.setattr(rng, "np", None)
+	assert type(GameSession(seed=0).player.rng.gen).__module__ == "random"
+	compare(blocks=blocks)
@@ -0,0 +1,45 @@
+import random
+
+from MinecraftRPG import Player, PlayerDied, RNG, load_content
+
+load_content()
+
+def random_player(seed):
+	"A player part of the way through a game, with their HP, hunger and time of day and maybe some effects picked by seed"
+	r = random.Random(seed)
+	player = Player(RNG(seed))
+	player.HP = r.randint(1, 20)
+	player.hunger = r.randint(0, 20)
+	player.saturation = r.choice([0, r.randint(1, 5)])
+	player.food_exhaustion = r.uniform(0, 4)
+	player.ticks = r.randint(0, 1000)
+	player.time.advance(r.uniform(0, 2400))
+	player.reset_timers()
+	for effect in ("Poison", "Hunger"):
+		if r.random() < 0.3:
+			player.apply_status_effect(effect, r.randint(1, 2), r.uniform(1, 60))
+	return player
+
+def run(step):
+	try:
+		step()
+	except PlayerDied:
+		pass
+
+def state(player):
+	return (player.HP, player.hunger, player.saturation, player.ticks, player.dead, player.time.mins,
+		{name: effect.level for name, effect in player.status_effects.items()})
+
+def test_fast_forward_matches_ticking_one_at_a_time():
+	for seed in range(300):
+		n = random.Random(-seed).randint(1, 2000)
+		fast, slow = random_player(seed), random_player(seed)
+		run(lambda: fast.fast_forward(n))
+		def tick_n():
+			for _ in range(n):
+				slow.tick()
+		run(tick_n)
+		assert state(fast) == state(slow), seed
+		assert abs(fast.food_exhaustion - slow.food_exhaustion) < 1e-9, seed
+		assert fast.time.secs == slow.time.secs, seed
+		assert abs(fast.timers.now - slow.timers.now) < 1e-6, seed
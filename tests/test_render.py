@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from MinecraftRPG import GameSession, load_content
+from render import Renderer
+
+load_content()
+
+codes = {"red": 31, "green": 32, "yellow": 33, "bold": 1}
+
+def colored(text, color=None, attrs=None):
+	"Stands in for termcolor's colored()"
+	used = ([color] if color else []) + list(attrs or [])
+	for name in used:
+		text = f"\x1b[{codes[name]}m{text}"
+	return text + "\x1b[0m" if used else text
+
+def result():
+	session = GameSession(seed=0)
+	session.player.message("You found 1x Coal", "green")
+	return session.inventory()
+
+def test_text_mode_colors_lines_and_caches_styles():
+	renderer = Renderer("text", colored)
+	renderer.line("hello", "red")
+	renderer.line("again", "red")
+	renderer.line("plain")
+	assert renderer.take() == "\x1b[31mhello\x1b[0m\n\x1b[31magain\x1b[0m\nplain\n"
+	assert list(renderer.styles) == [("red", None)]
+	assert renderer.take() == ""
+
+def test_plain_mode_strips_colors():
+	renderer = Renderer("plain", colored)
+	renderer.line(colored("warning", "yellow"), "red")
+	renderer.choices(["Mine", "Quit"])
+	assert renderer.prompt("> ") == "warning\n1. Mine\n2. Quit\n> "
+
+def test_quiet_and_none_modes_skip_results():
+	for mode in ("quiet", "none"):
+		renderer = Renderer(mode)
+		renderer.result(result())
+		assert renderer.take() == ""
+	renderer = Renderer("none")
+	renderer.line("menu")
+	assert renderer.prompt("> ") == ""
+	renderer = Renderer("quiet")
+	renderer.choices(["Mine"])
+	assert renderer.prompt("> ") == "1. Mine\n> "
+
+def test_json_mode_writes_one_event_per_line():
+	renderer = Renderer("json")
+	renderer.line(colored("hi", "red"))
+	renderer.choices(["Mine"])
+	renderer.result(result())
+	events = [json.loads(line) for line in renderer.prompt("> ").splitlines()]
+	assert events[0] == {"event": "text", "text": "hi"}
+	assert events[1] == {"event": "choices", "options": ["Mine"]}
+	assert events[2]["event"] == "result" and events[2]["action"] == "inventory" and events[2]["dead"] is False
+	assert all("\x1b" not in text for text in events[2]["messages"])
+	assert events[3] == {"event": "prompt", "text": "> "}
+
+def test_unknown_mode_is_refused():
+	with pytest.raises(ValueError):
+		Renderer("html")
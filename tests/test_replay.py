@@ -0,0 +1,46 @@
+import asyncio, json, random
+
+import pytest
+
+from MinecraftRPG import GameSession, load_content, play
+from replay import RecordingClient, ReplayClient, load_recording, replay, save_recording
+
+load_content()
+
+def record(path, seed, inputs):
+	"Plays a session from the given input, saving a recording of it"
+	session = GameSession(seed=seed)
+	client = RecordingClient(ReplayClient(inputs))
+	asyncio.run(play(client, session))
+	save_recording(path, session, client)
+	return session
+
+def menu_choices(seed, n=300):
+	choices = random.Random(seed)
+	return ["1"] + [str(choices.randint(1, 6)) for _ in range(n)]
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_replay_matches_the_recording(tmp_path, seed):
+	path = str(tmp_path / "game.json")
+	session = record(path, seed, menu_choices(seed))
+	recording = load_recording(path)
+	assert session.player.ticks > 0 and len(recording["inputs"]) > 1
+	warnings, diffs, used, _ = replay(recording)
+	assert warnings == [] and diffs == []
+	assert used == len(recording["inputs"])
+
+def test_replay_reports_differences(tmp_path):
+	path = str(tmp_path / "game.json")
+	record(path, 1, menu_choices(1))
+	recording = load_recording(path)
+	recording["seed"] += 1
+	recording["content"] = "changed"
+	warnings, diffs, _, _ = replay(recording)
+	assert warnings == ["the content files have changed since the recording was made"]
+	assert diffs
+
+def test_other_versions_are_refused(tmp_path):
+	path = tmp_path / "game.json"
+	path.write_text(json.dumps({"version": 0}))
+	with pytest.raises(ValueError):
+		load_recording(str(path))
@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from rng import RNG
+
+def mean(values):
+	values = list(values)
+	return sum(values) / len(values)
+
+def test_same_seed_gives_the_same_stream(backend):
+	a, b = RNG(5), RNG(5)
+	assert [a.random() for _ in range(200)] == [b.random() for _ in range(200)]
+	assert list(a.randint(1, 6, size=50)) == list(b.randint(1, 6, size=50))
+	assert a.multinomial(100, [1, 2, 3]) == b.multinomial(100, [1, 2, 3])
+
+def test_draws_stay_in_range(backend):
+	rng = RNG(1)
+	assert all(0 <= rng.random() < 1 for _ in range(1000))
+	assert {rng.randint(1, 6) for _ in range(1000)} == set(range(1, 7))
+	assert set(int(x) for x in rng.randint(1, 6, size=1000)) == set(range(1, 7))
+	assert all(0 <= rng.binomial(20, 30) <= 20 for _ in range(1000))
+	assert all(0 <= rng.hypergeometric(5, 10, 8) <= 5 for _ in range(1000))
+	assert rng.geometric(1) == 1 and rng.geometric(0) == math.inf
+	assert rng.binomial(10, 0) == 0 and rng.binomial(10, 100) == 10
+
+@pytest.mark.parametrize("draw, expected", [
+	(lambda rng: rng.binomial(40, 25), 10), #40 * 0.25
+	(lambda rng: rng.binomial(1000, 5), 50),
+	(lambda rng: rng.geometric(0.2), 5), #1 / p
+	(lambda rng: rng.negative_binomial(3, 0.25), 9), #n(1 - p) / p
+	(lambda rng: rng.hypergeometric(6, 14, 10), 3), #sample * good / (good + bad)
+	(lambda rng: rng.randint(1, 6), 3.5),
+	(lambda rng: rng.one_in(4), 0.25),
+	(lambda rng: rng.x_in_y(3, 10), 0.3),
+	(lambda rng: rng.round_stochastic(2.3), 2.3)
+])
+def test_draws_have_the_expected_mean(backend, draw, expected):
+	rng = RNG(2)
+	assert mean(draw(rng) for _ in range(20000)) == pytest.approx(expected, rel=0.05)
+
+def test_batch_forms_match_single_draws(backend):
+	rng = RNG(3)
+	n = 20000
+	assert rng.randint_sum(1, 6, n, chunk_size=1000) / n == pytest.approx(3.5, rel=0.02)
+	assert mean(rng.one_in(4, size=n)) == pytest.approx(0.25, rel=0.05)
+	assert mean(rng.x_in_y(3, 10, size=n)) == pytest.approx(0.3, rel=0.05)
+	counts = rng.multinomial(n, [1, 2, 7])
+	assert sum(counts) == n
+	assert [c / n for c in counts] == pytest.approx([0.1, 0.2, 0.7], rel=0.05)
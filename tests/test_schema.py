@@ -0,0 +1,74 @@
+import json, os
+
+import pytest
+
+from MinecraftRPG import content_dir, content_schemas
+from schema import Field, ListOf, Loader, MapOf, Object, OPTIONAL, Value, ValidationError, format_errors
+
+drop = Object({
+	"item": Field((str, list)),
+	"quantity": Field(int, 1),
+	"chance": Field(ListOf(int, length=2), OPTIONAL),
+	"kind": Field(Value(str, choices=["common", "rare"]), "common")
+}, checks=[lambda fields: "chance can't be over 1" if "chance" in fields and fields["chance"][0] > fields["chance"][1] else None])
+
+def errors_in(loader, value):
+	with pytest.raises(ValidationError) as info:
+		loader.load(value, "drops.json")
+	return info.value.errors
+
+def test_defaults_are_filled_in():
+	loader = Loader(ListOf(drop))
+	assert loader.load([{"item": "Bone"}, {"item": ["Wool"], "quantity": 2, "chance": [1, 2]}]) == [
+		{"item": "Bone", "quantity": 1, "kind": "common"},
+		{"item": ["Wool"], "quantity": 2, "chance": [1, 2], "kind": "common"}
+	]
+
+def test_every_error_is_reported_with_its_path():
+	loader = Loader(ListOf(drop))
+	errors = errors_in(loader, [
+		{"quantity": "two"},
+		{"item": "Bone", "chance": [1, 2, 3]},
+		{"item": "Bone", "kind": "epic"},
+		{"item": "Bone", "chance": [3, 2]},
+		7
+	])
+	assert errors == [
+		("drops.json[0]", "missing required field 'item'"),
+		("drops.json[0].quantity", "expected an integer, got a string"),
+		("drops.json[1].chance", "expected a list of 2 items, got 3"),
+		("drops.json[2].kind", "'epic' isn't one of 'common', 'rare'"),
+		("drops.json[3]", "chance can't be over 1"),
+		("drops.json[4]", "expected an object, got an integer")
+	]
+
+def test_valid_values_pass_through_unless_built():
+	value = {"Stick": [1, 2.5], "Torch": [3]}
+	assert Loader(MapOf(ListOf((int, float)))).load(value) is value
+	assert Loader(MapOf(ListOf(int), build=len)).load({"Stick": [1, 2]}) == 1
+	assert Loader(Object({"name": str, "tags": Field(list, OPTIONAL)})).load({"name": "x", "extra": 1}) == {"name": "x", "extra": 1}
+	assert errors_in(Loader(MapOf(ListOf(int))), {"Stick": [1, "2"], "Wooden Pickaxe": None}) == [
+		("drops.json.Stick[1]", "expected an integer, got a string"),
+		("drops.json['Wooden Pickaxe']", "expected a list, got null")
+	]
+
+def test_the_error_message_is_capped():
+	errors = [(f"x[{i}]", "bad") for i in range(60)]
+	message = str(ValidationError(errors))
+	assert message.startswith("60 errors in the content:") and message.endswith("...and 10 more")
+
+@pytest.mark.parametrize("name", sorted(content_schemas))
+def test_content_files_are_valid(name):
+	with open(os.path.join(content_dir, name)) as f:
+		errors = []
+		content_schemas[name].check(json.load(f), name, errors)
+	assert errors == []
+
+def test_bad_mobs_are_all_reported():
+	with open(os.path.join(content_dir, "mobs.json")) as f:
+		mobs = json.load(f)
+	del mobs[0]["HP"]
+	mobs[1]["behavior"] = "sleepy"
+	errors = []
+	content_schemas["mobs.json"].check(mobs, "mobs.json", errors)
+	assert [path for path, message in format_errors(errors)] == ["mobs.json[0]", "mobs.json[1].behavior"]
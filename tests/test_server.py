@@ -0,0 +1,58 @@
+import asyncio
+
+from MinecraftRPG import Player, load_content
+from leaderboard import Leaderboard
+from replay import ReplayClient
+from server import GameServer
+from store import PlayerStore
+
+load_content()
+
+def stored_player(store, name, exp, dead=False):
+	player = Player()
+	player.EXP = exp
+	player.dead = dead
+	store.save(name, player)
+
+def login(server, name):
+	asyncio.run(server.login(ReplayClient([]), name))
+	player = server.players[name]
+	server.events.attach(player, name)
+	return player
+
+def test_starting_over_keeps_the_best_score(tmp_path):
+	path = str(tmp_path / "players.db")
+	store = PlayerStore(path)
+	stored_player(store, "alice", 40, dead=True)
+	stored_player(store, "bob", 20)
+	server = GameServer(store=store)
+	player = login(server, "alice")
+	assert player.EXP == 0 and not player.dead
+	assert server.leaderboard.top() == [("alice", 40), ("bob", 20)]
+	player.gain_exp(5)
+	assert server.leaderboard.score("alice") == 40
+	server.save("alice")
+	store.close()
+	store = PlayerStore(path)
+	assert Leaderboard.from_store(store).top() == [("alice", 40), ("bob", 20)]
+	assert store.load("alice").EXP == 5
+	store.compact()
+	assert Leaderboard.from_store(store).top() == [("alice", 40), ("bob", 20)]
+	server = GameServer(store=store)
+	player = login(server, "alice")
+	player.gain_exp(50)
+	assert server.leaderboard.top() == [("alice", 55), ("bob", 20)]
+	store.close()
+
+def test_dying_again_with_a_lower_score_keeps_the_best(tmp_path):
+	store = PlayerStore(str(tmp_path / "players.db"))
+	stored_player(store, "alice", 40, dead=True)
+	server = GameServer(store=store)
+	player = login(server, "alice")
+	player.gain_exp(10)
+	player.dead = True
+	server.save("alice")
+	login(server, "alice")
+	assert server.leaderboard.score("alice") == 40
+	assert Leaderboard.from_store(store).score("alice") == 40
+	store.close()
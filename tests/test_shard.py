@@ -0,0 +1,86 @@
+import os
+
+from MinecraftRPG import GameSession, Player, load_content
+from leaderboard import Leaderboard
+from shard import OtherPartitions, PartitionedStore, Supervisor, open_store, partition_of, partition_path, store_partitions
+
+load_content()
+
+def owned(supervisor, shard):
+	return [partition for partition in range(supervisor.partitions) if supervisor.ring.node_for(partition) == shard]
+
+def test_players_keep_their_store_when_workers_change(tmp_path):
+	path = str(tmp_path / "players.db")
+	names = [f"player{i}" for i in range(50)]
+	supervisor = Supervisor(workers=4, options={"store": path})
+	supervisor.partitions = store_partitions(path)
+	stores = {shard: PartitionedStore(path, supervisor.partitions, owned(supervisor, shard)) for shard in range(4)}
+	for name in names:
+		player = Player()
+		player.EXP = len(name)
+		stores[supervisor.worker_for(None, name)].track(name, player)
+	for store in stores.values():
+		store.close()
+	supervisor.ring.remove(0) #As when worker 0 keeps dying
+	for workers in (supervisor, Supervisor(workers=2, options={"store": path})):
+		workers.partitions = store_partitions(path)
+		stores = {}
+		for name in names:
+			shard = workers.worker_for(None, name)
+			if shard not in stores:
+				stores[shard] = PartitionedStore(path, workers.partitions, owned(workers, shard))
+			assert stores[shard].load(name).EXP == len(name)
+		for store in stores.values():
+			store.close()
+		workers.close()
+
+def test_leaderboards_cover_every_workers_players(tmp_path):
+	path = str(tmp_path / "players.db")
+	partitions = store_partitions(path, default=8)
+	names = [f"player{i}" for i in range(40)]
+	mine = PartitionedStore(path, partitions, range(4))
+	theirs = PartitionedStore(path, partitions, range(4, 8))
+	players = {}
+	for i, name in enumerate(names):
+		store = mine if partition_of(name, partitions) < 4 else theirs
+		players[name] = Player()
+		players[name].EXP = i
+		store.track(name, players[name])
+	theirs.flush()
+	board = Leaderboard.from_store(mine)
+	others = OtherPartitions(mine, board)
+	others.refresh()
+	assert len(board) == len(names) and board.top(1) == [("player39", 39)]
+	#A player on the other worker plays a step, which is only journaled, then the other worker compacts its store
+	name = next(name for name in names if partition_of(name, partitions) >= 4)
+	session = GameSession(players[name], seed=0)
+	session.player.gain_exp(100)
+	session.inventory()
+	theirs.flush()
+	others.refresh()
+	assert board.score(name) == players[name].EXP and board.rank(name) == 1
+	for store in theirs.stores.values():
+		store.compact()
+	others.refresh()
+	assert board.score(name) == players[name].EXP
+	assert Leaderboard.from_store(open_store(path, readonly=True)).top(40) == board.top(40)
+	theirs.close()
+	others.close()
+	mine.close()
+
+def test_read_only_stores_leave_partly_written_records(tmp_path):
+	path = str(tmp_path / "players.db")
+	partitions = store_partitions(path, default=2)
+	store = PartitionedStore(path, partitions)
+	for i in range(10):
+		store.track(f"player{i}", Player())
+	store.flush()
+	part = partition_path(path, 0)
+	with open(part, "ab") as f:
+		f.write(b"\x02\xff") #As if the worker that has it open were part way through writing a record
+	size = os.path.getsize(part)
+	reader = open_store(path, readonly=True)
+	assert len(Leaderboard.from_store(reader)) == 10
+	reader.close()
+	assert os.path.getsize(part) == size
+	store.close()
@@ -0,0 +1,111 @@
+import json, os, shutil, threading, time
+
+import MinecraftRPG
+from MinecraftRPG import Player, Tool, build_content, build_tables, install_content, load_content
+from store import PlayerStore
+
+load_content()
+
+class SlowStore(PlayerStore):
+	"Plays a turn from another thread while compact() is encoding the new snapshots"
+
+	def __init__(self, path):
+		self.during = None
+		super().__init__(path)
+
+	def encode(self, player_id, player, seq):
+		if self.during is not None:
+			during, self.during = self.during, None
+			thread = threading.Thread(target=during)
+			thread.start()
+			thread.join(5)
+			assert not thread.is_alive(), "compact() kept the store locked while encoding"
+		return super().encode(player_id, player, seq)
+
+def test_compact_keeps_changes_made_while_it_runs(tmp_path):
+	player = Player()
+	store = SlowStore(str(tmp_path / "players.db"))
+	store.track("Steve", player)
+	player.add_item("Wood", 3)
+	def play():
+		player.add_item("Stone", 2)
+		player.remove_item("Wood", 1)
+		store.save("Alex", Player())
+	store.during = play
+	store.compact()
+	assert store.during is None
+	player.add_item("Coal")
+	store.close()
+	store = PlayerStore(str(tmp_path / "players.db"))
+	loaded = store.load("Steve")
+	assert loaded.inventory == {"Wood": 2, "Stone": 2, "Coal": 1}
+	assert "Alex" in store
+	store.close()
+
+def test_tools_are_rebuilt_from_reloaded_recipes(tmp_path, monkeypatch):
+	for name in ("mobs.json", "recipes.json", "foods.json", "smelting.json"):
+		shutil.copy(os.path.join(MinecraftRPG.content_dir, name), tmp_path)
+	with open(tmp_path / "recipes.json") as f:
+		recipes = json.load(f)
+	recipes["Wooden Pickaxe"]["tool_data"]["durability"] = 999
+	recipes["Bone Club"] = {"components": [["Bone", 2]], "tool_data": {"damage": 3, "durability": 40}}
+	with open(tmp_path / "recipes.json", "w") as f:
+		json.dump(recipes, f)
+	old_tables = {name: getattr(MinecraftRPG, name) for name in MinecraftRPG.content_names}
+	monkeypatch.setattr(MinecraftRPG, "content_dir", str(tmp_path))
+	install_content(build_tables(build_content(["recipes.json"])))
+	try:
+		player = Player()
+		path = str(tmp_path / "players.db")
+		store = PlayerStore(path)
+		store.track("Steve", player)
+		for name in ("Wooden Pickaxe", "Bone Club"):
+			player.add_tool(Tool(name, MinecraftRPG.recipes[name].tool_data))
+		expected = [("Wooden Pickaxe", 999, 999), ("Bone Club", 40, 40)]
+		for save in (False, True): #From the journal, then from a snapshot
+			if save:
+				store.save("Steve", player)
+			store.close()
+			store = PlayerStore(path)
+			assert [(tool.name, tool.durability, tool.max_durability) for tool in store.load("Steve").tools] == expected
+		store.close()
+	finally:
+		install_content(old_tables)
+
+def test_intern_gives_one_id_to_a_name_added_from_two_threads(tmp_path):
+	store = PlayerStore(str(tmp_path / "players.db"))
+	ids = []
+	threads = [threading.Thread(target=lambda: ids.append(store.intern("Emerald"))) for _ in range(2)]
+	with store.lock: #Both threads find the name missing, then wait here
+		for thread in threads:
+			thread.start()
+		time.sleep(0.2)
+	for thread in threads:
+		thread.join()
+	assert ids[0] == ids[1]
+	assert store.names.count("Emerald") == 1
+	store.close()
+
+def test_journal_replays_stats_and_time_with_items(tmp_path):
+	from MinecraftRPG import GameSession
+	path = str(tmp_path / "players.db")
+	store = PlayerStore(path)
+	session = GameSession(seed=3)
+	player = session.player
+	store.track("Steve", player)
+	for _ in range(200):
+		if session.over:
+			break
+		if session.battle is not None:
+			session.battle_action("attack")
+		else:
+			session.explore()
+	store.flush() #Then crash, without saving a snapshot
+	crashed = PlayerStore(path)
+	loaded = crashed.load("Steve")
+	crashed.close()
+	for field in ("HP", "hunger", "saturation", "food_exhaustion", "EXP", "level", "ticks", "dead", "inventory"):
+		assert getattr(loaded, field) == getattr(player, field), field
+	assert (loaded.time.mins, loaded.time.secs) == (player.time.mins, player.time.secs)
+	assert loaded.time.is_night() == player.time.is_night()
+	store.close()
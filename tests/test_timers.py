@@ -0,0 +1,64 @@
+import pytest
+
+from MinecraftRPG import Player, day_length, load_content, world_events
+from timers import Scheduler
+
+load_content()
+
+def test_timers_fire_in_order_at_their_due_time():
+	timers = Scheduler()
+	fired = []
+	for due in (5, 1, 3, 3):
+		timers.schedule(due, lambda due=due: fired.append((due, timers.now)))
+	timers.advance(2)
+	assert fired == [(1, 1)]
+	timers.advance(10)
+	assert fired == [(1, 1), (3, 3), (3, 3), (5, 5)]
+	assert timers.now == 12 and len(timers) == 0
+
+def test_cancelled_timers_dont_fire():
+	timers = Scheduler()
+	fired = []
+	kept = [timers.schedule(i, fired.append, i) for i in range(0, 100, 2)]
+	for timer in kept[1:]:
+		timers.cancel(timer)
+		timers.cancel(timer)
+	assert len(timers) == 1
+	timers.advance(100)
+	assert fired == [0] and len(timers) == 0
+
+def test_timers_scheduled_while_advancing_fire_if_due():
+	timers = Scheduler()
+	fired = []
+	def repeat(n):
+		fired.append(timers.now)
+		if n > 1:
+			timers.schedule(1, repeat, n - 1)
+	timers.schedule(1, repeat, 3)
+	timers.advance(10)
+	assert fired == [1, 2, 3]
+
+def test_status_effects_wear_off():
+	player = Player()
+	player.apply_status_effect("Poison", 1, 10)
+	assert player.effect_time_left("Poison") == 10
+	player.advance_time(4)
+	player.apply_status_effect("Poison", 2, 3) #A stronger effect restarts the duration
+	assert player.get_effect_level("Poison") == 2 and player.effect_time_left("Poison") == 3
+	player.advance_time(3)
+	assert "Poison" not in player.status_effects
+	assert len(player.timers) == 1 #Only the next day/night event is left
+
+def test_hunger_ticks_while_it_lasts():
+	player = Player()
+	player.apply_status_effect("Hunger", 1, 10)
+	before = player.food_exhaustion
+	player.advance_time(20)
+	#Ticks at 1 to 9 seconds; the one due at 10 comes after the effect wears off, which was scheduled first
+	assert player.food_exhaustion - before == pytest.approx(0.05 * 9)
+
+def test_world_events_come_round_every_day():
+	player = Player()
+	player.advance_time(2 * day_length)
+	texts = [text for text, *_ in player.messages]
+	assert texts == [message for _, message in world_events] * 2
@@ -0,0 +1,53 @@
+"""A timer heap for things that happen at a set point in game time, like a status effect wearing off
+Advancing the clock only pops the timers that are due, so each timer costs O(log n) when it's scheduled and
+when it fires, however many others are waiting. Cancelled timers are left in the heap and skipped when they come up."""
+import heapq
+
+class Scheduler:
+	__slots__ = ("now", "heap", "counter", "cancelled")
+
+	def __init__(self, now=0):
+		self.now = now
+		self.heap = []
+		self.counter = 0 #Keeps timers due at the same time in the order they were scheduled
+		self.cancelled = 0
+
+	def __len__(self):
+		return len(self.heap) - self.cancelled
+
+	def schedule(self, delay, callback, *args):
+		"Calls callback(*args) once the clock has advanced by delay seconds, returning a timer that can be cancelled"
+		return self.schedule_at(self.now + delay, callback, *args)
+
+	def schedule_at(self, due, callback, *args):
+		self.counter += 1
+		timer = [due, self.counter, callback, args]
+		heapq.heappush(self.heap, timer)
+		return timer
+
+	def cancel(self, timer):
+		if timer[2] is not None:
+			timer[2] = None
+			self.cancelled += 1
+			if self.cancelled > 16 and self.cancelled * 2 > len(self.heap): #Rebuild once cancelled timers make up most of the heap
+				self.heap[:] = [timer for timer in self.heap if timer[2] is not None] #In place, since advance() may be running
+				heapq.heapify(self.heap)
+				self.cancelled = 0
+
+	def time_left(self, timer):
+		return timer[0] - self.now
+
+	def advance(self, secs):
+		"Moves the clock forward, calling every timer that comes due on the way in order, with the clock set to its due time"
+		end = self.now + secs
+		heap = self.heap
+		while heap and heap[0][0] <= end:
+			timer = heapq.heappop(heap)
+			callback = timer[2]
+			if callback is None:
+				self.cancelled -= 1
+				continue
+			timer[2] = None #So that cancelling it from now on does nothing
+			self.now = timer[0]
+			callback(*timer[3])
+		self.now = end